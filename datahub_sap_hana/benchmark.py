@@ -0,0 +1,189 @@
+"""Benchmarks the lineage extraction on synthetic catalogs.
+
+A synthetic catalog is generated as a snapshot and replayed by the source, so
+no database is needed. Run it with
+
+    python -m datahub_sap_hana.benchmark --schemas 4 --tables 50 --views 200
+
+The throughput, the peak memory usage and the time spent in each stage are
+printed as JSON.
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from datahub.ingestion.api.common import PipelineContext
+
+from datahub_sap_hana.ingestion import LINEAGE_QUERY, HanaSource
+from datahub_sap_hana.inspector import ColumnDescription
+from datahub_sap_hana.snapshot import CatalogSnapshot, Row
+from datahub_sap_hana.transitive import VIEW_DEPENDENCIES_QUERY
+
+
+def _columns(count: int) -> List[ColumnDescription]:
+    return [
+        {
+            "name": f"COL_{i}",
+            "type": "INTEGER",
+            "nullable": True,
+            "default": None,
+            "comment": None,
+        }
+        for i in range(count)
+    ]
+
+
+def generate_catalog(
+    schemas: int, tables: int, views: int, depth: int, columns: int
+) -> CatalogSnapshot:
+    """Generates a snapshot of a catalog with `tables` tables and `views` views
+    in each of `schemas` schemas. Every table and view has `columns` columns.
+
+    The views of a schema form chains of `depth` views. The first view of a
+    chain joins a table of its own schema with a table of the next schema, every
+    other view selects from the previous view of the chain.
+    """
+    if min(schemas, tables, views, depth, columns) < 1:
+        raise ValueError("All dimensions of a synthetic catalog must be positive")
+
+    snapshot = CatalogSnapshot()
+    lineage_rows: List[Row] = []
+    dependency_rows: List[Row] = []
+
+    for s in range(schemas):
+        schema = f"schema_{s}"
+        next_schema = f"schema_{(s + 1) % schemas}"
+        snapshot.schemas.append(schema)
+        snapshot.tables[schema] = [f"table_{t}" for t in range(tables)]
+        snapshot.views[schema] = [f"view_{v}" for v in range(views)]
+        snapshot.columns[schema] = {
+            name: _columns(columns)
+            for name in snapshot.tables[schema] + snapshot.views[schema]
+        }
+        snapshot.view_definitions[schema] = {}
+
+        for v in range(views):
+            view = f"view_{v}"
+            if v % depth == 0:
+                left = f"table_{v % tables}"
+                right = f"table_{(v + 1) % tables}"
+                select = ", ".join(
+                    f"{'L' if i % 2 == 0 else 'R'}.COL_{i}" for i in range(columns)
+                )
+                sql = (
+                    f"SELECT {select} FROM {schema.upper()}.{left.upper()} AS L "
+                    f"JOIN {next_schema.upper()}.{right.upper()} AS R "
+                    "ON L.COL_0 = R.COL_0"
+                )
+                lineage_rows.append((left, schema, view, schema))
+                lineage_rows.append((right, next_schema, view, schema))
+            else:
+                parent = f"view_{v - 1}"
+                select = ", ".join(f"COL_{i}" for i in range(columns))
+                sql = (
+                    f"SELECT {select} FROM {schema.upper()}.{parent.upper()} "
+                    "WHERE COL_0 IS NOT NULL"
+                )
+                lineage_rows.append((parent, schema, view, schema))
+                dependency_rows.append((schema, view, schema, parent))
+            snapshot.view_definitions[schema][view] = sql
+
+    # the view lineage rows are read ordered by the dependent view
+    lineage_rows.sort(key=lambda row: (row[3], row[2]))
+    snapshot.query_results = {
+        LINEAGE_QUERY: lineage_rows,
+        VIEW_DEPENDENCIES_QUERY: dependency_rows,
+    }
+    return snapshot
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident memory of this process and of its finished
+    child processes in megabytes."""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    if sys.platform == "darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def run_benchmark(
+    snapshot_path: str, config: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Replays the lineage of a snapshot with the source and returns the number
+    of work units, the throughput, the peak memory usage and the instrumentation
+    of the run."""
+    source_config = {
+        "host_port": "localhost:39041",
+        "database": "hxe",
+        "schema_pattern": {"allow": [".*"]},
+        "include_view_lineage": True,
+        "include_column_lineage": True,
+        **(config or {}),
+        "replay_snapshot": snapshot_path,
+    }
+    source = HanaSource.create(source_config, PipelineContext(run_id="hana-bench"))
+
+    start = time.perf_counter()
+    workunits = 0
+    try:
+        for _ in source.get_workunits():
+            workunits += 1
+    finally:
+        source.close()
+    seconds = time.perf_counter() - start
+
+    return {
+        "workunits": workunits,
+        "seconds": round(seconds, 6),
+        "workunits_per_second": round(workunits / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **source.instrumentation.as_obj(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", type=int, default=4)
+    parser.add_argument("--tables", type=int, default=50, help="tables per schema")
+    parser.add_argument("--views", type=int, default=200, help="views per schema")
+    parser.add_argument("--depth", type=int, default=4, help="view chain depth")
+    parser.add_argument("--columns", type=int, default=20, help="columns per view")
+    parser.add_argument(
+        "--snapshot",
+        help="replay this snapshot instead of generating a synthetic catalog",
+    )
+    parser.add_argument(
+        "--config",
+        default="{}",
+        help="JSON object of source config options, e.g. "
+        "'{\"column_lineage_workers\": 4}'",
+    )
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = args.snapshot
+        if snapshot_path is None:
+            snapshot_path = str(Path(tmp_dir) / "catalog.json.gz")
+            generate_catalog(
+                args.schemas, args.tables, args.views, args.depth, args.columns
+            ).save(snapshot_path)
+        results = run_benchmark(snapshot_path, json.loads(args.config))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
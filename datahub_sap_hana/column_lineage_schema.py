@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List, Tuple
 
 from serde import serde
 from sqlglot import expressions
@@ -70,3 +71,8 @@ class DownstreamLineageField(ColumnField):
     """
 
     pass
+
+
+# The lineage of a single view column: the column name as it appears in the view
+# SQL and the upstream fields it is calculated from.
+ColumnLineage = Tuple[str, List[UpstreamLineageField]]
@@ -0,0 +1,145 @@
+import logging
+from datetime import datetime
+from typing import Optional, Set, Tuple, cast
+
+from datahub.ingestion.api.ingestion_job_checkpointing_provider_base import JobId
+from datahub.ingestion.source.state.checkpoint import Checkpoint, CheckpointStateBase
+from datahub.ingestion.source.state.stateful_ingestion_base import (
+    StatefulIngestionConfig,
+    StatefulIngestionConfigBase,
+    StatefulIngestionSourceBase,
+)
+from datahub.ingestion.source.state.use_case_handler import (
+    StatefulIngestionUsecaseHandlerBase,
+)
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# SAP HANA has no modification time for catalog objects, but `CREATE OR REPLACE`
+# resets the create time of a view or table, so it is used to find the objects
+# that changed since the last run.
+CHANGED_OBJECTS_QUERY = """
+SELECT SCHEMA_NAME, TABLE_NAME AS OBJECT_NAME
+  FROM SYS.TABLES
+WHERE CREATE_TIME >= :since
+UNION ALL
+SELECT SCHEMA_NAME, VIEW_NAME AS OBJECT_NAME
+  FROM SYS.VIEWS
+WHERE CREATE_TIME >= :since
+"""
+
+WATERMARK_QUERY = "SELECT CURRENT_TIMESTAMP FROM DUMMY"
+
+
+class WatermarkCheckpointState(CheckpointStateBase):
+    """
+    The checkpoint state of incremental runs. Stores the database time at which
+    the last run started.
+    """
+
+    watermark: Optional[datetime] = None
+
+
+class IncrementalHandler(StatefulIngestionUsecaseHandlerBase[WatermarkCheckpointState]):
+    """
+    The stateful ingestion helper class that limits a run to the catalog objects
+    that were created or replaced since the watermark of the previous run.
+    """
+
+    def __init__(
+        self,
+        source: StatefulIngestionSourceBase,
+        config: StatefulIngestionConfigBase[StatefulIngestionConfig],
+        pipeline_name: Optional[str],
+        run_id: str,
+    ):
+        self.state_provider = source.state_provider
+        self.stateful_ingestion_config: Optional[
+            StatefulIngestionConfig
+        ] = config.stateful_ingestion
+        self.pipeline_name = pipeline_name
+        self.run_id = run_id
+        self.checkpointing_enabled: bool = (
+            self.state_provider.is_stateful_ingestion_configured()
+        )
+        self._job_id = JobId("hana_incremental")
+        self.state_provider.register_stateful_ingestion_usecase_handler(self)
+
+    @property
+    def job_id(self) -> JobId:
+        return self._job_id
+
+    def is_checkpointing_enabled(self) -> bool:
+        return self.checkpointing_enabled
+
+    def create_checkpoint(self) -> Optional[Checkpoint[WatermarkCheckpointState]]:
+        if not self.is_checkpointing_enabled() or self._ignore_new_state():
+            return None
+
+        assert self.pipeline_name is not None
+        return Checkpoint(
+            job_name=self.job_id,
+            pipeline_name=self.pipeline_name,
+            run_id=self.run_id,
+            state=WatermarkCheckpointState(),
+        )
+
+    def _ignore_old_state(self) -> bool:
+        return (
+            self.stateful_ingestion_config is not None
+            and self.stateful_ingestion_config.ignore_old_state
+        )
+
+    def _ignore_new_state(self) -> bool:
+        return (
+            self.stateful_ingestion_config is not None
+            and self.stateful_ingestion_config.ignore_new_state
+        )
+
+    def get_last_watermark(self) -> Optional[datetime]:
+        if not self.is_checkpointing_enabled() or self._ignore_old_state():
+            return None
+        last_checkpoint = self.state_provider.get_last_checkpoint(
+            self.job_id, WatermarkCheckpointState
+        )
+        if last_checkpoint and last_checkpoint.state:
+            return cast(WatermarkCheckpointState, last_checkpoint.state).watermark
+        return None
+
+    def set_current_watermark(self, watermark: datetime) -> None:
+        if not self.is_checkpointing_enabled() or self._ignore_new_state():
+            return
+        cur_checkpoint = self.state_provider.get_current_checkpoint(self.job_id)
+        assert cur_checkpoint is not None
+        cast(WatermarkCheckpointState, cur_checkpoint.state).watermark = watermark
+
+    def get_changed_objects(
+        self, conn: Connection, full_refresh: bool = False
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """Stores the watermark of this run and returns the lowercase schema and
+        names of the tables and views that changed since the last run.
+
+        Returns None when everything has to be ingested, because there is no
+        previous watermark or a full refresh was requested.
+        """
+        watermark = conn.execute(text(WATERMARK_QUERY)).scalar()
+        last_watermark = self.get_last_watermark()
+        self.set_current_watermark(watermark)
+
+        if full_refresh or last_watermark is None:
+            logger.info("Running a full refresh, all objects are ingested.")
+            return None
+
+        changed_objects = {
+            (schema_name.lower(), object_name.lower())
+            for schema_name, object_name in conn.execute(
+                text(CHANGED_OBJECTS_QUERY), {"since": last_watermark}
+            )
+        }
+        logger.info(
+            f"Found {len(changed_objects)} tables and views that changed since "
+            f"{last_watermark}."
+        )
+        return changed_objects
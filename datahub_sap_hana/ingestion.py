@@ -1,14 +1,26 @@
 import logging
-from collections import defaultdict
-from functools import cache
-from typing import Any, Dict, Iterable, List, Set, Tuple, Union
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-import datahub.emitter.mce_builder as builder
 import sqlalchemy_hana.types as custom_types  # type: ignore
 from datahub.configuration.common import AllowDenyPattern
 from datahub.emitter import mce_builder
 from datahub.emitter.mcp import MetadataChangeProposalWrapper
-from datahub.emitter.mcp_builder import mcps_from_mce
 from datahub.ingestion.api.common import PipelineContext
 from datahub.ingestion.api.decorators import (
     config_class,  # type: ignore
@@ -20,7 +32,10 @@ from datahub.ingestion.source.sql.sql_common import (
     SqlWorkUnit,
     register_custom_type,
 )
-from datahub.ingestion.source.sql.sql_config import BasicSQLAlchemyConfig
+from datahub.ingestion.source.sql.sql_config import (
+    BasicSQLAlchemyConfig,
+    SQLAlchemyConfig,
+)
 from datahub.metadata.com.linkedin.pegasus2avro import schema
 from datahub.metadata.com.linkedin.pegasus2avro.dataset import (
     DatasetLineageType,
@@ -30,20 +45,55 @@ from datahub.metadata.com.linkedin.pegasus2avro.dataset import (
     Upstream,
     UpstreamLineage,
 )
+from datahub.metadata.schema_classes import DatasetProfileClass, StatusClass
 from pydantic import BaseModel
 from pydantic.fields import Field
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.engine.base import Connection
-from sqlglot import parse_one
-from sqlglot.expressions import DerivedTable
-from sqlglot.lineage import Node, lineage
+from sqlalchemy import bindparam, create_engine, event, inspect, text
+from sqlalchemy.engine.base import Connection, Engine
+from sqlalchemy.engine.reflection import Inspector as SqlAlchemyInspector
+from sqlalchemy.pool import QueuePool
 
 from datahub_sap_hana.column_lineage_schema import (
     DownstreamLineageField,
     UpstreamLineageField,
     View,
 )
-from datahub_sap_hana.inspector import CachedInspector, Inspector
+from datahub_sap_hana.incremental import IncrementalHandler
+from datahub_sap_hana.inspector import (
+    CachedInspector,
+    Catalog,
+    Inspector,
+    PrefetchedInspector,
+)
+from datahub_sap_hana.instrumentation import Instrumentation
+from datahub_sap_hana.lineage import iter_view_lineage
+from datahub_sap_hana.lineage_cache import LineageCache
+from datahub_sap_hana.patterns import pattern_to_sql
+from datahub_sap_hana.profiling import (
+    TABLE_SIZES_QUERY,
+    HanaProfiler,
+    HanaProfilingConfig,
+)
+from datahub_sap_hana.report import HanaReport
+from datahub_sap_hana.snapshot import (
+    CatalogSnapshot,
+    ReplayConnection,
+    ReplayInspector,
+    capture_snapshot,
+)
+from datahub_sap_hana.transitive import (
+    VIEW_DEPENDENCIES_QUERY,
+    TransitiveLineageResolver,
+    get_view_dependencies,
+    topological_order,
+)
+from datahub_sap_hana.urns import UrnFactory
+
+if TYPE_CHECKING:
+    from datahub.ingestion.source.ge_data_profiler import (
+        DatahubGEProfiler,
+        GEProfilerRequest,
+    )
 
 register_custom_type(custom_types.TINYINT, schema.NumberType)
 
@@ -90,12 +140,171 @@ class HanaConfig(BasicSQLAlchemyConfig):
 
     scheme = "hana"
     schema_pattern: AllowDenyPattern = Field(default=AllowDenyPattern(deny=["*SYS*"]))
+    profiling: HanaProfilingConfig = Field(
+        default=HanaProfilingConfig(), description="Profiling configuration"
+    )
     include_view_lineage: bool = Field(
         default=False, description="Include table lineage for views"
     )
     include_column_lineage: bool = Field(
         default=False, description="Include column lineage for views"
     )
+    pool_size: int = Field(
+        default=5,
+        description="Number of connections kept open in the connection pool that "
+        "is shared by the metadata extraction, profiling and lineage queries",
+    )
+    max_overflow: int = Field(
+        default=5,
+        description="Number of connections that can be opened in addition to "
+        "`pool_size` when all pooled connections are in use",
+    )
+    pool_pre_ping: bool = Field(
+        default=True,
+        description="Test pooled connections before they are reused, so that "
+        "connections closed by the database or a proxy are replaced",
+    )
+    max_workers: int = Field(
+        default=1,
+        description="Number of threads that reflect the tables and views of the "
+        "allowed schemas in parallel, each schema over its own pooled connection. "
+        "The work units are still emitted in schema order. The schemas are "
+        "reflected one after another when this is 1",
+    )
+    include_table_statistics: bool = Field(
+        default=False,
+        description="Emit the row count and size in bytes of every allowed table "
+        "as a table-level dataset profile. They are read from SYS.M_TABLES with one "
+        "query per batch of schemas, so this is much cheaper than profiling and "
+        "doesn't require it to be enabled. Profiled tables get them in their "
+        "profile instead of a profile of their own",
+    )
+    view_lineage_fetch_size: int = Field(
+        default=1000,
+        description="Number of rows of the view lineage query fetched at a time",
+    )
+    push_down_lineage_filters: bool = Field(
+        default=True,
+        description="Translate schema_pattern and view_pattern into SQL predicates "
+        "of the view lineage query, so that rows of views that are not allowed are "
+        "filtered by the database",
+    )
+    prefetch_column_metadata: bool = Field(
+        default=True,
+        description="Load the column metadata of all allowed schemas, and of the "
+        "schemas that their views select from, with a few bulk queries before "
+        "extracting column lineage, instead of one query per table. The column "
+        "lineage is then resolved against the loaded columns only",
+    )
+    prefetch_batch_size: int = Field(
+        default=50,
+        description="Number of schemas read per column metadata prefetch, view "
+        "definition or table statistics query",
+    )
+    stream_view_definitions: bool = Field(
+        default=True,
+        description="Read the view definitions for column lineage from SYS.VIEWS "
+        "with one query per batch of schemas, instead of one query per view",
+    )
+    view_definitions_fetch_size: int = Field(
+        default=100,
+        description="Number of view definitions fetched at a time when "
+        "`stream_view_definitions` is enabled",
+    )
+    column_lineage_workers: int = Field(
+        default=0,
+        description="Number of worker processes that parse the view SQL for column "
+        "lineage, the views are parsed in the ingestion process when this is 0 or 1",
+    )
+    column_lineage_max_in_flight: int = Field(
+        default=32,
+        description="Maximum number of views that are queued in or returned from "
+        "the column lineage worker processes at the same time",
+    )
+    column_lineage_cache_dir: Optional[str] = Field(
+        default=None,
+        description="Directory of a persistent cache for the column lineage of "
+        "views, views whose definition did not change since a previous run are "
+        "not parsed again. The cache is disabled when this is not set",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Only ingest the tables, views and lineage that were created or "
+        "replaced since the previous run. Requires stateful_ingestion to be enabled",
+    )
+    full_refresh: bool = Field(
+        default=False,
+        description="Ingest all objects in an incremental run, the next incremental "
+        "run continues from this one",
+    )
+    column_lineage_timeout: Optional[float] = Field(
+        default=None,
+        description="Maximum number of seconds spent extracting the column lineage "
+        "of a single view, the worker process parsing a view that takes longer is "
+        "killed and the view is skipped. Requires prefetch_column_metadata",
+    )
+    column_lineage_max_ast_nodes: Optional[int] = Field(
+        default=None,
+        description="Skip the column lineage of views whose parsed SQL has more "
+        "nodes than this",
+    )
+    column_lineage_transitive: bool = Field(
+        default=False,
+        description="Resolve the column lineage of views that are built on other "
+        "views down to the columns of the base tables. The views are processed in "
+        "dependency order and the resolved lineage of each view is reused by the "
+        "views built on it",
+    )
+    column_lineage_max_depth: int = Field(
+        default=10,
+        description="Maximum number of view levels that transitive column lineage "
+        "is resolved through",
+    )
+    merge_column_lineage: bool = Field(
+        default=False,
+        description="Emit one fine-grained lineage entry for all columns of a view "
+        "that have the same upstream columns, instead of one entry per column",
+    )
+    inspector_cache_max_size: int = Field(
+        default=10000,
+        description="Maximum number of cached inspector results, such as the "
+        "columns of a table, used to extract column lineage. The least recently "
+        "used results are removed when the cache is full",
+    )
+    urn_cache_max_size: int = Field(
+        default=10000,
+        description="Maximum number of cached dataset and column urns used to "
+        "build lineage",
+    )
+    column_lineage_cache_max_size_mb: int = Field(
+        default=512,
+        description="Maximum size of the column lineage cache, the least recently "
+        "used entries are removed when it grows larger",
+    )
+
+    snapshot_output: Optional[str] = Field(
+        default=None,
+        description="Path of a compressed snapshot file that the schemas, tables, "
+        "columns, view definitions and dependencies read for lineage are written "
+        "to at the end of the run",
+    )
+    replay_snapshot: Optional[str] = Field(
+        default=None,
+        description="Path of a snapshot file written with `snapshot_output`. The "
+        "lineage is extracted from the snapshot instead of the database, tables "
+        "and views are not ingested",
+    )
+    instrumentation_output: Optional[str] = Field(
+        default=None,
+        description="Path of a JSON file that the stage timings, counters and "
+        "histograms of the run are written to when the source is closed. They are "
+        "part of the source report in any case",
+    )
+    instrumentation_slowest: int = Field(
+        default=10,
+        description="Number of the slowest views to list in the view parse time "
+        "histogram",
+    )
 
     def get_identifier(self: BasicSQLAlchemyConfig, schema: str, table: str) -> str:
         regular = f"{schema}.{table}"
@@ -107,6 +316,15 @@ class HanaConfig(BasicSQLAlchemyConfig):
         return regular
 
 
+class SchemaShard(NamedTuple):
+    """The work units and profile requests of one schema, reflected by a worker
+    thread of a parallel run."""
+
+    workunits: List[Union[MetadataWorkUnit, SqlWorkUnit]]
+    profile_requests: List["GEProfilerRequest"]
+    seconds: float
+
+
 @platform_name(platform_name="SAP Hana", id="hana")
 @config_class(HanaConfig)  # type: ignore
 class HanaSource(SQLAlchemySource):
@@ -119,9 +337,39 @@ class HanaSource(SQLAlchemySource):
     """
 
     config: HanaConfig
+    report: HanaReport
 
     def __init__(self, config: HanaConfig, ctx: PipelineContext):
         super().__init__(config, ctx, "hana")
+        self.report = HanaReport(
+            instrumentation=Instrumentation(self.config.instrumentation_slowest)
+        )
+        self.instrumentation = self.report.instrumentation
+        self.engine: Optional[Engine] = None
+        self.column_lineage_inspector: Optional[CachedInspector] = None
+        self.snapshot: Optional[CatalogSnapshot] = None
+        if self.config.replay_snapshot:
+            self.snapshot = CatalogSnapshot.load(self.config.replay_snapshot)
+        self.urns = UrnFactory(
+            self.platform, self.config, self.config.urn_cache_max_size
+        )
+
+        self.incremental_handler: Optional[IncrementalHandler] = None
+        if self.config.incremental:
+            self.incremental_handler = IncrementalHandler(
+                self, self.config, ctx.pipeline_name, ctx.run_id
+            )
+            if not self.incremental_handler.is_checkpointing_enabled():
+                logger.warning(
+                    "incremental is enabled but stateful_ingestion is not, "
+                    "every run is a full refresh."
+                )
+        # the lowercase (schema, name) of the tables and views that changed since
+        # the last incremental run, None when all objects are ingested.
+        self.changed_objects: Optional[Set[Tuple[str, str]]] = None
+        # the names of the datasets that got a profile, the table statistics
+        # stage skips them
+        self.profiled_datasets: Set[str] = set()
 
     @classmethod
     def create(cls, config_dict: Dict[str, Any], ctx: PipelineContext) -> "HanaSource":
@@ -129,111 +377,573 @@ class HanaSource(SQLAlchemySource):
         return cls(config, ctx)
 
     def get_workunits(self) -> Iterable[Union[MetadataWorkUnit, SqlWorkUnit]]:
-        conn = self.get_db_connection()
-        try:
-            yield from super().get_workunits()
-            if self.config.include_view_lineage:
-                yield from self._get_view_lineage_workunits(conn)
-            if self.config.include_column_lineage:
-                inspector = inspect(conn)
-                cached_inspector = CachedInspector(inspector)
-                yield from self._get_column_lineage_workunits(cached_inspector)
-        finally:
-            conn.close()
+        if self.snapshot is not None:
+            logger.info(
+                f"Replaying the lineage of {self.config.replay_snapshot}, tables "
+                "and views are not ingested."
+            )
+            with self.get_db_connection() as conn:
+                yield from self.instrumentation.timed_iter(
+                    "lineage_aspects", self._get_lineage_workunits(conn)
+                )
+            return
 
-    def get_db_connection(self) -> Connection:
-        url = self.config.get_sql_alchemy_url()
-        engine = create_engine(url)
-        conn = engine.connect()
-        return conn
+        if self.incremental_handler:
+            with self.instrumentation.timer("incremental_changes"):
+                with self.get_db_connection() as conn:
+                    self.changed_objects = self.incremental_handler.get_changed_objects(
+                        conn, full_refresh=self.config.full_refresh
+                    )
+        yield from self.instrumentation.timed_iter(
+            "reflection", super().get_workunits()
+        )
+        if self.config.include_table_statistics:
+            with self.get_db_connection() as conn:
+                yield from self.instrumentation.timed_iter(
+                    "table_statistics", self._get_table_statistics_workunits(conn)
+                )
+        if self.config.include_view_lineage or self.config.include_column_lineage:
+            with self.get_db_connection() as conn:
+                yield from self.instrumentation.timed_iter(
+                    "lineage_aspects", self._get_lineage_workunits(conn)
+                )
+        if self.config.snapshot_output:
+            with self.instrumentation.timer("snapshot_capture"):
+                with self.get_db_connection() as conn:
+                    self.capture_snapshot(conn).save(self.config.snapshot_output)
 
-    def _get_view_lineage_elements(
-        self, conn: Connection
-    ) -> Dict[Tuple[str, str], List[str]]:
-        """Connects to SAP HANA db to run the query statement.
+    def capture_snapshot(self, conn: Connection) -> CatalogSnapshot:
+        """Reads everything that the lineage extraction reads from SAP HANA into
+        a snapshot that can be replayed with `replay_snapshot`.
 
-        The results are then mapped to the ViewLineageEntry attributes.
-        Returns a dictionary of downstream and upstream objects from the query results.
+        The snapshot holds all views, also those that an incremental run skips,
+        so that replaying it gives the lineage of the whole catalog.
         """
+        inspector = self.get_column_lineage_inspector(conn)
+        try:
+            schemas = self.get_column_metadata_schemas(inspector)
+            query_results = {
+                query: [tuple(row) for row in conn.execute(text(query))]
+                for query in [LINEAGE_QUERY, VIEW_DEPENDENCIES_QUERY]
+            }
+            # the view lineage rows are read ordered by the dependent view
+            query_results[LINEAGE_QUERY].sort(key=lambda row: (row[3], row[2]))
+            return capture_snapshot(
+                inspector,
+                schemas,
+                self.get_column_lineage_view_definitions(inspector, changed_only=False),
+                query_results,
+            )
+        finally:
+            inspector.close()
+
+    def get_workunits_internal(self) -> Iterable[Union[MetadataWorkUnit, SqlWorkUnit]]:
+        if self.config.max_workers <= 1:
+            yield from super().get_workunits_internal()
+            return
+
+        for inspector in self.get_inspectors():
+            profiler = None
+            profile_requests: List["GEProfilerRequest"] = []
+            if self.config.profiling.enabled:
+                profiler = self.get_profiler_instance(inspector)
+
+            db_name = self.get_db_name(inspector)
+            yield from self.gen_database_containers(database=db_name)
+
+            schemas = list(self.get_allowed_schemas(inspector, db_name))
+            shards = zip(schemas, self.reflect_schemas(db_name, schemas))
+            for schema_name, shard in shards:
+                self.instrumentation.count("schemas_reflected")
+                self.instrumentation.count("reflection_workunits", len(shard.workunits))
+                self.instrumentation.observe(
+                    "schema_reflection_seconds", shard.seconds, schema_name
+                )
+                profile_requests += shard.profile_requests
+                yield from shard.workunits
 
-        data: List[ViewLineageEntry] = []
-
-        query_results = conn.execute(LINEAGE_QUERY)
+            if profiler and profile_requests:
+                yield from self.loop_profiler(
+                    profile_requests, profiler, platform=self.platform
+                )
 
-        if not query_results.returns_rows:
-            logger.debug("No rows returned.")
-            return {}
+    def reflect_schemas(
+        self, db_name: str, schemas: List[str]
+    ) -> Iterable[SchemaShard]:
+        """Reflects the schemas in a pool of `max_workers` threads and returns
+        their shards in the order of `schemas`.
 
-        for row in query_results:
-            data.append(ViewLineageEntry.parse_obj(row))
+        At most one schema per worker is reflected ahead of the schema that is
+        returned next, so only a few schemas are buffered in memory.
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.config.max_workers, thread_name_prefix="hana-reflection"
+        ) as executor:
+            pending: Deque["Future[SchemaShard]"] = deque()
+            try:
+                for schema_name in schemas:
+                    pending.append(
+                        executor.submit(self.reflect_schema, db_name, schema_name)
+                    )
+                    if len(pending) > self.config.max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def reflect_schema(self, db_name: str, schema: str) -> SchemaShard:
+        """Reflects the tables and views of a schema over a connection of its own."""
+        start = time.perf_counter()
+        with self.get_db_connection() as conn:
+            inspector = inspect(conn)
+            workunits = list(self.get_schema_workunits(inspector, db_name, schema))
+            profile_requests: List["GEProfilerRequest"] = []
+            if self.config.profiling.enabled:
+                profile_requests = list(
+                    self.loop_profiler_requests(inspector, schema, self.config)
+                )
+        return SchemaShard(workunits, profile_requests, time.perf_counter() - start)
+
+    def get_schema_workunits(
+        self, inspector: SqlAlchemyInspector, db_name: str, schema: str
+    ) -> Iterable[Union[MetadataWorkUnit, SqlWorkUnit]]:
+        """Returns the work units of a schema, like SQLAlchemySource does for
+        each schema in get_workunits_internal."""
+        self.add_information_for_schema(inspector, schema)
+        yield from self.gen_schema_containers(
+            database=db_name,
+            schema=schema,
+            extra_properties=self.get_schema_properties(
+                inspector=inspector, schema=schema, database=db_name
+            ),
+        )
+        if self.config.include_tables:
+            yield from self.loop_tables(inspector, schema, self.config)
+        if self.config.include_views:
+            yield from self.loop_views(inspector, schema, self.config)
+
+    def get_engine(self) -> Engine:
+        """Returns the engine of this source, it is created on first use.
+
+        All connections of the source are taken from the pool of this engine, so
+        a connection that is returned to the pool by one extraction pass is reused
+        by the next one instead of logging in to SAP HANA again.
+        """
+        if self.engine is None:
+            url = self.config.get_sql_alchemy_url()
+            logger.debug(f"sql_alchemy_url={url}")
+            options = {
+                "poolclass": QueuePool,
+                # every reflection worker holds a connection while the
+                # connection of get_inspectors is still open
+                "pool_size": max(self.config.pool_size, self.config.max_workers + 1),
+                "pool_pre_ping": self.config.pool_pre_ping,
+                **self.config.options,
+            }
+            # SQLAlchemySource sets max_overflow in the options when profiling
+            # starts, the largest of all values is used regardless of whether
+            # the engine was created before that
+            options["max_overflow"] = max(
+                self.config.max_overflow,
+                options.get("max_overflow", 0),
+                self.get_profiling_connections(),
+            )
+            self.engine = create_engine(url, **options)
+            event.listen(self.engine, "do_connect", self._connect)
+        return self.engine
+
+    def get_profiling_connections(self) -> int:
+        """Returns the number of connections that profiling uses at the same
+        time: one per profiling worker, and one per partition worker of each of
+        them."""
+        profiling = self.config.profiling
+        if not profiling.enabled:
+            return 0
+        partition_workers = 0
+        if profiling.engine == "vectorized" and profiling.partition_workers > 1:
+            partition_workers = profiling.partition_workers
+        return profiling.max_workers * (partition_workers + 1)
+
+    def _connect(self, dialect, conn_rec, cargs, cparams):
+        """Opens a new DBAPI connection and reports the time it took."""
+        start = time.perf_counter()
+        dbapi_connection = dialect.connect(*cargs, **cparams)
+        self.report.report_connection_opened(time.perf_counter() - start)
+        return dbapi_connection
+
+    def get_inspectors(self) -> Iterable[SqlAlchemyInspector]:
+        with self.get_db_connection() as conn:
+            yield inspect(conn)
 
-        lineage_elements: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    def get_db_connection(self) -> Connection:
+        if self.snapshot is not None:
+            return ReplayConnection(self.snapshot)  # type: ignore
+        return self.get_engine().connect()
+
+    def close_column_lineage_inspector(self) -> None:
+        """Reports the cache statistics of the column lineage inspector and frees
+        its caches."""
+        if self.column_lineage_inspector is not None:
+            self.report.report_inspector_cache(self.column_lineage_inspector.cache)
+            self.column_lineage_inspector.close()
+            self.column_lineage_inspector = None
+
+    def close(self) -> None:
+        self.close_column_lineage_inspector()
+        if self.config.instrumentation_output:
+            self.instrumentation.write_json(self.config.instrumentation_output)
+        if self.engine is not None:
+            self.engine.dispose()
+            self.engine = None
+        super().close()
+
+    def is_changed(self, schema: str, name: str) -> bool:
+        """Returns False if an incremental run can skip the table or view."""
+        return (
+            self.changed_objects is None
+            or (schema.lower(), name.lower()) in self.changed_objects
+        )
+
+    def _process_table(
+        self,
+        dataset_name: str,
+        inspector: SqlAlchemyInspector,
+        schema: str,
+        table: str,
+        sql_config: SQLAlchemyConfig,
+    ) -> Iterable[Union[SqlWorkUnit, MetadataWorkUnit]]:
+        if not self.is_changed(schema, table):
+            yield self._get_unchanged_dataset_workunit(dataset_name)
+            return
+        yield from super()._process_table(
+            dataset_name, inspector, schema, table, sql_config
+        )
+
+    def _process_view(
+        self,
+        dataset_name: str,
+        inspector: SqlAlchemyInspector,
+        schema: str,
+        view: str,
+        sql_config: SQLAlchemyConfig,
+    ) -> Iterable[Union[SqlWorkUnit, MetadataWorkUnit]]:
+        if not self.is_changed(schema, view):
+            yield self._get_unchanged_dataset_workunit(dataset_name)
+            return
+        yield from super()._process_view(
+            dataset_name=dataset_name,
+            inspector=inspector,
+            schema=schema,
+            view=view,
+            sql_config=sql_config,
+        )
+
+    def _get_unchanged_dataset_workunit(self, dataset_name: str) -> MetadataWorkUnit:
+        """Returns a status workunit for a dataset that an incremental run skips,
+        so that stale entity removal keeps it in its state."""
+        dataset_urn = mce_builder.make_dataset_urn_with_platform_instance(
+            self.platform,
+            dataset_name,
+            self.config.platform_instance,
+            self.config.env,
+        )
+        return MetadataChangeProposalWrapper(
+            entityUrn=dataset_urn, aspect=StatusClass(removed=False)
+        ).as_workunit()
+
+    def get_profiler_instance(self, inspector: SqlAlchemyInspector):
+        if self.config.profiling.engine != "ge":
+            return HanaProfiler(
+                self.get_db_connection, self.config.profiling, self.report
+            )
+        return super().get_profiler_instance(inspector)
+
+    def is_dataset_eligible_for_profiling(
+        self,
+        dataset_name: str,
+        sql_config: SQLAlchemyConfig,
+        inspector: SqlAlchemyInspector,
+        profile_candidates: Optional[List[str]],
+    ) -> bool:
+        schema, table = dataset_name.split(".")[-2:]
+        return self.is_changed(
+            schema, table
+        ) and super().is_dataset_eligible_for_profiling(
+            dataset_name, sql_config, inspector, profile_candidates
+        )
+
+    def loop_profiler(
+        self,
+        profile_requests: List["GEProfilerRequest"],
+        profiler: Union["DatahubGEProfiler", HanaProfiler],
+        platform: Optional[str] = None,
+    ) -> Iterable[MetadataWorkUnit]:
+        """Emits the profiles like SQLAlchemySource does.
 
-        for item in data:
-            if not self.config.view_pattern.allowed(item.dependent_view):
-                self.report.report_dropped(
-                    f"{item.dependent_schema}.{item.dependent_view}"
-                )
-                logger.debug(
-                    f"View pattern is incompatible, dropping: {item.dependent_schema}.{item.dependent_view}"  # noqa: E501
+        With `include_table_statistics` enabled, the row count and size of
+        SYS.M_TABLES are added to the profiles that don't have them, and the
+        profiled tables are skipped by `_get_table_statistics_workunits`. A
+        table-level profile emitted after it would otherwise be the latest
+        profile of the table and hide its column profiles.
+        """
+        statistics: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        if self.config.include_table_statistics:
+            requested = {request.pretty_name for request in profile_requests}
+            schemas = list(
+                dict.fromkeys(
+                    request.batch_kwargs["schema"] for request in profile_requests
                 )
+            )
+            with self.get_db_connection() as conn:
+                for (
+                    schema_name,
+                    table_name,
+                    row_count,
+                    size,
+                ) in self.get_table_statistics(conn, schemas):
+                    dataset_name = self.config.get_identifier(schema_name, table_name)
+                    if dataset_name in requested:
+                        statistics[dataset_name] = (row_count, size)
+
+        for request, profile in profiler.generate_profiles(
+            profile_requests,
+            self.config.profiling.max_workers,
+            platform=platform,
+            profiler_args=self.get_profile_args(),
+        ):
+            if profile is None:
                 continue
+            dataset_name = request.pretty_name
+            if self.config.include_table_statistics:
+                self.profiled_datasets.add(dataset_name)
+                row_count, size = statistics.get(dataset_name, (None, None))
+                if profile.rowCount is None:
+                    profile.rowCount = row_count
+                if profile.sizeInBytes is None:
+                    profile.sizeInBytes = size
+            dataset_urn = mce_builder.make_dataset_urn_with_platform_instance(
+                self.platform,
+                dataset_name,
+                self.config.platform_instance,
+                self.config.env,
+            )
+            yield MetadataChangeProposalWrapper(
+                entityUrn=dataset_urn, aspect=profile
+            ).as_workunit()
+
+    def get_table_statistics(
+        self, conn: Connection, schema_names: List[str]
+    ) -> Iterable[Tuple[str, str, Optional[int], Optional[int]]]:
+        """Returns the schema, name, row count and size of the tables in the
+        schemas, read from SYS.M_TABLES per batch of schemas."""
+        dialect = conn.dialect
+        query = text(TABLE_SIZES_QUERY).bindparams(bindparam("schemas", expanding=True))
+        schema_names = [
+            dialect.denormalize_name(schema_name) for schema_name in schema_names
+        ]
 
-            if not self.config.schema_pattern.allowed(item.dependent_schema):
-                self.report.report_dropped(
-                    f"{item.dependent_schema}.{item.dependent_view}"
+        batch_size = self.config.prefetch_batch_size
+        for start in range(0, len(schema_names), batch_size):
+            batch = schema_names[start : start + batch_size]
+            for schema_name, table_name, row_count, size in conn.execute(
+                query, {"schemas": batch}
+            ):
+                yield (
+                    dialect.normalize_name(schema_name),
+                    dialect.normalize_name(table_name),
+                    row_count,
+                    size,
                 )
-                logger.debug(
-                    f"Schema pattern is incompatible, dropping: {item.dependent_schema}.{item.dependent_view}"  # noqa: E501
-                )
-                continue
 
-            key = (item.dependent_view, item.dependent_schema)
+    def _get_table_statistics_workunits(
+        self, conn: Connection
+    ) -> Iterable[MetadataWorkUnit]:
+        """Returns a DatasetProfile with the row count and size of every allowed
+        table that was not profiled, read from SYS.M_TABLES per batch of schemas.
 
-            lineage_elements[key].append(
-                mce_builder.make_dataset_urn(
-                    self.platform,
-                    self.config.get_identifier(item.source_schema, item.source_table),
-                    self.config.env,
-                )
+        Only the profile aspect is emitted, the DatasetProperties of the tables
+        are left as reflected.
+        """
+        timestamp_millis = round(time.time() * 1000)
+        for schema_name, table_name, row_count, size in self.get_table_statistics(
+            conn, self.get_column_lineage_schemas(inspect(conn))
+        ):
+            dataset_name = self.config.get_identifier(schema_name, table_name)
+            if not self.config.table_pattern.allowed(dataset_name):
+                continue
+            # the profile of a profiled table already has the statistics
+            if dataset_name in self.profiled_datasets:
+                continue
+
+            profile = DatasetProfileClass(
+                timestampMillis=timestamp_millis,
+                rowCount=row_count,
+                sizeInBytes=size,
             )
-        return lineage_elements
+            wu = MetadataChangeProposalWrapper(
+                entityUrn=self.urns.dataset_urn(schema_name, table_name),
+                aspect=profile,
+            ).as_workunit()
+            self.report.report_workunit(wu)
+            self.instrumentation.count("table_statistics")
+            yield wu
 
-    def _get_view_lineage_workunits(
-        self, conn: Connection
-    ) -> Iterable[MetadataWorkUnit]:
-        """Creates MetadataWorkUnit objects for table lineage based on the
-        downstream and downstream objects from the query results.
+    def get_column_lineage_inspector(self, conn: Connection) -> CachedInspector:
+        """Returns the cached inspector used to extract column lineage.
 
-        Returns an iterable MetadataWorkUnit that are emitted to Datahub.
+        When `prefetch_column_metadata` is enabled, the column metadata of all
+        allowed schemas is loaded up front so that the casing lookups in
+        `get_column_view_lineage_elements` don't hit the database per table.
         """
-        lineage_elements = self._get_view_lineage_elements(conn)
+        with self.instrumentation.timer("column_metadata_prefetch"):
+            return self._get_column_lineage_inspector(conn)
+
+    def _get_column_lineage_inspector(self, conn: Connection) -> CachedInspector:
+        if self.snapshot is not None:
+            return ReplayInspector(self.snapshot, self.config.inspector_cache_max_size)
+
+        inspector = inspect(conn)
+        if not (
+            self.config.prefetch_column_metadata or self.config.stream_view_definitions
+        ):
+            return CachedInspector(inspector, self.config.inspector_cache_max_size)
+
+        prefetched_inspector = PrefetchedInspector(
+            inspector,
+            conn,
+            batch_size=self.config.prefetch_batch_size,
+            fetch_size=self.config.view_definitions_fetch_size,
+            max_size=self.config.inspector_cache_max_size,
+        )
+        if self.config.prefetch_column_metadata:
+            prefetched_inspector.prefetch(
+                self.get_column_metadata_schemas(prefetched_inspector)
+            )
+        return prefetched_inspector
+
+    def get_column_lineage_schemas(self, inspector: Inspector) -> List[str]:
+        """Returns the schemas allowed by `schema_pattern`."""
+        return [
+            schema_name
+            for schema_name in inspector.get_schema_names()
+            if self.config.schema_pattern.allowed(schema_name)
+        ]
 
-        if not lineage_elements:
-            logger.debug("No lineage elements returned.")
-            return None
+    def get_column_metadata_schemas(self, inspector: Inspector) -> List[str]:
+        """Returns the schemas whose columns are needed to resolve the column
+        lineage: the allowed schemas and, when the dependencies of the views can
+        be read, the schemas that their views select from, which may not be
+        allowed themselves."""
+        schemas = self.get_column_lineage_schemas(inspector)
+        if isinstance(inspector, PrefetchedInspector):
+            schemas = list(
+                dict.fromkeys([*schemas, *inspector.get_referenced_schemas(schemas)])
+            )
+        return schemas
 
-        for key, source_tables in lineage_elements.items():
-            dependent_view, dependent_schema = key
+    def get_lineage_query(self) -> str:
+        """Returns the LINEAGE_QUERY ordered by the dependent view, with the
+        schema_pattern and view_pattern pushed down into it as far as possible.
 
-            urn = mce_builder.make_dataset_urn(
-                self.platform,
-                self.config.get_identifier(
-                    dependent_schema,
-                    dependent_view,
-                ),
-                self.config.env,
+        The patterns are still checked for every returned view, the predicates
+        only reduce the number of rows that are returned.
+        """
+        predicates: List[str] = []
+        if self.config.push_down_lineage_filters:
+            predicates = [
+                *pattern_to_sql(self.config.schema_pattern, "dependent_schema"),
+                *pattern_to_sql(self.config.view_pattern, "dependent_view"),
+            ]
+
+        query = f"SELECT * FROM ({LINEAGE_QUERY})"
+        if predicates:
+            conditions = "\n  AND ".join(predicates)
+            query += f" WHERE {conditions}"
+        return query + " ORDER BY dependent_schema, dependent_view"
+
+    def is_view_lineage_allowed(self, dependent_schema: str, dependent_view: str):
+        """Checks the view and schema patterns for a dependent view and reports
+        the view as dropped if it is not allowed."""
+        if not self.config.view_pattern.allowed(dependent_view):
+            self.report.report_dropped(f"{dependent_schema}.{dependent_view}")
+            logger.debug(
+                f"View pattern is incompatible, dropping: {dependent_schema}.{dependent_view}"  # noqa: E501
+            )
+            return False
+
+        if not self.config.schema_pattern.allowed(dependent_schema):
+            self.report.report_dropped(f"{dependent_schema}.{dependent_view}")
+            logger.debug(
+                f"Schema pattern is incompatible, dropping: {dependent_schema}.{dependent_view}"  # noqa: E501
             )
+            return False
 
-            lineage_mce = mce_builder.make_lineage_mce(source_tables, urn)
-            for item in mcps_from_mce(lineage_mce):
-                wu = item.as_workunit()
-                self.report.report_workunit(wu)
-                yield wu
+        return self.is_changed(dependent_schema, dependent_view)
+
+    def _get_view_lineage_elements(
+        self, conn: Connection
+    ) -> Iterable[Tuple[Tuple[str, str], List[str]]]:
+        """Connects to SAP HANA db to run the query statement.
+
+        The query is ordered by the dependent view and its rows are fetched in
+        batches of `view_lineage_fetch_size`. The rows of each view are grouped
+        as they arrive and the view and the urns of its upstream tables are
+        yielded as soon as the rows of the next view start.
+        """
+        query_results = conn.execution_options(stream_results=True).execute(
+            self.get_lineage_query()
+        )
+
+        if not query_results.returns_rows:
+            logger.debug("No rows returned.")
+            return
+
+        key: Optional[Tuple[str, str]] = None
+        allowed = False
+        source_tables: List[str] = []
+
+        # the columns of each row match the fields of ViewLineageEntry
+        while rows := query_results.fetchmany(self.config.view_lineage_fetch_size):
+            for source_table, source_schema, dependent_view, dependent_schema in rows:
+                if key != (dependent_view, dependent_schema):
+                    if source_tables:
+                        yield key, source_tables  # type: ignore
+                    key = (dependent_view, dependent_schema)
+                    allowed = self.is_view_lineage_allowed(
+                        dependent_schema, dependent_view
+                    )
+                    source_tables = []
+
+                if allowed:
+                    source_tables.append(
+                        self.urns.dataset_urn(source_schema, source_table)
+                    )
+
+        if source_tables:
+            yield key, source_tables  # type: ignore
 
     def get_column_lineage_view_definitions(
-        self, inspector: Inspector
+        self, inspector: Inspector, changed_only: bool = True
     ) -> Iterable[View]:
+        """Yields the views of the allowed schemas that have a definition. With
+        `changed_only`, the views that an incremental run skips are left out."""
+
+        def is_included(schema_name: str, view_name: str) -> bool:
+            return not changed_only or self.is_changed(schema_name, view_name)
+
+        if (
+            isinstance(inspector, PrefetchedInspector)
+            and self.config.stream_view_definitions
+        ):
+            for schema_name, view_name, view_sql in inspector.get_view_definitions(
+                self.get_column_lineage_schemas(inspector)
+            ):
+                if view_sql and is_included(schema_name, view_name):
+                    yield View(schema=schema_name, name=view_name, sql=view_sql)
+            return
+
         schema: List[str] = inspector.get_schema_names()  # returns a list
 
         for schema_name in schema:
@@ -243,6 +953,9 @@ class HanaSource(SQLAlchemySource):
                 )  # returns a list
 
                 for view_name in views:
+                    if not is_included(schema_name, view_name):
+                        continue
+
                     view_sql: str = inspector.get_view_definition(
                         view_name, schema_name
                     )
@@ -254,21 +967,6 @@ class HanaSource(SQLAlchemySource):
                             sql=view_sql,
                         )
 
-    def _get_column_lineage_for_view(self, view_sql: str) -> List[Node]:
-        """Extracts the columns and the sql definitions of a downstream view to build
-        a lineage graph.
-        """
-
-        expression: DerivedTable = parse_one(view_sql)  # type: ignore
-        selected_columns: List[str] = expression.named_selects
-
-        view_sql = view_sql.lower()
-        lineages = [
-            lineage(col_name.lower(), view_sql) for col_name in selected_columns
-        ]
-
-        return lineages
-
     def get_column_view_lineage_elements(
         self, inspector: Inspector
     ) -> Iterable[
@@ -283,58 +981,169 @@ class HanaSource(SQLAlchemySource):
         calculate/transform the downstream column).
 
         """
-        for view in self.get_column_lineage_view_definitions(inspector):
-            column_lineage: List[
-                Tuple[DownstreamLineageField, List[UpstreamLineageField]]
-            ] = []
-
-            column_lineages = self._get_column_lineage_for_view(view.sql)
-
-            downstream_table_metadata = get_table_schema(
-                inspector, view.name, view.schema
+        if not isinstance(inspector, CachedInspector):
+            inspector = CachedInspector(inspector, self.config.inspector_cache_max_size)
+
+        # the views are resolved against the catalog of the inspector. With
+        # prefetched columns, they are resolved against the prefetched columns
+        # only, in this process as well as in worker processes, so the lineage
+        # doesn't depend on the number of workers.
+        catalog: Catalog = inspector
+        if (
+            isinstance(inspector, PrefetchedInspector)
+            and self.config.prefetch_column_metadata
+        ):
+            catalog = inspector.get_catalog()
+        workers = self.config.column_lineage_workers
+        timeout = self.config.column_lineage_timeout
+        if workers > 1 or timeout is not None:
+            if catalog is inspector:
+                logger.warning(
+                    "column_lineage_workers and column_lineage_timeout require "
+                    "prefetch_column_metadata, the views are parsed in the "
+                    "ingestion process without a timeout."
+                )
+                workers = 0
+                timeout = None
+
+        views: Iterable[View]
+        resolver: Optional[TransitiveLineageResolver] = None
+        if self.config.column_lineage_transitive:
+            views, resolver = self.get_transitive_lineage_resolver(inspector)
+        else:
+            views = self.get_column_lineage_view_definitions(inspector)
+        views = self.instrumentation.timed_iter("view_definitions", views)
+
+        def on_skip(view: View, reason: str) -> None:
+            self.report_column_lineage_skipped(view, reason)
+            if resolver:
+                resolver.skip(view.schema, view.name)
+
+        cache = None
+        if self.config.column_lineage_cache_dir:
+            cache = LineageCache(
+                self.config.column_lineage_cache_dir,
+                self.config.column_lineage_cache_max_size_mb * 1024 * 1024,
+                catalog=catalog,
             )
 
-            # lineage_node represents the lineage of 1 column in sqlglot
-            # lineage_node.downstream is the datahub upstream each element
-            # of lineage_node.downstream is a node that represents a column
-            # in the source table
-
-            for lineage_node in column_lineages:
-                downstream = DownstreamLineageField(
-                    name=lineage_node.name,
-                    dataset=view,
+        # each item of view_lineage is the name of 1 column in the view and
+        # the columns in the source tables that it is calculated from, the
+        # column names already have the casing they have in the database.
+        view_lineages = iter_view_lineage(
+            views,
+            workers=workers,
+            max_in_flight=self.config.column_lineage_max_in_flight,
+            cache=cache,
+            catalog=catalog,
+            timeout=timeout,
+            max_ast_nodes=self.config.column_lineage_max_ast_nodes,
+            on_skip=on_skip,
+            on_parsed=self.report_view_parsed,
+        )
+        for view, view_lineage in self.instrumentation.timed_iter(
+            "column_lineage_parsing", view_lineages
+        ):
+            if resolver:
+                with self.instrumentation.timer("transitive_lineage"):
+                    view_lineage = resolver.resolve(view, view_lineage)
+            yield view, [
+                (
+                    DownstreamLineageField(name=column_name, dataset=view),
+                    upstream_fields,
                 )
-
-                # checks the casing for the downstream column based on the db value
-                downstream_column_metadata = downstream_table_metadata[
-                    lineage_node.name.lower()
-                ]
-                downstream.name = downstream_column_metadata["name"]
-
-                upstream_fields_list = [
-                    UpstreamLineageField.from_node(column_node, view.schema)
-                    for column_node in lineage_node.downstream
-                ]
-
-                # for each column we need to look up the name of the column
-                # with the correct casing as it is in the database.
-                # the inspector implementation should have caching to avoid
-                # hitting the database for each column. We need the actual casing
-                # from the inspector so that the Datahub URN we generate matches
-                # the URN from the base SQLAlchemy source implementation.
-                for column in upstream_fields_list:
-                    # checks the casing for the upstream column based on the db value
-                    source_table_metadata = get_table_schema(
-                        inspector, column.dataset.name, column.dataset.schema
-                    )
-                    column_metadata = source_table_metadata[column.name.lower()]
-                    column.name = column_metadata["name"]
-
                 # we only have lineage information if there are "upstream" fields
-                if len(lineage_node.downstream) > 0:
-                    column_lineage.append((downstream, upstream_fields_list))
+                for column_name, upstream_fields in view_lineage
+                if upstream_fields
+            ]
+
+        if cache:
+            self.instrumentation.count("lineage_cache_hits", cache.hits)
+            self.instrumentation.count("lineage_cache_misses", cache.misses)
+
+    def report_view_parsed(self, view: View, seconds: float) -> None:
+        self.instrumentation.count("views_parsed")
+        self.instrumentation.observe(
+            "view_parse_seconds", seconds, f"{view.schema}.{view.name}"
+        )
+
+    def report_column_lineage_skipped(self, view: View, reason: str) -> None:
+        """Reports a view whose column lineage was not extracted. The view still
+        gets table lineage when `include_view_lineage` is enabled."""
+        logger.warning(
+            f"Skipping column lineage of view {view.schema}.{view.name}: {reason}"
+        )
+        self.report.report_column_lineage_skipped(f"{view.schema}.{view.name}", reason)
+
+    def get_transitive_lineage_resolver(
+        self, inspector: Inspector
+    ) -> Tuple[Iterable[View], TransitiveLineageResolver]:
+        """Orders the views by their dependencies in SYS.OBJECT_DEPENDENCIES and
+        returns their definitions in that order, with the resolver of their
+        transitive lineage.
+
+        Only the names of the views are ordered, their definitions are read
+        afterwards while the views are processed. Views in a dependency cycle
+        are returned last, their lineage is not resolved transitively.
+        """
+        with self.get_db_connection() as conn:
+            dependencies = get_view_dependencies(conn)
+
+        schemas = self.get_column_lineage_schemas(inspector)
+        if isinstance(inspector, PrefetchedInspector):
+            names = inspector.get_schema_view_names(schemas)
+        else:
+            names = [
+                (schema_name, view_name)
+                for schema_name in schemas
+                for view_name in inspector.get_view_names(schema_name)
+            ]
+        names = [name for name in names if self.is_changed(*name)]
+        ordered, cyclic = topological_order(names, dependencies)
+        if cyclic:
+            self.report.report_warning(
+                "column-lineage",
+                f"{len(cyclic)} views are part of a dependency cycle or depend on "
+                "one, their column lineage is not resolved transitively: "
+                + ", ".join(f"{schema}.{name}" for schema, name in cyclic[:10]),
+            )
+        resolver = TransitiveLineageResolver(
+            ordered, dependencies, self.config.column_lineage_max_depth
+        )
+        return (
+            self.get_ordered_view_definitions(inspector, ordered + cyclic, resolver),
+            resolver,
+        )
+
+    def get_ordered_view_definitions(
+        self,
+        inspector: Inspector,
+        names: List[Tuple[str, str]],
+        resolver: TransitiveLineageResolver,
+    ) -> Iterable[View]:
+        """Yields the definitions of the views in the order of `names`. Views
+        without a definition are skipped by the resolver."""
+        definitions: Iterable[Tuple[str, str, Optional[str]]]
+        if (
+            isinstance(inspector, PrefetchedInspector)
+            and self.config.stream_view_definitions
+        ):
+            definitions = inspector.get_view_definitions_by_name(names)
+        else:
+            definitions = (
+                (
+                    schema_name,
+                    view_name,
+                    inspector.get_view_definition(view_name, schema_name),
+                )
+                for schema_name, view_name in names
+            )
 
-            yield view, column_lineage
+        for schema_name, view_name, view_sql in definitions:
+            if view_sql:
+                yield View(schema=schema_name, name=view_name, sql=view_sql)
+            else:
+                resolver.skip(schema_name, view_name)
 
     def build_fine_grained_lineage(
         self, inspector: Inspector
@@ -346,93 +1155,159 @@ class HanaSource(SQLAlchemySource):
         URNs created during lineage generation.
         """
 
-        upstream_type = FineGrainedLineageUpstreamType.FIELD_SET
-        downstream_type = FineGrainedLineageDownstreamType.FIELD
-
         for (
             view,
             lineage_items,
         ) in self.get_column_view_lineage_elements(inspector):
-            column_lineages: List[FineGrainedLineage] = []
             seen_upstream_datasets: Set[str] = set()
 
-            downstream_dataset_urn = builder.make_dataset_urn(
-                platform=self.platform,
-                name=self.config.get_identifier(
-                    view.schema,
-                    view.name,
-                ),
-                env=self.config.env,
-            )
+            downstream_dataset_urn = self.urns.dataset_urn(view.schema, view.name)
+
+            # the upstream field urns of each downstream column, the dict keys
+            # drop duplicate upstreams and keep them in query order
+            upstreams_by_column: Dict[str, Dict[str, None]] = {}
 
             for downstream_field, upstream_fields in lineage_items:
-                # upstream_column/s should be dependent on the existence of
-                # downstream_field attached to it
-                upstream_columns: List[Any] = []
+                upstream_columns = upstreams_by_column.setdefault(
+                    self.urns.schema_field_urn(
+                        downstream_dataset_urn, downstream_field.name
+                    ),
+                    {},
+                )
 
                 for upstream_field in upstream_fields:
-                    upstream_dataset_urn = builder.make_dataset_urn(
-                        platform=self.platform,
-                        name=self.config.get_identifier(
-                            upstream_field.dataset.schema, upstream_field.dataset.name
-                        ),
-                        env=self.config.env,
+                    upstream_dataset_urn = self.urns.dataset_urn(
+                        upstream_field.dataset.schema, upstream_field.dataset.name
                     )
 
                     seen_upstream_datasets.add(upstream_dataset_urn)
-                    upstream_columns.append(
-                        builder.make_schema_field_urn(
+                    upstream_columns[
+                        self.urns.schema_field_urn(
                             upstream_dataset_urn, upstream_field.name
                         )
-                    )
+                    ] = None
 
-                    column_lineages.append(
-                        FineGrainedLineage(
-                            downstreamType=downstream_type,
-                            downstreams=[
-                                builder.make_schema_field_urn(
-                                    downstream_dataset_urn, downstream_field.name
-                                )
-                            ],
-                            upstreamType=upstream_type,
-                            upstreams=upstream_columns,
-                        )
-                    )
+            column_lineages = self.make_fine_grained_lineages(upstreams_by_column)
 
             yield column_lineages, seen_upstream_datasets, downstream_dataset_urn
 
-    def _get_column_lineage_workunits(
-        self, inspector: Inspector
-    ) -> Iterable[MetadataWorkUnit]:
-        """Returns an iterable of MetadataChangeProposalWrapper object that contains
-        column lineage information that is sent to Datahub after each iteration of
-        the loop. The object is built with column lineages, upstream datasets, and
-        downstream dataset URNs from the create_column_lineage method.
+    def make_fine_grained_lineages(
+        self, upstreams_by_column: Dict[str, Dict[str, None]]
+    ) -> List[FineGrainedLineage]:
+        """Returns one FineGrainedLineage per downstream column.
+
+        With `merge_column_lineage` enabled, the downstream columns that have the
+        same set of upstream columns share one FineGrainedLineage instead.
         """
-        for (
-            column_lineages,
-            upstream_datasets,
-            downstream_dataset_urn,
-        ) in self.build_fine_grained_lineage(inspector):
-            fieldLineages = UpstreamLineage(
-                fineGrainedLineages=column_lineages,
-                upstreams=[
-                    Upstream(dataset=dataset_urn, type=DatasetLineageType.TRANSFORMED)
-                    for dataset_urn in list(upstream_datasets)
-                ],
-            )
-            proposal = MetadataChangeProposalWrapper(
-                entityUrn=downstream_dataset_urn, aspect=fieldLineages
+        if not self.config.merge_column_lineage:
+            return [
+                FineGrainedLineage(
+                    downstreamType=FineGrainedLineageDownstreamType.FIELD,
+                    downstreams=[downstream],
+                    upstreamType=FineGrainedLineageUpstreamType.FIELD_SET,
+                    upstreams=list(upstreams),
+                )
+                for downstream, upstreams in upstreams_by_column.items()
+            ]
+
+        downstreams_by_upstreams: Dict[FrozenSet[str], List[str]] = {}
+        upstream_lists: Dict[FrozenSet[str], List[str]] = {}
+        for downstream, upstreams in upstreams_by_column.items():
+            key = frozenset(upstreams)
+            downstreams_by_upstreams.setdefault(key, []).append(downstream)
+            upstream_lists.setdefault(key, list(upstreams))
+
+        return [
+            FineGrainedLineage(
+                downstreamType=(
+                    FineGrainedLineageDownstreamType.FIELD_SET
+                    if len(downstreams) > 1
+                    else FineGrainedLineageDownstreamType.FIELD
+                ),
+                downstreams=downstreams,
+                upstreamType=FineGrainedLineageUpstreamType.FIELD_SET,
+                upstreams=upstream_lists[key],
             )
-            wu = proposal.as_workunit()
-            self.report.report_workunit(wu)
-            yield wu
-
+            for key, downstreams in downstreams_by_upstreams.items()
+        ]
 
-@cache
-def get_table_schema(inspector: Inspector, table_name: str, schema_name: str) -> Dict:
-    """Returns a dictionary that contains the schema information of a table."""
-    return {
-        column["name"].lower(): column
-        for column in inspector.get_columns(table_name, schema_name)
-    }
+    def _get_lineage_workunits(self, conn: Connection) -> Iterable[MetadataWorkUnit]:
+        """Visits every view once and emits a single UpstreamLineage aspect per view.
+
+        Without column lineage, the aspect of each view is emitted as soon as its
+        rows of the view lineage query have been read. With column lineage, the
+        upstream tables of the view lineage are collected first and merged into
+        the aspect of the view's column lineage. The two passes can't be joined
+        as streams, because the views of the column lineage pass are not in the
+        order of the view lineage query: they are parsed out of order by worker
+        processes, in dependency order for transitive lineage, and sorted by
+        their uppercase names. Views that only have view lineage, for example
+        because their SQL could not be parsed, are emitted afterwards.
+        """
+        view_lineage_elements = self.instrumentation.timed_iter(
+            "object_dependencies", self._get_view_lineage_elements(conn)
+        )
+        if not self.config.include_column_lineage:
+            if self.config.include_view_lineage:
+                for (
+                    dependent_view,
+                    dependent_schema,
+                ), source_tables in view_lineage_elements:
+                    yield self.make_upstream_lineage_workunit(
+                        self.urns.dataset_urn(dependent_schema, dependent_view),
+                        source_tables,
+                    )
+            return
+
+        upstreams_by_view: Dict[str, List[str]] = {}
+        if self.config.include_view_lineage:
+            for (
+                dependent_view,
+                dependent_schema,
+            ), source_tables in view_lineage_elements:
+                urn = self.urns.dataset_urn(dependent_schema, dependent_view)
+                upstreams_by_view[urn] = source_tables
+
+        self.column_lineage_inspector = self.get_column_lineage_inspector(conn)
+        try:
+            for (
+                column_lineages,
+                upstream_datasets,
+                downstream_dataset_urn,
+            ) in self.build_fine_grained_lineage(self.column_lineage_inspector):
+                # the dict keys merge both upstream lists in order
+                upstreams = dict.fromkeys(
+                    upstreams_by_view.pop(downstream_dataset_urn, [])
+                )
+                upstreams.update(dict.fromkeys(sorted(upstream_datasets)))
+                yield self.make_upstream_lineage_workunit(
+                    downstream_dataset_urn, list(upstreams), column_lineages
+                )
+        finally:
+            self.close_column_lineage_inspector()
+
+        for urn, source_tables in upstreams_by_view.items():
+            yield self.make_upstream_lineage_workunit(urn, source_tables)
+
+    def make_upstream_lineage_workunit(
+        self,
+        downstream_dataset_urn: str,
+        upstream_dataset_urns: List[str],
+        column_lineages: Optional[List[FineGrainedLineage]] = None,
+    ) -> MetadataWorkUnit:
+        """Returns the workunit of the UpstreamLineage aspect of a view."""
+        upstream_lineage = UpstreamLineage(
+            fineGrainedLineages=column_lineages,
+            upstreams=[
+                Upstream(dataset=dataset_urn, type=DatasetLineageType.TRANSFORMED)
+                for dataset_urn in upstream_dataset_urns
+            ],
+        )
+        proposal = MetadataChangeProposalWrapper(
+            entityUrn=downstream_dataset_urn, aspect=upstream_lineage
+        )
+        wu = proposal.as_workunit()
+        self.report.report_workunit(wu)
+        self.instrumentation.count("lineage_aspects")
+        self.instrumentation.count("fine_grained_lineages", len(column_lineages or []))
+        return wu
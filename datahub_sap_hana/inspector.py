@@ -1,5 +1,9 @@
-from functools import cache
-from typing import Dict, List, Optional, Protocol, TypedDict
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple, TypedDict
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.lru_cache import LRUCache, cached_method
 
 ColumnDescription = TypedDict(
     "ColumnDescription",
@@ -37,17 +41,41 @@ class Inspector(Protocol):
         ...
 
 
+class Catalog(Protocol):
+    """
+    A protocol describing a source of table schemas, implemented by
+    CachedInspector and PrefetchedCatalog.
+    """
+
+    def get_table_schema(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> Dict[str, ColumnDescription]:
+        """Returns the columns of a table keyed by their lowercase name."""
+        ...
+
+
 class CachedInspector:
-    def __init__(self, inspector: Inspector):
+    """
+    An inspector that caches the results of the wrapped inspector.
+
+    The results are kept in an LRUCache of at most `max_size` entries that is
+    owned by this instance, `close` empties it.
+    """
+
+    def __init__(self, inspector: Inspector, max_size: int = 10000):
         self.inspector = inspector
+        self.cache = LRUCache(max_size)
+
+    def close(self) -> None:
+        self.cache.clear()
 
-    @cache
+    @cached_method
     def get_columns(
         self, table_name: str, schema: Optional[str] = None
     ) -> List[ColumnDescription]:
         return self.inspector.get_columns(table_name, schema)
 
-    @cache
+    @cached_method
     def get_table_schema(
         self, table_name: str, schema: Optional[str] = None
     ) -> Dict[str, ColumnDescription]:
@@ -56,18 +84,279 @@ class CachedInspector:
             for column in self.get_columns(table_name, schema)
         }
 
-    @cache
+    @cached_method
     def get_table_names(self, schema: Optional[str] = None) -> List[str]:
         return self.inspector.get_table_names(schema)
 
-    @cache
+    @cached_method
     def get_schema_names(self) -> List[str]:
         return self.inspector.get_schema_names()
 
-    @cache
+    @cached_method
     def get_view_names(self, schema: Optional[str] = None) -> List[str]:
         return self.inspector.get_view_names(schema)
 
-    @cache
+    @cached_method
     def get_view_definition(self, view_name: str, schema: Optional[str] = None) -> str:
         return self.inspector.get_view_definition(view_name, schema)
+
+
+# Reads the column metadata of every table and view in a batch of schemas. The
+# column list mirrors the one used by sqlalchemy-hana's `get_columns`.
+COLUMNS_QUERY = """
+SELECT SCHEMA_NAME, TABLE_NAME, COLUMN_NAME, DATA_TYPE_NAME, DEFAULT_VALUE,
+       IS_NULLABLE, COMMENTS
+  FROM (
+    SELECT SCHEMA_NAME, TABLE_NAME, COLUMN_NAME, POSITION, DATA_TYPE_NAME,
+           DEFAULT_VALUE, IS_NULLABLE, COMMENTS
+      FROM SYS.TABLE_COLUMNS
+    UNION ALL
+    SELECT SCHEMA_NAME, VIEW_NAME AS TABLE_NAME, COLUMN_NAME, POSITION,
+           DATA_TYPE_NAME, DEFAULT_VALUE, IS_NULLABLE, COMMENTS
+      FROM SYS.VIEW_COLUMNS
+  ) AS COLUMNS
+WHERE SCHEMA_NAME IN :schemas
+ORDER BY SCHEMA_NAME, TABLE_NAME, POSITION
+"""
+
+# Reads the definitions of every view in a batch of schemas.
+VIEWS_QUERY = """
+SELECT SCHEMA_NAME, VIEW_NAME, DEFINITION
+  FROM SYS.VIEWS
+WHERE SCHEMA_NAME IN :schemas
+ORDER BY SCHEMA_NAME, VIEW_NAME
+"""
+
+# Reads the names of every view in a batch of schemas.
+VIEW_NAMES_QUERY = """
+SELECT SCHEMA_NAME, VIEW_NAME
+  FROM SYS.VIEWS
+WHERE SCHEMA_NAME IN :schemas
+ORDER BY SCHEMA_NAME, VIEW_NAME
+"""
+
+# Reads the definitions of a batch of views. The views of the schemas that have
+# the same names as views of the batch are returned too.
+VIEW_DEFINITIONS_QUERY = """
+SELECT SCHEMA_NAME, VIEW_NAME, DEFINITION
+  FROM SYS.VIEWS
+WHERE SCHEMA_NAME IN :schemas
+  AND VIEW_NAME IN :views
+"""
+
+# Reads the schemas of the tables and views that the views in a batch of
+# schemas select from.
+REFERENCED_SCHEMAS_QUERY = """
+SELECT DISTINCT BASE_SCHEMA_NAME
+  FROM SYS.OBJECT_DEPENDENCIES
+WHERE DEPENDENT_SCHEMA_NAME IN :schemas
+  AND DEPENDENT_OBJECT_TYPE = 'VIEW'
+"""
+
+# Number of characters read at a time from a view definition LOB.
+LOB_CHUNK_SIZE = 64 * 1024
+
+
+def read_lob(value: Any, chunk_size: int = LOB_CHUNK_SIZE) -> Optional[str]:
+    """Returns the content of a LOB column value.
+
+    hdbcli returns NCLOB columns such as SYS.VIEWS.DEFINITION as LOB objects
+    unless they are converted by SQLAlchemy, these are read in chunks. Other
+    values are returned unchanged.
+    """
+    if not hasattr(value, "read"):
+        return value
+
+    chunks: List[str] = []
+    while True:
+        chunk = value.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return "".join(chunks)
+
+
+class PrefetchedCatalog:
+    """
+    The prefetched column metadata of a PrefetchedInspector.
+
+    It only holds plain data and never queries the database, so it can be sent
+    to worker processes.
+    """
+
+    def __init__(self, columns_index: Dict[Tuple[str, str], List[ColumnDescription]]):
+        self.columns_index = columns_index
+        self.table_schemas: Dict[Tuple[str, str], Dict[str, ColumnDescription]] = {}
+
+    def get_table_schema(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> Dict[str, ColumnDescription]:
+        key = ((schema or "").lower(), table_name.lower())
+        table_schema = self.table_schemas.get(key)
+        if table_schema is None:
+            table_schema = {
+                column["name"].lower(): column
+                for column in self.columns_index.get(key, [])
+            }
+            self.table_schemas[key] = table_schema
+        return table_schema
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the table schemas are derived from the index, they are not sent to
+        # the worker processes
+        return {"columns_index": self.columns_index, "table_schemas": {}}
+
+
+class PrefetchedInspector(CachedInspector):
+    """
+    A CachedInspector that serves `get_columns` from an in-memory index.
+
+    The index is filled by `prefetch`, which reads SYS.TABLE_COLUMNS and
+    SYS.VIEW_COLUMNS for whole batches of schemas at once instead of sending
+    one query per table. Lookups are case-insensitive, tables that were not
+    prefetched fall back to the wrapped inspector.
+    """
+
+    def __init__(
+        self,
+        inspector: Inspector,
+        conn: Connection,
+        batch_size: int = 50,
+        fetch_size: int = 100,
+        max_size: int = 10000,
+    ):
+        super().__init__(inspector, max_size)
+        self.conn = conn
+        self.batch_size = batch_size
+        self.fetch_size = fetch_size
+        self.columns_index: Dict[Tuple[str, str], List[ColumnDescription]] = {}
+
+    def prefetch(self, schemas: Iterable[str]) -> None:
+        """Loads the columns of all tables and views in the given schemas."""
+        dialect = self.conn.dialect
+        query = text(COLUMNS_QUERY).bindparams(bindparam("schemas", expanding=True))
+
+        schema_names = [dialect.denormalize_name(schema) for schema in schemas]
+        for start in range(0, len(schema_names), self.batch_size):
+            batch = schema_names[start : start + self.batch_size]
+            for row in self.conn.execute(query, {"schemas": batch}):
+                key = (row[0].lower(), row[1].lower())
+                self.columns_index.setdefault(key, []).append(
+                    {
+                        "name": dialect.normalize_name(row[2]),
+                        "type": row[3],
+                        "default": row[4],
+                        "nullable": row[5] == "TRUE",
+                        "comment": row[6],
+                    }
+                )
+
+    def get_referenced_schemas(self, schemas: Iterable[str]) -> List[str]:
+        """Returns the schemas of the tables and views that the views in the
+        given schemas select from."""
+        dialect = self.conn.dialect
+        query = text(REFERENCED_SCHEMAS_QUERY).bindparams(
+            bindparam("schemas", expanding=True)
+        )
+
+        referenced_schemas: Dict[str, None] = {}
+        schema_names = [dialect.denormalize_name(schema) for schema in schemas]
+        for start in range(0, len(schema_names), self.batch_size):
+            batch = schema_names[start : start + self.batch_size]
+            for (schema_name,) in self.conn.execute(query, {"schemas": batch}):
+                referenced_schemas[dialect.normalize_name(schema_name)] = None
+        return list(referenced_schemas)
+
+    def get_view_definitions(
+        self, schemas: Iterable[str]
+    ) -> Iterable[Tuple[str, str, Optional[str]]]:
+        """Yields the schema, name and definition of every view in the given schemas.
+
+        SYS.VIEWS is read with one query per batch of schemas and the rows are
+        fetched `fetch_size` at a time, so definitions are yielded while they
+        arrive instead of being collected first.
+        """
+        dialect = self.conn.dialect
+        query = text(VIEWS_QUERY).bindparams(bindparam("schemas", expanding=True))
+
+        schema_names = [dialect.denormalize_name(schema) for schema in schemas]
+        for start in range(0, len(schema_names), self.batch_size):
+            batch = schema_names[start : start + self.batch_size]
+            result = self.conn.execution_options(stream_results=True).execute(
+                query, {"schemas": batch}
+            )
+            while rows := result.fetchmany(self.fetch_size):
+                for schema_name, view_name, definition in rows:
+                    yield (
+                        dialect.normalize_name(schema_name),
+                        dialect.normalize_name(view_name),
+                        read_lob(definition),
+                    )
+
+    def get_schema_view_names(self, schemas: Iterable[str]) -> List[Tuple[str, str]]:
+        """Returns the schema and name of every view in the given schemas, read
+        from SYS.VIEWS with one query per batch of schemas."""
+        dialect = self.conn.dialect
+        query = text(VIEW_NAMES_QUERY).bindparams(bindparam("schemas", expanding=True))
+
+        names: List[Tuple[str, str]] = []
+        schema_names = [dialect.denormalize_name(schema) for schema in schemas]
+        for start in range(0, len(schema_names), self.batch_size):
+            batch = schema_names[start : start + self.batch_size]
+            for schema_name, view_name in self.conn.execute(query, {"schemas": batch}):
+                names.append(
+                    (
+                        dialect.normalize_name(schema_name),
+                        dialect.normalize_name(view_name),
+                    )
+                )
+        return names
+
+    def get_view_definitions_by_name(
+        self, views: Iterable[Tuple[str, str]]
+    ) -> Iterable[Tuple[str, str, Optional[str]]]:
+        """Yields the schema, name and definition of the given views in their
+        order, the definition is None for views that don't exist.
+
+        SYS.VIEWS is read with one query per `fetch_size` views, so only the
+        definitions of one batch are held in memory.
+        """
+        dialect = self.conn.dialect
+        query = text(VIEW_DEFINITIONS_QUERY).bindparams(
+            bindparam("schemas", expanding=True), bindparam("views", expanding=True)
+        )
+
+        names = list(views)
+        for start in range(0, len(names), self.fetch_size):
+            batch = names[start : start + self.fetch_size]
+            params = {
+                "schemas": list({dialect.denormalize_name(name[0]) for name in batch}),
+                "views": list({dialect.denormalize_name(name[1]) for name in batch}),
+            }
+            definitions = {
+                (
+                    dialect.normalize_name(schema_name),
+                    dialect.normalize_name(view_name),
+                ): read_lob(definition)
+                for schema_name, view_name, definition in self.conn.execute(
+                    query, params
+                )
+            }
+            for schema_name, view_name in batch:
+                yield schema_name, view_name, definitions.get((schema_name, view_name))
+
+    def get_columns(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> List[ColumnDescription]:
+        columns = self.columns_index.get(((schema or "").lower(), table_name.lower()))
+        if columns is not None:
+            return columns
+        return super().get_columns(table_name, schema)
+
+    def get_catalog(self) -> PrefetchedCatalog:
+        """Returns the prefetched columns as a catalog for worker processes."""
+        return PrefetchedCatalog(self.columns_index)
+
+    def close(self) -> None:
+        super().close()
+        self.columns_index.clear()
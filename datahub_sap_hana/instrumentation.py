@@ -0,0 +1,114 @@
+import heapq
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram:
+    """Records observed values, such as the parse time of each view, and keeps
+    the labels of the `slowest` largest values."""
+
+    def __init__(self, slowest: int = 10):
+        self.values: List[float] = []
+        self.slowest = slowest
+        self.largest: List[Tuple[float, str]] = []
+
+    def observe(self, value: float, label: Optional[str] = None) -> None:
+        self.values.append(value)
+        if label is None:
+            return
+        if len(self.largest) < self.slowest:
+            heapq.heappush(self.largest, (value, label))
+        elif value > self.largest[0][0]:
+            heapq.heapreplace(self.largest, (value, label))
+
+    def percentile(self, percentile: float) -> float:
+        """Returns the nearest-rank percentile of the observed values."""
+        if not self.values:
+            return 0.0
+        values = sorted(self.values)
+        rank = max(round(percentile / 100 * len(values)) - 1, 0)
+        return values[rank]
+
+    def as_obj(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "count": len(self.values),
+            "total": round(sum(self.values), 6),
+            "max": max(self.values, default=0.0),
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = self.percentile(percentile)
+        if self.largest:
+            summary["largest"] = {
+                label: value for value, label in sorted(self.largest, reverse=True)
+            }
+        return summary
+
+
+class Instrumentation:
+    """Collects the time spent in each stage of a run, counters and histograms.
+
+    Stage timers can be nested, the time of a stage excludes the time of the
+    stages that run within it. Generators are timed with `timed_iter`, which
+    only counts the time spent producing their items.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.slowest = slowest
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        # the time spent in nested stages of each running stage
+        self._nested: List[float] = []
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yields the items of `iterable` and times the stage that produces them."""
+        iterator = iter(iterable)
+        while True:
+            with self.timer(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, counter: str, value: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def observe(self, histogram: str, value: float, label: Optional[str] = None):
+        if histogram not in self.histograms:
+            self.histograms[histogram] = Histogram(self.slowest)
+        self.histograms[histogram].observe(value, label)
+
+    def as_obj(self) -> Dict[str, Any]:
+        return {
+            "timings": {
+                stage: round(seconds, 6) for stage, seconds in self.timings.items()
+            },
+            "counters": dict(self.counters),
+            "histograms": {
+                name: histogram.as_obj() for name, histogram in self.histograms.items()
+            },
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_obj(), f, indent=2)
@@ -0,0 +1,542 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.queues import SimpleQueue
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from sqlglot import exp, parse_one
+from sqlglot.errors import SqlglotError
+from sqlglot.lineage import Node
+from sqlglot.optimizer import Scope, build_scope, qualify
+
+from datahub_sap_hana.column_lineage_schema import (
+    ColumnLineage,
+    Table,
+    UpstreamLineageField,
+    View,
+)
+from datahub_sap_hana.inspector import Catalog
+from datahub_sap_hana.lineage_cache import LineageCache
+
+# The catalog of a worker process, it is set once per process by the pool
+# initializer instead of being sent with every view.
+_worker_catalog: Optional[Catalog] = None
+
+
+def _init_worker(catalog: Optional[Catalog], pids: "SimpleQueue[int]") -> None:
+    """Sets the catalog of a worker process and reports its process id to the
+    pool, so that the pool can terminate it."""
+    global _worker_catalog
+    _worker_catalog = catalog
+    pids.put(os.getpid())
+
+
+def catalog_schema(
+    expression: exp.Expression, catalog: Catalog, default_schema: str
+) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """Returns a sqlglot schema mapping with the columns of every table that the
+    expression selects from, as far as they are known to the catalog.
+
+    The view SQL is lowercased, so the mapping uses lowercase names too.
+    """
+    ctes = {cte.alias for cte in expression.find_all(exp.CTE)}
+
+    mapping: Dict[str, Dict[str, Dict[str, str]]] = {}
+    for table in expression.find_all(exp.Table):
+        schema_name = table.db or default_schema
+        if not table.db and table.name in ctes:
+            continue
+        if table.name in mapping.get(schema_name, {}):
+            continue
+
+        table_schema = catalog.get_table_schema(table.name, schema_name)
+        if table_schema:
+            # the column types are not used to resolve lineage
+            mapping.setdefault(schema_name, {})[table.name] = {
+                column_name: "UNKNOWN" for column_name in table_schema
+            }
+    return mapping
+
+
+class ViewTooComplexError(Exception):
+    """Raised when a view is too large to extract its column lineage."""
+
+
+def column_lineage(
+    view_sql: str,
+    catalog: Optional[Catalog] = None,
+    default_schema: Optional[str] = None,
+    max_ast_nodes: Optional[int] = None,
+) -> List[Node]:
+    """Builds the sqlglot lineage nodes of every selected column of a view.
+
+    This is equivalent to calling `sqlglot.lineage.lineage(column, view_sql)` for
+    each of the named selects of the view, but the SQL is parsed, qualified and
+    turned into a scope tree only once. Every column is then resolved against
+    the same scope tree and the lineage of columns of derived tables that are
+    referenced more than once is only resolved once.
+
+    When a `catalog` is given, the columns of the tables that the view selects
+    from are passed to sqlglot, so that unqualified columns are resolved to the
+    right table and `*` is expanded into the columns of the tables. Unqualified
+    tables are looked up in `default_schema`.
+
+    The view SQL is lowercased before parsing, the node names are therefore
+    lowercase too. Views with more than `max_ast_nodes` AST nodes raise a
+    ViewTooComplexError before they are resolved.
+    """
+    expression = parse_one(view_sql.lower())
+    if max_ast_nodes is not None:
+        ast_nodes = sum(1 for _ in expression.walk())
+        if ast_nodes > max_ast_nodes:
+            raise ViewTooComplexError(
+                f"the view has {ast_nodes} AST nodes, the limit is {max_ast_nodes}"
+            )
+    is_star = any(select.is_star for select in expression.selects)
+    selected_columns: List[str] = expression.named_selects  # type: ignore
+
+    schema = None
+    if catalog is not None and default_schema is not None:
+        default_schema = default_schema.lower()
+        schema = catalog_schema(expression, catalog, default_schema)
+
+    qualified = qualify.qualify(
+        expression,
+        db=default_schema if schema else None,
+        schema=schema,
+        validate_qualify_columns=False,
+        identify=False,
+    )
+    if is_star:
+        selected_columns = qualified.named_selects  # type: ignore
+    scope = build_scope(qualified)
+
+    if not scope:
+        raise SqlglotError("Cannot build lineage, sql must be SELECT")
+
+    resolver = _ScopeLineageResolver()
+    return [resolver.to_node(column_name, scope) for column_name in selected_columns]
+
+
+def _column_name(catalog: Optional[Catalog], table: Table, column_name: str) -> str:
+    """Returns the name of a column with the casing it has in the database."""
+    if catalog is None:
+        return column_name
+    column = catalog.get_table_schema(table.name, table.schema).get(column_name)
+    return column["name"] if column else column_name
+
+
+def resolve_view_lineage(
+    view: View,
+    catalog: Optional[Catalog] = None,
+    max_ast_nodes: Optional[int] = None,
+) -> List[ColumnLineage]:
+    """Resolves the lineage of every selected column of a view.
+
+    The columns are resolved against the `catalog`, in a worker process against
+    the catalog of the process. The column names are lowercase, see
+    `restore_column_casing`.
+
+    Raises ViewTooComplexError if the parsed view has more than `max_ast_nodes`
+    nodes.
+
+    The result only contains plain dataclasses, so that it can be returned from
+    a worker process.
+    """
+    if catalog is None:
+        catalog = _worker_catalog
+
+    return [
+        (
+            lineage_node.name,
+            [
+                UpstreamLineageField.from_node(column_node, view.schema)
+                for column_node in lineage_node.downstream
+            ],
+        )
+        for lineage_node in column_lineage(
+            view.sql, catalog, view.schema, max_ast_nodes
+        )
+    ]
+
+
+def restore_column_casing(
+    view: View, view_lineage: List[ColumnLineage], catalog: Optional[Catalog]
+) -> List[ColumnLineage]:
+    """Gives the column names of the lineage of a view the casing they have in
+    the database, as far as the columns are known to the catalog."""
+    for _, upstream_fields in view_lineage:
+        for field in upstream_fields:
+            field.name = _column_name(catalog, field.dataset, field.name)
+    return [
+        (_column_name(catalog, view, column_name), upstream_fields)
+        for column_name, upstream_fields in view_lineage
+    ]
+
+
+def extract_view_lineage(
+    view: View,
+    catalog: Optional[Catalog] = None,
+    max_ast_nodes: Optional[int] = None,
+) -> List[ColumnLineage]:
+    """Extracts the lineage of every selected column of a view.
+
+    With a `catalog` the columns are resolved against the catalog and the
+    column names have the casing they have in the database.
+
+    Raises ViewTooComplexError if the parsed view has more than `max_ast_nodes`
+    nodes.
+    """
+    view_lineage = resolve_view_lineage(view, catalog, max_ast_nodes)
+    return restore_column_casing(view, view_lineage, catalog)
+
+
+def _timed_resolve_view_lineage(
+    view: View, catalog: Optional[Catalog], max_ast_nodes: Optional[int]
+) -> Tuple[List[ColumnLineage], float]:
+    """Resolves the lineage of a view and measures how long that took."""
+    start = time.perf_counter()
+    view_lineage = resolve_view_lineage(view, catalog, max_ast_nodes)
+    return view_lineage, time.perf_counter() - start
+
+
+def iter_view_lineage(
+    views: Iterable[View],
+    workers: int = 0,
+    max_in_flight: int = 32,
+    cache: Optional[LineageCache] = None,
+    catalog: Optional[Catalog] = None,
+    timeout: Optional[float] = None,
+    max_ast_nodes: Optional[int] = None,
+    on_skip: Optional[Callable[[View, str], None]] = None,
+    on_parsed: Optional[Callable[[View, float], None]] = None,
+) -> Iterable[Tuple[View, List[ColumnLineage]]]:
+    """Yields every view together with its extracted column lineage.
+
+    With `workers` > 1 the views are parsed in a pool of worker processes. At
+    most `max_in_flight` views are submitted to the pool at any time and the
+    results are yielded in the order of `views`. The `catalog` is then sent to
+    each worker process once, so it has to be picklable. The columns are
+    resolved in the workers, the casing of the column names is restored in this
+    process, from the same catalog.
+
+    When a `cache` is given, views whose lineage is cached are not parsed again
+    and the lineage of the parsed views is added to the cache.
+
+    Views whose lineage can't be extracted, whose AST has more than
+    `max_ast_nodes` nodes or that take longer than `timeout` seconds to parse
+    are skipped and passed to `on_skip` together with the reason. A timeout
+    needs a worker process that can be killed, so at least one worker is used
+    when it is set.
+
+    Every view that was parsed is passed to `on_parsed` together with the
+    number of seconds its extraction took.
+    """
+
+    def skip(view: View, reason: str) -> None:
+        if on_skip:
+            on_skip(view, reason)
+
+    def parsed(view: View, seconds: float) -> None:
+        if on_parsed:
+            on_parsed(view, seconds)
+
+    if workers <= 1 and timeout is None:
+        for view in views:
+            view_lineage = cache.get(view) if cache else None
+            if view_lineage is None:
+                try:
+                    view_lineage, seconds = _timed_resolve_view_lineage(
+                        view, catalog, max_ast_nodes
+                    )
+                except Exception as e:
+                    skip(view, _describe_error(e))
+                    continue
+                parsed(view, seconds)
+                view_lineage = restore_column_casing(view, view_lineage, catalog)
+                if cache:
+                    cache.put(view, view_lineage)
+            yield view, view_lineage
+        return
+
+    pool = _WorkerPool(max(workers, 1), catalog)
+    try:
+        # each entry holds the view, its cached lineage or the future that
+        # extracts it and the time the future was submitted
+        pending: Deque[_PendingView] = deque()
+        # the head of the queue runs at the latest since the previous head
+        # finished, its timeout starts then
+        last_finished = time.monotonic()
+
+        def submit(view: View) -> _PendingView:
+            return _PendingView(
+                view,
+                None,
+                pool.submit(_timed_resolve_view_lineage, view, None, max_ast_nodes),
+                time.monotonic(),
+            )
+
+        def restart() -> None:
+            """Kills the workers and resubmits the views that were not done."""
+            pool.restart()
+            for i, entry in enumerate(pending):
+                if entry.future is not None and _was_interrupted(entry.future):
+                    pending[i] = submit(entry.view)
+
+        def next_result() -> Optional[Tuple[View, List[ColumnLineage]]]:
+            nonlocal last_finished
+            entry = pending.popleft()
+            view, view_lineage, future = entry.view, entry.lineage, entry.future
+            try:
+                if future is None:
+                    return view, view_lineage  # type: ignore
+
+                remaining = None
+                if timeout is not None:
+                    started = max(entry.submitted, last_finished)
+                    remaining = max(started + timeout - time.monotonic(), 0)
+                view_lineage, seconds = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                restart()
+                skip(view, f"parsing took longer than {timeout} seconds")
+                return None
+            except BrokenProcessPool:
+                restart()
+                skip(view, "the worker process parsing the view crashed")
+                return None
+            except Exception as e:
+                skip(view, _describe_error(e))
+                return None
+            finally:
+                last_finished = time.monotonic()
+
+            parsed(view, seconds)
+            view_lineage = restore_column_casing(view, view_lineage, catalog)
+            if cache:
+                cache.put(view, view_lineage)
+            return view, view_lineage
+
+        for view in views:
+            view_lineage = cache.get(view) if cache else None
+            if view_lineage is None:
+                pending.append(submit(view))
+            else:
+                pending.append(_PendingView(view, view_lineage, None, 0))
+
+            if len(pending) >= max_in_flight:
+                result = next_result()
+                if result:
+                    yield result
+
+        while pending:
+            result = next_result()
+            if result:
+                yield result
+    finally:
+        pool.shutdown()
+
+
+class _PendingView(NamedTuple):
+    view: View
+    lineage: Optional[List[ColumnLineage]]
+    future: Optional[Future]
+    submitted: float
+
+
+class _WorkerPool:
+    """A process pool whose workers can be killed when a view takes too long.
+
+    ProcessPoolExecutor can't cancel a running task, so the whole pool is
+    replaced: its worker processes are terminated and a new pool is started.
+    Every worker reports its process id when it starts, the pool terminates the
+    child processes with these ids.
+    """
+
+    def __init__(self, workers: int, catalog: Optional[Catalog]):
+        self.workers = workers
+        self.catalog = catalog
+        self.context = multiprocessing.get_context()
+        self.pids: "SimpleQueue[int]" = self.context.SimpleQueue()
+        self.executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self.context,
+            initializer=_init_worker,
+            initargs=(self.catalog, self.pids),
+        )
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self.executor.submit(fn, *args)
+
+    def get_worker_processes(self) -> List[multiprocessing.process.BaseProcess]:
+        """Returns the running worker processes of the executor."""
+        pids: Set[int] = set()
+        while not self.pids.empty():
+            pids.add(self.pids.get())
+        return [
+            process
+            for process in multiprocessing.active_children()
+            if process.pid in pids
+        ]
+
+    def restart(self) -> None:
+        processes = self.get_worker_processes()
+        for process in processes:
+            process.terminate()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join()
+        self.executor = self._start()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+        self.pids.close()
+
+
+def _was_interrupted(future: Future) -> bool:
+    """Returns whether a future did not finish because its pool was stopped."""
+    if not future.done() or future.cancelled():
+        return True
+    return isinstance(future.exception(), BrokenProcessPool)
+
+
+def _describe_error(error: Exception) -> str:
+    message = str(error).splitlines()[0] if str(error) else ""
+    return f"{type(error).__name__}: {message}"[:200]
+
+
+class _ScopeLineageResolver:
+    """Resolves the lineage of columns within one scope tree.
+
+    This follows the implementation of `to_node` in `sqlglot.lineage.lineage`,
+    but shares the scope expressions between nodes and memoises the nodes of
+    derived table columns as well as the selects and source aliases of each
+    scope, so that shared parts of the scope tree are walked only once.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[Tuple[int, str, Optional[str], Optional[str]], Node] = {}
+        self.aliases: Dict[int, Dict[str, str]] = {}
+        self.selects: Dict[int, Dict[str, exp.Expression]] = {}
+
+    def get_select(self, column_name: str, scope: Scope) -> Optional[exp.Expression]:
+        """Returns the select clause that is the source of the column, either a
+        named select or a generic `*` clause."""
+        selects = self.selects.get(id(scope))
+        if selects is None:
+            selects = {}
+            for select in scope.selects:
+                selects.setdefault(select.alias_or_name, select)
+            self.selects[id(scope)] = selects
+
+        select = selects.get(column_name)
+        if select is None and scope.expression.is_star:
+            return exp.Star()
+        return select
+
+    def get_aliases(self, scope: Scope) -> Dict[str, str]:
+        aliases = self.aliases.get(id(scope))
+        if aliases is None:
+            aliases = {
+                dt.alias: dt.comments[0].split()[1]
+                for dt in scope.derived_tables
+                if dt.comments and dt.comments[0].startswith("source: ")
+            }
+            self.aliases[id(scope)] = aliases
+        return aliases
+
+    def to_node(
+        self,
+        column_name: str,
+        scope: Scope,
+        scope_name: Optional[str] = None,
+        upstream: Optional[Node] = None,
+        alias: Optional[str] = None,
+    ) -> Node:
+        aliases = self.get_aliases(scope)
+
+        if isinstance(scope.expression, exp.Union):
+            node = None
+            for union_scope in scope.union_scopes:
+                node = self.to_node(
+                    column_name,
+                    scope=union_scope,
+                    scope_name=scope_name,
+                    upstream=upstream,
+                    alias=aliases.get(scope_name),  # type: ignore
+                )
+            return node  # type: ignore
+
+        key = (id(scope), column_name, scope_name, alias)
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.build_node(column_name, scope, scope_name, alias)
+            self.nodes[key] = node
+
+        if upstream:
+            upstream.downstream.append(node)
+
+        return node
+
+    def build_node(
+        self,
+        column_name: str,
+        scope: Scope,
+        scope_name: Optional[str],
+        alias: Optional[str],
+    ) -> Node:
+        select = self.get_select(column_name, scope)
+
+        if not select:
+            raise ValueError(f"Could not find {column_name} in {scope.expression}")
+
+        # sqlglot uses a copy of the select with only this column as the source,
+        # which costs a copy of the whole query per column. The scope expression
+        # is shared instead, only the sources of the leaf nodes are used.
+        node = Node(
+            name=f"{scope_name}.{column_name}" if scope_name else column_name,
+            source=scope.expression,
+            expression=select,
+            alias=alias or "",
+        )
+
+        # dict.fromkeys deduplicates the columns while keeping them in query order
+        for column in dict.fromkeys(select.find_all(exp.Column)):
+            table = column.table
+            column_source = scope.sources.get(table)
+
+            if isinstance(column_source, Scope):
+                self.to_node(
+                    column.name,
+                    scope=column_source,
+                    scope_name=table,
+                    upstream=node,
+                    alias=self.get_aliases(scope).get(table),
+                )
+            else:
+                column_source = column_source or exp.Placeholder()
+                node.downstream.append(
+                    Node(
+                        name=column.sql(),
+                        source=column_source,
+                        expression=column_source,
+                    )
+                )
+
+        return node
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import sqlglot
+
+from datahub_sap_hana.column_lineage_schema import (
+    ColumnLineage,
+    Table,
+    UpstreamLineageField,
+    View,
+)
+from datahub_sap_hana.inspector import Catalog
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Bump this when the cached lineage format or the lineage extraction changes,
+# so that entries written by older versions are no longer used.
+CACHE_FORMAT_VERSION = 2
+
+# Temporary files older than this many seconds were left behind by a run that
+# died before it could rename them to their entry, so they are removed.
+STALE_TEMP_FILE_AGE = 3600
+
+
+class LineageCache:
+    """A content-addressed on-disk cache for the extracted column lineage of views.
+
+    Entries are keyed on a hash of the view SQL, the default schema of the view
+    and the sqlglot version, so a view is only parsed again when its definition
+    or the parser changes. Each entry is a small JSON file. When the total size
+    of the cache exceeds `max_size` bytes, the least recently used entries are
+    removed.
+
+    The lineage of a view also depends on the columns of the view and of its
+    upstream tables in the `catalog`. Each entry stores a fingerprint of these
+    columns and is only used while the fingerprints still match.
+
+    Entries are written to a temporary file first. Stale temporary files of
+    runs that died while writing are removed when the cache is opened and when
+    entries are evicted.
+    """
+
+    def __init__(
+        self, directory: str, max_size: int, catalog: Optional[Catalog] = None
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.catalog = catalog
+        self.fingerprints: Dict[Tuple[str, str], str] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.remove_stale_temp_files()
+        self.size = sum(path.stat().st_size for path in self._entries())
+
+    @staticmethod
+    def key(view: View) -> str:
+        """Returns the cache key of a view."""
+        content = "\0".join(
+            [str(CACHE_FORMAT_VERSION), sqlglot.__version__, view.schema, view.sql]
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def fingerprint(self, table: Table) -> str:
+        """Returns a hash of the column names of a table in the catalog."""
+        key = (table.schema, table.name)
+        fingerprint = self.fingerprints.get(key)
+        if fingerprint is None:
+            fingerprint = ""
+            if self.catalog is not None:
+                columns = self.catalog.get_table_schema(table.name, table.schema)
+                content = "\0".join(column["name"] for column in columns.values())
+                fingerprint = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            self.fingerprints[key] = fingerprint
+        return fingerprint
+
+    def get(self, view: View) -> Optional[List[ColumnLineage]]:
+        """Returns the cached lineage of a view or None if it is not cached."""
+        path = self._path(self.key(view))
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        for schema, name, fingerprint in data["tables"]:
+            if self.fingerprint(Table(schema=schema, name=name)) != fingerprint:
+                self.misses += 1
+                return None
+
+        # the modification time is used to find the least recently used entries
+        os.utime(path)
+        self.hits += 1
+        return [
+            (
+                column_name,
+                [
+                    UpstreamLineageField(
+                        name=field["name"],
+                        dataset=Table(schema=field["schema"], name=field["table"]),
+                    )
+                    for field in upstream_fields
+                ],
+            )
+            for column_name, upstream_fields in data["lineage"]
+        ]
+
+    def put(self, view: View, view_lineage: List[ColumnLineage]) -> None:
+        """Stores the lineage of a view and evicts old entries if needed."""
+        tables = {(view.schema, view.name)}
+        for _, upstream_fields in view_lineage:
+            tables.update(
+                (field.dataset.schema, field.dataset.name) for field in upstream_fields
+            )
+
+        lineage = [
+            (
+                column_name,
+                [
+                    {
+                        "name": field.name,
+                        "schema": field.dataset.schema,
+                        "table": field.dataset.name,
+                    }
+                    for field in upstream_fields
+                ],
+            )
+            for column_name, upstream_fields in view_lineage
+        ]
+        data = {
+            "tables": [
+                (schema, name, self.fingerprint(Table(schema=schema, name=name)))
+                for schema, name in sorted(tables)
+            ],
+            "lineage": lineage,
+        }
+
+        path = self._path(self.key(view))
+        path.parent.mkdir(exist_ok=True)
+        if path.exists():
+            self.size -= path.stat().st_size
+
+        # write to a temporary file first, so a crashed run never leaves a
+        # partially written entry behind
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+        self.size += path.stat().st_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits into
+        90% of `max_size`."""
+        self.remove_stale_temp_files()
+        target_size = self.max_size * 0.9
+        entries = sorted(
+            ((path.stat(), path) for path in self._entries()),
+            key=lambda entry: entry[0].st_mtime,
+        )
+        for stat, path in entries:
+            if self.size <= target_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self.size -= stat.st_size
+            logger.debug(f"Evicted column lineage cache entry {path.name}")
+
+    def remove_stale_temp_files(self) -> None:
+        """Removes temporary files that are older than `STALE_TEMP_FILE_AGE`."""
+        threshold = time.time() - STALE_TEMP_FILE_AGE
+        for path in self.directory.glob("*/*.tmp"):
+            try:
+                if path.stat().st_mtime < threshold:
+                    path.unlink()
+                    logger.debug(f"Removed stale column lineage cache file {path}")
+            except OSError:
+                continue
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self) -> List[Path]:
+        return list(self.directory.glob("*/*.json"))
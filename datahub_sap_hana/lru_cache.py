@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# Marks a missing entry, None is a valid cached value.
+_MISSING = object()
+
+
+class LRUCache:
+    """A mapping with a maximum number of entries that evicts the least recently
+    used entry when it is full.
+
+    It counts hits, misses and evictions, so that its effectiveness can be
+    reported.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Returns the cached value of `key`, or computes and caches it."""
+        value = self.entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = compute()
+        if self.max_size > 0:
+            self.entries[key] = value
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+def cached_method(method: Callable[..., T]) -> Callable[..., T]:
+    """Caches the results of a method in the `cache` LRUCache of its instance.
+
+    Unlike `functools.cache`, the cache is owned by the instance, so it is
+    bounded by the instance's cache size and freed together with the instance.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs) -> T:
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return self.cache.get_or_compute(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,102 @@
+import re
+from typing import List, Optional
+
+from datahub.configuration.common import AllowDenyPattern
+
+# Regexes that only consist of literal characters, `.` and `.*` wildcards and an
+# optional trailing `$` can be translated into an equivalent LIKE pattern.
+LIKE_TRANSLATABLE_REGEX = re.compile(r"^\^?(?:[A-Za-z0-9 _-]|\.\*?)+\$?$")
+
+# Constructs that are interpreted differently by Python and by the PCRE based
+# LIKE_REGEXPR of SAP HANA. Patterns that contain them are only checked in Python.
+UNSUPPORTED_REGEX_CONSTRUCTS = re.compile(r"\(\?|\\[AZz]")
+
+# The predicate of patterns that match every value.
+MATCH_ALL = "1 = 1"
+
+
+def quote(value: str) -> str:
+    """Returns a SAP HANA string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def regex_to_like(regex: str) -> str:
+    """Translates a regex matching LIKE_TRANSLATABLE_REGEX into a LIKE pattern.
+
+    Like `re.match` the pattern is anchored at the start of the string only,
+    unless it ends with `$`.
+    """
+    anchored = regex.endswith("$")
+    regex = regex.lstrip("^").rstrip("$")
+
+    like_pattern = ""
+    i = 0
+    while i < len(regex):
+        if regex.startswith(".*", i):
+            like_pattern += "%"
+            i += 2
+            continue
+        char = regex[i]
+        if char == ".":
+            like_pattern += "_"
+        elif char == "_":
+            like_pattern += "\\_"
+        else:
+            like_pattern += char
+        i += 1
+
+    if not anchored and not like_pattern.endswith("%"):
+        like_pattern += "%"
+    return like_pattern
+
+
+def regex_to_sql(regex: str, column: str, ignore_case: bool) -> Optional[str]:
+    """Returns a SQL predicate that matches `column` exactly like
+    `re.match(regex, column)` does or None if there is no such predicate."""
+    try:
+        re.compile(regex)
+    except re.error:
+        return None
+
+    if regex in (".*", "^.*"):
+        return MATCH_ALL
+
+    if LIKE_TRANSLATABLE_REGEX.match(regex):
+        like_pattern = regex_to_like(regex)
+        if ignore_case:
+            return f"LOWER({column}) LIKE {quote(like_pattern.lower())} ESCAPE '\\'"
+        return f"{column} LIKE {quote(like_pattern)} ESCAPE '\\'"
+
+    if UNSUPPORTED_REGEX_CONSTRUCTS.search(regex):
+        return None
+
+    sql_regex = quote(f"^(?:{regex})")
+    if ignore_case:
+        return f"{column} LIKE_REGEXPR {sql_regex} FLAG 'i'"
+    return f"{column} LIKE_REGEXPR {sql_regex}"
+
+
+def pattern_to_sql(pattern: AllowDenyPattern, column: str) -> List[str]:
+    """Translates an AllowDenyPattern into SQL predicates on `column`.
+
+    All of the returned predicates hold for every value that the pattern allows,
+    patterns that can't be translated are left out. The values still have to be
+    checked with `pattern.allowed`, but most of the values that are not allowed
+    are filtered out by the database.
+    """
+    ignore_case = bool(pattern.ignoreCase)
+    predicates: List[str] = []
+
+    allow_predicates = [
+        regex_to_sql(regex, column, ignore_case) for regex in pattern.allow
+    ]
+    if allow_predicates and None not in allow_predicates:
+        if MATCH_ALL not in allow_predicates:
+            predicates.append("(" + " OR ".join(allow_predicates) + ")")  # type: ignore
+
+    for regex in pattern.deny:
+        deny_predicate = regex_to_sql(regex, column, ignore_case)
+        if deny_predicate is not None:
+            predicates.append(f"NOT ({deny_predicate})")
+
+    return predicates
@@ -0,0 +1,616 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import sqlalchemy.types as sqltypes
+from datahub.ingestion.source.ge_profiling_config import GEProfilingConfig
+from datahub.metadata.schema_classes import (
+    DatasetFieldProfileClass,
+    DatasetProfileClass,
+    HistogramClass,
+    QuantileClass,
+    ValueFrequencyClass,
+)
+from pydantic.fields import Field
+from sqlalchemy import inspect, text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.report import HanaReport
+
+if TYPE_CHECKING:
+    from datahub.ingestion.source.ge_data_profiler import GEProfilerRequest
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The row count and memory size of a column store table, summed over its
+# partitions. Row store tables are not listed.
+TABLE_STATISTICS_QUERY = """
+SELECT SUM(RECORD_COUNT) AS RECORD_COUNT,
+       SUM(MEMORY_SIZE_IN_TOTAL) AS MEMORY_SIZE,
+       COUNT(*) AS PARTITIONS
+  FROM SYS.M_CS_TABLES
+WHERE SCHEMA_NAME = :schema
+  AND TABLE_NAME = :table
+"""
+
+# The row count and size of every row and column store table in a batch of
+# schemas, for the table statistics that are emitted without profiling.
+TABLE_SIZES_QUERY = """
+SELECT SCHEMA_NAME, TABLE_NAME, RECORD_COUNT, TABLE_SIZE
+  FROM SYS.M_TABLES
+WHERE SCHEMA_NAME IN :schemas
+ORDER BY SCHEMA_NAME, TABLE_NAME
+"""
+
+# The number of distinct values in each loaded column of an unpartitioned
+# column store table. The distinct counts of partitions can't be added up.
+COLUMN_STATISTICS_QUERY = """
+SELECT COLUMN_NAME, DISTINCT_COUNT
+  FROM SYS.M_CS_COLUMNS
+WHERE SCHEMA_NAME = :schema
+  AND TABLE_NAME = :table
+  AND LOADED = 'TRUE'
+"""
+
+# The quantiles reported for numeric columns, the same as the GE profiler.
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# The partitions of a column store table. Unpartitioned tables have a single
+# partition with the id 0.
+PARTITIONS_QUERY = """
+SELECT PART_ID
+  FROM SYS.M_CS_TABLES
+WHERE SCHEMA_NAME = :schema
+  AND TABLE_NAME = :table
+ORDER BY PART_ID
+"""
+
+# Value frequencies are only reported for columns with at most this many
+# distinct values.
+MAX_DISTINCT_VALUE_FREQUENCIES = 50
+
+# Number of equal-width buckets of the histogram of numeric columns.
+HISTOGRAM_BUCKETS = 10
+
+
+class HanaProfilingConfig(GEProfilingConfig):
+    """The GE profiling config extended with the options of the SAP HANA
+    profiler."""
+
+    engine: Literal["ge", "native", "vectorized"] = Field(
+        default="ge",
+        description="The profiler to use. `ge` is the Great Expectations based "
+        "profiler of SQLAlchemy sources, `native` takes row counts, sizes and "
+        "distinct counts of column store tables from the SAP HANA monitoring views "
+        "and only scans the table for the remaining metrics. `vectorized` works "
+        "like `native`, but reads the columns in batches and computes the metrics "
+        "with NumPy in a single pass",
+    )
+    sample_row_threshold: Optional[int] = Field(
+        default=None,
+        description="The native profiler computes the metrics of tables with more "
+        "rows than this from a `TABLESAMPLE SYSTEM` sample of `sample_percent` "
+        "percent of the table. Counts are scaled to the whole table, distinct "
+        "counts are only taken from the monitoring views. Tables are never "
+        "sampled when this is not set",
+    )
+    sample_percent: float = Field(
+        default=10.0,
+        gt=0,
+        le=100,
+        description="The size of the sample of large tables in percent",
+    )
+    fetch_size: int = Field(
+        default=10000,
+        description="Number of rows fetched at a time by the vectorized profiler",
+    )
+    sketch_exact_limit: int = Field(
+        default=10000,
+        description="Number of values of a column up to which the vectorized "
+        "profiler computes exact distinct counts and quantiles. Larger columns are "
+        "summarized by bounded-memory HyperLogLog and t-digest sketches",
+    )
+    partition_workers: int = Field(
+        default=1,
+        ge=1,
+        description="Number of partitions of a partitioned column store table that "
+        "the vectorized profiler reads at the same time, each over a pooled "
+        "connection of its own. The metrics of the partitions are merged into one "
+        "profile",
+    )
+    table_deadline_seconds: Optional[float] = Field(
+        default=None,
+        description="Time after which the vectorized profiler stops reading the "
+        "data of a table. The metrics are then computed from the rows read so far, "
+        "like from a sample. There is no deadline when this is not set",
+    )
+    max_concurrent_scans: Optional[int] = Field(
+        default=None,
+        description="Maximum number of queries that the native profiler runs on "
+        "the data of tables at the same time, in addition to `max_workers`. The "
+        "monitoring view queries are not limited",
+    )
+
+
+@dataclass
+class TableStatistics:
+    """The statistics of a table in the column store monitoring views."""
+
+    row_count: Optional[int] = None
+    size_in_bytes: Optional[int] = None
+    partitions: int = 0
+    # the distinct counts keyed by the normalized column name
+    distinct_counts: Optional[Dict[str, int]] = None
+
+
+class ProfileResult(NamedTuple):
+    """The profile of a table and the statistics of profiling it."""
+
+    profile: DatasetProfileClass
+    scans: int
+    catalog_metrics: int
+    seconds: float
+
+
+def is_numeric(column_type: Any) -> bool:
+    return isinstance(column_type, (sqltypes.Integer, sqltypes.Numeric))
+
+
+def is_temporal(column_type: Any) -> bool:
+    return isinstance(column_type, (sqltypes.Date, sqltypes.DateTime, sqltypes.Time))
+
+
+def _str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+class TableProfiler:
+    """Profiles a single table over a connection.
+
+    The statistics that the column store keeps in its monitoring views are used
+    first. All remaining aggregate metrics of all columns are computed by a
+    single scan of the table, on a sample of it if the table has more than
+    `sample_row_threshold` rows. Value frequencies, histograms and sample
+    values need a query of their own per column.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        config: HanaProfilingConfig,
+        dataset_name: str,
+        schema: str,
+        table: str,
+        scan_slots: Optional[threading.Semaphore] = None,
+    ):
+        self.conn = conn
+        self.config = config
+        self.dataset_name = dataset_name
+        self.schema = schema
+        self.table = table
+        self.scan_slots = scan_slots
+
+        dialect = conn.dialect
+        self.schema_name = dialect.denormalize_name(schema)
+        self.table_name = dialect.denormalize_name(table)
+        preparer = dialect.identifier_preparer
+        self.table_ref = (
+            f"{preparer.quote_schema(self.schema_name)}."
+            f"{preparer.quote(self.table_name)}"
+        )
+        # the table, or a sample of it, that the metrics are computed from
+        self.source_ref = self.table_ref
+        self.sample_clause = ""
+        # the factor that scales counts of the sample to the whole table
+        self.scale = 1.0
+        # the number of queries that scanned the table
+        self.scans = 0
+        # the number of metrics that were taken from the monitoring views
+        self.catalog_metrics = 0
+
+    def quote_column(self, column: str) -> str:
+        dialect = self.conn.dialect
+        return dialect.identifier_preparer.quote(dialect.denormalize_name(column))
+
+    def scan(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Runs a query that scans the table, waiting for a free scan slot when
+        the number of concurrent scans is limited."""
+        self.scans += 1
+        with self.scan_slots or nullcontext():
+            return list(self.conn.execute(text(query), params or {}))
+
+    def get_statistics(self) -> TableStatistics:
+        params = {"schema": self.schema_name, "table": self.table_name}
+        row = self.conn.execute(text(TABLE_STATISTICS_QUERY), params).first()
+        if row is None or not row[2]:
+            return TableStatistics()
+
+        statistics = TableStatistics(
+            row_count=row[0], size_in_bytes=row[1], partitions=row[2]
+        )
+        if statistics.partitions == 1 and self.config.include_field_distinct_count:
+            dialect = self.conn.dialect
+            statistics.distinct_counts = {
+                dialect.normalize_name(column_name): distinct_count
+                for column_name, distinct_count in self.conn.execute(
+                    text(COLUMN_STATISTICS_QUERY), params
+                )
+            }
+        return statistics
+
+    def get_columns(self) -> List[Dict[str, Any]]:
+        return inspect(self.conn).get_columns(self.table, self.schema)
+
+    def is_column_allowed(self, column: str) -> bool:
+        return self.config._allow_deny_patterns.allowed(f"{self.dataset_name}.{column}")
+
+    def is_sampled(self, row_count: int) -> bool:
+        threshold = self.config.sample_row_threshold
+        return threshold is not None and row_count > threshold
+
+    def profile(self) -> DatasetProfileClass:
+        statistics = self.get_statistics()
+        columns = self.get_columns()
+
+        row_count = statistics.row_count
+        if row_count is None:
+            row_count = self.scan(f"SELECT COUNT(*) FROM {self.table_ref}")[0][0]
+        else:
+            self.catalog_metrics += 1
+
+        profile = DatasetProfileClass(
+            timestampMillis=round(time.time() * 1000),
+            rowCount=row_count,
+            columnCount=len(columns),
+            sizeInBytes=statistics.size_in_bytes,
+            fieldProfiles=[],
+        )
+        if self.config.profile_table_level_only:
+            return profile
+
+        columns = [
+            column for column in columns if self.is_column_allowed(column["name"])
+        ]
+        if self.config.max_number_of_fields_to_profile is not None:
+            columns = columns[: self.config.max_number_of_fields_to_profile]
+
+        if self.is_sampled(row_count):
+            self.sample_clause = f" TABLESAMPLE SYSTEM ({self.config.sample_percent})"
+            self.source_ref = f"{self.table_ref}{self.sample_clause}"
+
+        unique_counts = statistics.distinct_counts or {}
+        self.catalog_metrics += sum(
+            column["name"] in unique_counts for column in columns
+        )
+        profile.fieldProfiles = self.profile_columns(columns, row_count, unique_counts)
+        return profile
+
+    def profile_columns(
+        self,
+        columns: List[Dict[str, Any]],
+        row_count: int,
+        unique_counts: Dict[str, int],
+    ) -> List[DatasetFieldProfileClass]:
+        """Returns the profiles of the columns, the distinct counts from the
+        monitoring views are used where available."""
+        aggregates = self.aggregate(columns, unique_counts)
+        scanned_rows = aggregates.pop(("", "rows"), row_count)
+        if self.source_ref != self.table_ref and scanned_rows:
+            self.scale = row_count / scanned_rows
+
+        field_profiles = []
+        for column in columns:
+            name = column["name"]
+            values = {
+                key: value
+                for (column_name, key), value in aggregates.items()
+                if column_name == name
+            }
+            field_profiles.append(
+                self.profile_column(
+                    column, scanned_rows, unique_counts.get(name), values
+                )
+            )
+        return field_profiles
+
+    def get_aggregates(
+        self, column: Dict[str, Any], unique_count: Optional[int]
+    ) -> Dict[str, str]:
+        """Returns the aggregate expressions of the enabled metrics of a column."""
+        config = self.config
+        column_ref = self.quote_column(column["name"])
+        numeric = is_numeric(column["type"])
+        ordered = numeric or is_temporal(column["type"])
+
+        aggregates: Dict[str, str] = {}
+        # the distinct count of a sample says little about the whole table
+        scan_unique_count = (
+            config.include_field_distinct_count
+            and unique_count is None
+            and self.source_ref == self.table_ref
+        )
+        if config.include_field_null_count or scan_unique_count:
+            aggregates["non_null_count"] = f"COUNT({column_ref})"
+        if scan_unique_count:
+            aggregates["unique_count"] = f"COUNT(DISTINCT {column_ref})"
+        if ordered and (
+            config.include_field_min_value or config.include_field_histogram
+        ):
+            aggregates["min"] = f"MIN({column_ref})"
+        if ordered and (
+            config.include_field_max_value or config.include_field_histogram
+        ):
+            aggregates["max"] = f"MAX({column_ref})"
+        if numeric and config.include_field_mean_value:
+            aggregates["mean"] = f"AVG({column_ref})"
+        if numeric and config.include_field_stddev_value:
+            aggregates["stdev"] = f"STDDEV({column_ref})"
+        if numeric and (
+            config.include_field_median_value or config.include_field_quantiles
+        ):
+            for quantile in QUANTILES:
+                aggregates[str(quantile)] = (
+                    f"PERCENTILE_CONT({quantile}) "
+                    f"WITHIN GROUP (ORDER BY {column_ref})"
+                )
+        return aggregates
+
+    def aggregate(
+        self, columns: List[Dict[str, Any]], unique_counts: Dict[str, int]
+    ) -> Dict[Tuple[str, str], Any]:
+        """Computes the aggregate metrics of all columns in a single scan.
+
+        Returns the values keyed by the column name and the metric, the number
+        of scanned rows is keyed by ("", "rows").
+        """
+        aggregates: Dict[Tuple[str, str], str] = {}
+        for column in columns:
+            name = column["name"]
+            for key, expression in self.get_aggregates(
+                column, unique_counts.get(name)
+            ).items():
+                aggregates[(name, key)] = expression
+        if not aggregates:
+            return {}
+
+        aggregates[("", "rows")] = "COUNT(*)"
+        row = self.scan(
+            f"SELECT {', '.join(aggregates.values())} FROM {self.source_ref}"
+        )[0]
+        return dict(zip(aggregates, row))
+
+    def profile_column(
+        self,
+        column: Dict[str, Any],
+        scanned_rows: int,
+        unique_count: Optional[int],
+        values: Dict[str, Any],
+    ) -> DatasetFieldProfileClass:
+        config = self.config
+        name = column["name"]
+        column_ref = self.quote_column(name)
+        numeric = is_numeric(column["type"])
+        field_profile = DatasetFieldProfileClass(fieldPath=name)
+
+        unique_count = values.get("unique_count", unique_count)
+        non_null_count = values.get("non_null_count")
+
+        if config.include_field_null_count and non_null_count is not None:
+            null_count = scanned_rows - non_null_count
+            field_profile.nullCount = round(null_count * self.scale)
+            if scanned_rows:
+                field_profile.nullProportion = null_count / scanned_rows
+        if config.include_field_distinct_count and unique_count is not None:
+            field_profile.uniqueCount = unique_count
+            if non_null_count:
+                field_profile.uniqueProportion = min(
+                    unique_count / (non_null_count * self.scale), 1.0
+                )
+        if config.include_field_min_value:
+            field_profile.min = _str(values.get("min"))
+        if config.include_field_max_value:
+            field_profile.max = _str(values.get("max"))
+        field_profile.mean = _str(values.get("mean"))
+        field_profile.stdev = _str(values.get("stdev"))
+        if config.include_field_median_value:
+            field_profile.median = _str(values.get(str(0.5)))
+        if numeric and config.include_field_quantiles:
+            field_profile.quantiles = [
+                QuantileClass(quantile=str(quantile), value=str(values[str(quantile)]))
+                for quantile in QUANTILES
+                if values.get(str(quantile)) is not None
+            ]
+
+        low_cardinality = (
+            unique_count is None or unique_count <= MAX_DISTINCT_VALUE_FREQUENCIES
+        )
+        if config.include_field_distinct_value_frequencies and low_cardinality:
+            field_profile.distinctValueFrequencies = self.get_value_frequencies(
+                column_ref
+            )
+        if (
+            numeric
+            and config.include_field_histogram
+            and values.get("min") is not None
+            and values.get("max") is not None
+        ):
+            field_profile.histogram = self.get_histogram(
+                column_ref, values["min"], values["max"]
+            )
+        if config.include_field_sample_values:
+            field_profile.sampleValues = [
+                str(value)
+                for value, in self.scan(
+                    f"SELECT {column_ref} FROM {self.source_ref} "
+                    f"WHERE {column_ref} IS NOT NULL "
+                    f"LIMIT {config.field_sample_values_limit}"
+                )
+            ]
+        return field_profile
+
+    def get_value_frequencies(
+        self, column_ref: str
+    ) -> Optional[List[ValueFrequencyClass]]:
+        """Returns the frequencies of the values of a column, or None if it has
+        too many distinct values."""
+        rows = self.scan(
+            f"SELECT {column_ref}, COUNT(*) AS FREQUENCY FROM {self.source_ref} "
+            f"WHERE {column_ref} IS NOT NULL GROUP BY {column_ref} "
+            f"ORDER BY FREQUENCY DESC, {column_ref} "
+            f"LIMIT {MAX_DISTINCT_VALUE_FREQUENCIES + 1}"
+        )
+        if len(rows) > MAX_DISTINCT_VALUE_FREQUENCIES:
+            return None
+        return [
+            ValueFrequencyClass(
+                value=str(value), frequency=round(frequency * self.scale)
+            )
+            for value, frequency in rows
+        ]
+
+    def get_histogram(
+        self, column_ref: str, minimum: Any, maximum: Any
+    ) -> HistogramClass:
+        """Returns an equal-width histogram of the values of a numeric column."""
+        minimum, maximum = float(minimum), float(maximum)
+        width = (maximum - minimum) / HISTOGRAM_BUCKETS or 1.0
+        rows = self.scan(
+            f"SELECT BUCKET, COUNT(*) FROM ("
+            f"SELECT FLOOR(({column_ref} - :minimum) / :width) AS BUCKET "
+            f"FROM {self.source_ref} WHERE {column_ref} IS NOT NULL"
+            f") AS BUCKETS GROUP BY BUCKET",
+            {"minimum": minimum, "width": width},
+        )
+        heights = [0.0] * HISTOGRAM_BUCKETS
+        for bucket, count in rows:
+            # the maximum is the upper boundary of the last bucket
+            heights[min(int(bucket), HISTOGRAM_BUCKETS - 1)] += count * self.scale
+        return HistogramClass(
+            boundaries=[str(minimum + i * width) for i in range(HISTOGRAM_BUCKETS + 1)],
+            heights=heights,
+        )
+
+
+class HanaProfiler:
+    """A profiler for SAP HANA tables that can replace the GE profiler of
+    SQLAlchemySource.
+
+    The tables are profiled in a pool of threads, each table over a connection
+    of its own. The profiles are returned in the order of the requests.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], Connection],
+        config: HanaProfilingConfig,
+        report: HanaReport,
+    ):
+        self.get_connection = get_connection
+        self.config = config
+        self.report = report
+        self.table_profiler_factory: Callable[..., TableProfiler] = TableProfiler
+        if config.engine == "vectorized":
+            # NumPy is only needed by the vectorized profiler
+            from datahub_sap_hana.vectorized import VectorizedTableProfiler
+
+            self.table_profiler_factory = partial(
+                VectorizedTableProfiler, get_connection=get_connection
+            )
+        self.scan_slots: Optional[threading.Semaphore] = None
+        if config.max_concurrent_scans:
+            self.scan_slots = threading.BoundedSemaphore(config.max_concurrent_scans)
+
+    def generate_profiles(
+        self,
+        requests: List["GEProfilerRequest"],
+        max_workers: int,
+        platform: Optional[str] = None,
+        profiler_args: Optional[Dict] = None,
+    ) -> Iterable[Tuple["GEProfilerRequest", Optional[DatasetProfileClass]]]:
+        """Profiles the tables of the requests in a pool of `max_workers`
+        threads.
+
+        At most two requests per worker are submitted ahead of the profile that
+        is returned next, so only a few profiles are buffered in memory.
+        """
+        max_workers = max(min(max_workers, len(requests)), 1)
+        logger.info(f"Profiling {len(requests)} table(s) with {max_workers} worker(s)")
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hana-profiler"
+        ) as executor:
+            pending: Deque[
+                Tuple["GEProfilerRequest", "Future[ProfileResult]"]
+            ] = deque()
+            try:
+                for request in requests:
+                    pending.append(
+                        (request, executor.submit(self.profile_request, request))
+                    )
+                    if len(pending) >= max_workers * 2:
+                        yield self.get_profile(*pending.popleft())
+                while pending:
+                    yield self.get_profile(*pending.popleft())
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def get_profile(
+        self, request: "GEProfilerRequest", future: "Future[ProfileResult]"
+    ) -> Tuple["GEProfilerRequest", Optional[DatasetProfileClass]]:
+        """Waits for the profile of a request and reports its statistics, or
+        the error if it could not be profiled."""
+        try:
+            result = future.result()
+        except Exception as e:
+            if not self.config.catch_exceptions:
+                raise
+            logger.warning(f"Failed to profile {request.pretty_name}: {e}")
+            self.report.report_warning("profiling", f"{request.pretty_name}: {e}")
+            return request, None
+
+        instrumentation = self.report.instrumentation
+        instrumentation.count("profiling_scans", result.scans)
+        instrumentation.count("profiling_catalog_metrics", result.catalog_metrics)
+        instrumentation.observe(
+            "table_profile_seconds", result.seconds, request.pretty_name
+        )
+        return request, result.profile
+
+    def profile_request(self, request: "GEProfilerRequest") -> ProfileResult:
+        """Profiles the table of a request over a connection of its own."""
+        start = time.perf_counter()
+        with self.get_connection() as conn:
+            table_profiler = self.table_profiler_factory(
+                conn,
+                self.config,
+                request.pretty_name,
+                request.batch_kwargs["schema"],
+                request.batch_kwargs["table"],
+                self.scan_slots,
+            )
+            profile = table_profiler.profile()
+        return ProfileResult(
+            profile,
+            table_profiler.scans,
+            table_profiler.catalog_metrics,
+            time.perf_counter() - start,
+        )
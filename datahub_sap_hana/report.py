@@ -0,0 +1,37 @@
+from dataclasses import dataclass, field
+
+from datahub.ingestion.source.sql.sql_common import SQLSourceReport
+from datahub.utilities.lossy_collections import LossyList
+
+from datahub_sap_hana.instrumentation import Instrumentation
+from datahub_sap_hana.lru_cache import LRUCache
+
+
+@dataclass
+class HanaReport(SQLSourceReport):
+    """The SQLSourceReport extended with statistics of the SAP HANA source."""
+
+    connections_opened: int = 0
+    connection_open_time_seconds: float = 0.0
+    inspector_cache_hits: int = 0
+    inspector_cache_misses: int = 0
+    inspector_cache_evictions: int = 0
+    column_lineage_views_skipped: int = 0
+    column_lineage_skipped: LossyList[str] = field(default_factory=LossyList)
+    instrumentation: Instrumentation = field(default_factory=Instrumentation)
+
+    def report_connection_opened(self, duration: float) -> None:
+        """Counts a new database connection and the time it took to open it."""
+        self.connections_opened += 1
+        self.connection_open_time_seconds += duration
+
+    def report_inspector_cache(self, cache: LRUCache) -> None:
+        """Adds the statistics of an inspector cache."""
+        self.inspector_cache_hits += cache.hits
+        self.inspector_cache_misses += cache.misses
+        self.inspector_cache_evictions += cache.evictions
+
+    def report_column_lineage_skipped(self, view_name: str, reason: str) -> None:
+        """Counts a view whose column lineage was not extracted."""
+        self.column_lineage_views_skipped += 1
+        self.column_lineage_skipped.append(f"{view_name}: {reason}")
@@ -0,0 +1,353 @@
+"""Mergeable, bounded-memory summaries of column values computed with NumPy.
+
+The sketches are updated with whole batches of values at a time and can be
+merged, so the values of a column can be summarized batch by batch, or
+partition by partition, without keeping them in memory.
+"""
+import math
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_MUL_1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_MUL_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    z = x + _SPLITMIX_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _SPLITMIX_MUL_1
+    z = (z ^ (z >> np.uint64(27))) * _SPLITMIX_MUL_2
+    return z ^ (z >> np.uint64(31))
+
+
+def hash_values(values: np.ndarray) -> np.ndarray:
+    """Returns well mixed 64-bit hashes of an array of values.
+
+    Numbers are hashed by their float64 representation, other values by their
+    Python hash, so the hashes are only comparable within a process.
+    """
+    if values.dtype.kind in "biuf":
+        bits = values.astype(np.float64).view(np.uint64)
+    else:
+        bits = np.fromiter(
+            (hash(value) for value in values), dtype=np.int64, count=len(values)
+        ).view(np.uint64)
+    with np.errstate(over="ignore"):
+        return _splitmix64(bits)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Returns the number of bits needed to represent each uint64 value."""
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >> np.uint64(shift)
+        has_high = high != 0
+        length += has_high * shift
+        x = np.where(has_high, high, x)
+    return length + (x != 0)
+
+
+class HyperLogLog:
+    """Estimates the number of distinct values from their hashes.
+
+    The standard error of the estimate is about 1.04 / sqrt(2 ** precision).
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # the remaining bits, with a sentinel bit that bounds the rank
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TDigest:
+    """A merging t-digest that estimates quantiles of a stream of numbers.
+
+    Values are buffered and compressed into at most `compression` weighted
+    centroids, which are smaller towards the tails of the distribution.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._buffered_means: List[np.ndarray] = []
+        self._buffered_weights: List[np.ndarray] = []
+        self._buffered = 0
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._add(values.astype(np.float64), np.ones(len(values)))
+
+    def merge(self, other: "TDigest") -> None:
+        other.compress()
+        if not len(other.means):
+            return
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._add(other.means, other.weights)
+
+    def _add(self, means: np.ndarray, weights: np.ndarray) -> None:
+        self._buffered_means.append(means)
+        self._buffered_weights.append(weights)
+        self._buffered += len(means)
+        if self._buffered > 20 * self.compression:
+            self.compress()
+
+    def compress(self) -> None:
+        if not self._buffered:
+            return
+        means = np.concatenate([self.means, *self._buffered_means])
+        weights = np.concatenate([self.weights, *self._buffered_weights])
+        self._buffered_means, self._buffered_weights = [], []
+        self._buffered = 0
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        # the k1 scale function of the t-digest paper, centroids are merged
+        # when their quantiles map to the same integer k
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / math.pi + 0.5))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def _points(self):
+        """Returns the cumulative weights and values the quantiles are
+        interpolated between, including the minimum and maximum."""
+        self.compress()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        total = self.weights.sum()
+        cumulative = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+        return cumulative, values, total
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.means) and not self._buffered:
+            return None
+        cumulative, values, total = self._points()
+        return float(np.interp(q * total, cumulative, values))
+
+    def cdf(self, x: np.ndarray) -> np.ndarray:
+        """Returns the estimated fraction of values that are at most `x`."""
+        cumulative, values, total = self._points()
+        return np.interp(x, values, cumulative) / total
+
+
+class ValueCounter:
+    """Counts the values of a column exactly, as long as it has at most `limit`
+    distinct values. Larger columns are not counted."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.counts: Optional[Dict[Any, int]] = {}
+
+    def update(self, values: np.ndarray) -> None:
+        if self.counts is None or not len(values):
+            return
+        try:
+            unique, counts = np.unique(values, return_counts=True)
+        except TypeError:
+            # values that can't be sorted are counted one by one
+            unique, counts = np.array(values), np.ones(len(values), dtype=np.int64)
+        for value, count in zip(unique.tolist(), counts.tolist()):
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > self.limit:
+            self.counts = None
+
+    def merge(self, other: "ValueCounter") -> None:
+        if self.counts is None:
+            return
+        if other.counts is None:
+            self.counts = None
+            return
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > self.limit:
+            self.counts = None
+
+    def most_common(self) -> Optional[List[Any]]:
+        """Returns the values and counts by descending count, or None if the
+        column has too many distinct values."""
+        if self.counts is None:
+            return None
+        return sorted(self.counts.items(), key=lambda item: (-item[1], str(item[0])))
+
+
+class ColumnSketch:
+    """Summarizes the values of a column in a single pass over batches of them.
+
+    Null counts, minimum, maximum, mean and standard deviation are exact. The
+    distinct count and the quantiles are exact until more than `exact_limit`
+    values were seen, after that they are estimated by a HyperLogLog sketch and
+    a t-digest, so the memory use is bounded.
+    """
+
+    def __init__(
+        self,
+        numeric: bool,
+        exact_limit: int = 10000,
+        frequency_limit: int = 50,
+        sample_limit: int = 20,
+    ):
+        self.numeric = numeric
+        self.exact_limit = exact_limit
+        self.sample_limit = sample_limit
+        self.rows = 0
+        self.nulls = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        # the count, mean and sum of squared deviations of numeric values
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.samples: List[Any] = []
+        self.frequencies = ValueCounter(frequency_limit)
+        self.hll = HyperLogLog()
+        self.digest = TDigest()
+        self.distinct: Optional[Set[Any]] = set()
+        self.values: Optional[List[np.ndarray]] = [] if numeric else None
+
+    @property
+    def non_null(self) -> int:
+        return self.rows - self.nulls
+
+    def update(self, values: np.ndarray) -> None:
+        """Adds a batch of values, given as an object array that may contain
+        None."""
+        non_null = values[np.not_equal(values, None)]
+        self.rows += len(values)
+        self.nulls += len(values) - len(non_null)
+        values = non_null
+        if not len(values):
+            return
+
+        self._update_range(values.min(), values.max())
+        if len(self.samples) < self.sample_limit:
+            self.samples.extend(
+                values[: self.sample_limit - len(self.samples)].tolist()
+            )
+        self.frequencies.update(values)
+
+        if self.numeric:
+            numbers = values.astype(np.float64)
+            self._update_moments(
+                len(numbers), numbers.mean(), numbers.var() * len(numbers)
+            )
+            self.digest.update(numbers)
+            self.hll.add_hashes(hash_values(numbers))
+            if self.values is not None:
+                self.values.append(numbers)
+        else:
+            self.hll.add_hashes(hash_values(values))
+
+        if self.distinct is not None:
+            self.distinct.update(values.tolist())
+        self._limit_exact_values()
+
+    def merge(self, other: "ColumnSketch") -> None:
+        """Adds the values summarized by another sketch of the same column."""
+        self.rows += other.rows
+        self.nulls += other.nulls
+        if other.minimum is not None:
+            self._update_range(other.minimum, other.maximum)
+        self.samples.extend(other.samples[: self.sample_limit - len(self.samples)])
+        self.frequencies.merge(other.frequencies)
+        if other.n:
+            self._update_moments(other.n, other.mean, other.m2)
+        self.digest.merge(other.digest)
+        self.hll.merge(other.hll)
+
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct.update(other.distinct)
+        else:
+            self.distinct = None
+        if self.values is not None and other.values is not None:
+            self.values.extend(other.values)
+        else:
+            self.values = None
+        self._limit_exact_values()
+
+    def _update_range(self, minimum: Any, maximum: Any) -> None:
+        if self.minimum is None or minimum < self.minimum:
+            self.minimum = minimum
+        if self.maximum is None or maximum > self.maximum:
+            self.maximum = maximum
+
+    def _update_moments(self, n: int, mean: float, m2: float) -> None:
+        # the parallel variance algorithm of Chan et al.
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def _limit_exact_values(self) -> None:
+        if self.distinct is not None and len(self.distinct) > self.exact_limit:
+            self.distinct = None
+        if self.values is not None and sum(map(len, self.values)) > self.exact_limit:
+            self.values = None
+
+    @property
+    def unique_count(self) -> int:
+        if self.distinct is not None:
+            return len(self.distinct)
+        return self.hll.count()
+
+    @property
+    def stdev(self) -> Optional[float]:
+        if self.n < 2:
+            return None
+        return math.sqrt(self.m2 / (self.n - 1))
+
+    def quantiles(self, quantiles: List[float]) -> List[Optional[float]]:
+        if not self.n:
+            return [None] * len(quantiles)
+        if self.values is not None:
+            values = np.concatenate(self.values)
+            return [float(value) for value in np.quantile(values, quantiles)]
+        return [self.digest.quantile(quantile) for quantile in quantiles]
+
+    def histogram(self, buckets: int) -> Optional[Tuple[List[float], List[float]]]:
+        """Returns the boundaries and the number of values of `buckets`
+        equal-width buckets between the minimum and the maximum."""
+        if not self.n:
+            return None
+        minimum, maximum = float(self.minimum), float(self.maximum)
+        width = (maximum - minimum) / buckets or 1.0
+        boundaries = minimum + width * np.arange(buckets + 1)
+        if self.values is not None:
+            # the maximum is the upper boundary of the last bucket
+            index = np.floor((np.concatenate(self.values) - minimum) / width)
+            heights = np.bincount(
+                np.minimum(index.astype(np.int64), buckets - 1), minlength=buckets
+            ).astype(np.float64)
+        else:
+            heights = np.diff(self.digest.cdf(boundaries)) * self.n
+        return boundaries.tolist(), heights.tolist()
@@ -0,0 +1,210 @@
+import gzip
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from datahub_sap_hana.column_lineage_schema import View
+from datahub_sap_hana.inspector import (
+    ColumnDescription,
+    Inspector,
+    PrefetchedInspector,
+)
+
+# Bump this when the snapshot format changes.
+SNAPSHOT_FORMAT_VERSION = 1
+
+Row = Tuple[Any, ...]
+
+
+@dataclass
+class CatalogSnapshot:
+    """Everything the lineage extraction reads from SAP HANA.
+
+    The snapshot is stored as gzip compressed JSON. Tables and views are keyed
+    by schema and name as they are returned by the inspector.
+    """
+
+    schemas: List[str] = field(default_factory=list)
+    tables: Dict[str, List[str]] = field(default_factory=dict)
+    views: Dict[str, List[str]] = field(default_factory=dict)
+    columns: Dict[str, Dict[str, List[ColumnDescription]]] = field(default_factory=dict)
+    view_definitions: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # the rows of queries that were run by the source, keyed by the query
+    query_results: Dict[str, List[Row]] = field(default_factory=dict)
+
+    def save(self, path: str) -> None:
+        data = {"version": SNAPSHOT_FORMAT_VERSION, **asdict(self)}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogSnapshot":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        version = data.pop("version", None)
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {version} in {path}, "
+                f"expected {SNAPSHOT_FORMAT_VERSION}"
+            )
+        data["query_results"] = {
+            query: [tuple(row) for row in rows]
+            for query, rows in data["query_results"].items()
+        }
+        return cls(**data)
+
+
+def capture_snapshot(
+    inspector: Inspector,
+    schemas: Iterable[str],
+    views: Iterable[View],
+    query_results: Dict[str, List[Row]],
+) -> CatalogSnapshot:
+    """Reads the tables, views and columns of `schemas` from the inspector into a
+    snapshot, together with the given view definitions and query results."""
+    snapshot = CatalogSnapshot(query_results=query_results)
+    for schema in schemas:
+        snapshot.schemas.append(schema)
+        snapshot.tables[schema] = inspector.get_table_names(schema)
+        snapshot.views[schema] = inspector.get_view_names(schema)
+        snapshot.columns[schema] = {
+            name: [
+                {
+                    "name": column["name"],
+                    "type": str(column["type"]),
+                    "nullable": column["nullable"],
+                    "default": column["default"],
+                    "comment": column["comment"],
+                }
+                for column in inspector.get_columns(name, schema)
+            ]
+            for name in snapshot.tables[schema] + snapshot.views[schema]
+        }
+
+    for view in views:
+        snapshot.view_definitions.setdefault(view.schema, {})[view.name] = view.sql
+    return snapshot
+
+
+class SnapshotInspector:
+    """An implementation of the Inspector protocol that reads from a snapshot.
+
+    Tables that are not in the snapshot have no columns.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+
+    def get_columns(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> List[ColumnDescription]:
+        return self.snapshot.columns.get(schema or "", {}).get(table_name, [])
+
+    def get_table_names(self, schema: Optional[str] = None) -> List[str]:
+        return self.snapshot.tables.get(schema or "", [])
+
+    def get_schema_names(self) -> List[str]:
+        return self.snapshot.schemas
+
+    def get_view_names(self, schema: Optional[str] = None) -> List[str]:
+        return self.snapshot.views.get(schema or "", [])
+
+    def get_view_definition(self, view_name: str, schema: Optional[str] = None) -> str:
+        return self.snapshot.view_definitions.get(schema or "", {}).get(view_name, "")
+
+
+class ReplayInspector(PrefetchedInspector):
+    """A PrefetchedInspector that serves the columns and view definitions of a
+    snapshot without a database connection."""
+
+    def __init__(self, snapshot: CatalogSnapshot, max_size: int = 10000):
+        # there is no connection, prefetch and get_view_definitions don't use it
+        conn: Any = None
+        super().__init__(SnapshotInspector(snapshot), conn, max_size=max_size)
+        self.snapshot = snapshot
+        for schema, tables in snapshot.columns.items():
+            for table, columns in tables.items():
+                self.columns_index[(schema.lower(), table.lower())] = columns
+
+    def prefetch(self, schemas: Iterable[str]) -> None:
+        # the columns of all schemas in the snapshot are indexed up front
+        pass
+
+    def get_referenced_schemas(self, schemas: Iterable[str]) -> List[str]:
+        return []
+
+    def get_view_definitions(
+        self, schemas: Iterable[str]
+    ) -> Iterable[Tuple[str, str, Optional[str]]]:
+        for schema in schemas:
+            for view, definition in self.snapshot.view_definitions.get(
+                schema, {}
+            ).items():
+                yield schema, view, definition
+
+    def get_schema_view_names(self, schemas: Iterable[str]) -> List[Tuple[str, str]]:
+        return [
+            (schema, view)
+            for schema in schemas
+            for view in self.snapshot.view_definitions.get(schema, {})
+        ]
+
+    def get_view_definitions_by_name(
+        self, views: Iterable[Tuple[str, str]]
+    ) -> Iterable[Tuple[str, str, Optional[str]]]:
+        for schema, view in views:
+            yield schema, view, self.snapshot.view_definitions.get(schema, {}).get(view)
+
+
+class ReplayResult:
+    """The result of a query run on a ReplayConnection."""
+
+    returns_rows = True
+
+    def __init__(self, rows: Sequence[Row]):
+        self.rows = iter(rows)
+
+    def __iter__(self) -> Iterator[Row]:
+        return self.rows
+
+    def fetchmany(self, size: int) -> List[Row]:
+        return [row for _, row in zip(range(size), self.rows)]
+
+    def fetchall(self) -> List[Row]:
+        return list(self.rows)
+
+    def scalar(self) -> Any:
+        row = next(self.rows, None)
+        return row[0] if row else None
+
+
+class ReplayConnection:
+    """A fake connection that answers the queries recorded in a snapshot.
+
+    A query is answered with the recorded rows of the first recorded query that
+    it contains, so queries that wrap a recorded query, for example to filter
+    or order it, are answered too. The wrapping query is not evaluated.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+
+    def execute(self, query: Any, *args, **kwargs) -> ReplayResult:
+        sql = str(query)
+        for recorded_query, rows in self.snapshot.query_results.items():
+            if recorded_query.strip() in sql:
+                return ReplayResult(rows)
+        raise ValueError(f"The snapshot has no results for the query: {sql}")
+
+    def execution_options(self, **options) -> "ReplayConnection":
+        return self
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "ReplayConnection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,184 @@
+import logging
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.column_lineage_schema import (
+    ColumnLineage,
+    UpstreamLineageField,
+    View,
+)
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The lowercase schema and name of a view.
+ViewKey = Tuple[str, str]
+
+# The schema and name of a view as they are returned by the inspector.
+ViewName = Tuple[str, str]
+
+# Reads which views are built on top of other views.
+VIEW_DEPENDENCIES_QUERY = """
+SELECT
+    LOWER(DEPENDENT_SCHEMA_NAME) AS dependent_schema,
+    LOWER(DEPENDENT_OBJECT_NAME) AS dependent_view,
+    LOWER(BASE_SCHEMA_NAME) AS base_schema,
+    LOWER(BASE_OBJECT_NAME) AS base_view
+  FROM SYS.OBJECT_DEPENDENCIES
+WHERE DEPENDENT_OBJECT_TYPE = 'VIEW'
+  AND BASE_OBJECT_TYPE = 'VIEW'
+"""
+
+
+def view_key(schema: str, name: str) -> ViewKey:
+    return (schema.lower(), name.lower())
+
+
+def get_view_dependencies(conn: Connection) -> Dict[ViewKey, Set[ViewKey]]:
+    """Returns the views that each view selects from."""
+    dependencies: Dict[ViewKey, Set[ViewKey]] = {}
+    for dependent_schema, dependent_view, base_schema, base_view in conn.execute(
+        text(VIEW_DEPENDENCIES_QUERY)
+    ):
+        dependencies.setdefault((dependent_schema, dependent_view), set()).add(
+            (base_schema, base_view)
+        )
+    return dependencies
+
+
+def topological_order(
+    views: Iterable[ViewName], dependencies: Dict[ViewKey, Set[ViewKey]]
+) -> Tuple[List[ViewName], List[ViewName]]:
+    """Orders the views so that every view comes after the views it selects from.
+
+    The views are given by their schema and name, without their definitions,
+    so that only the names of all views are held in memory. Returns the ordered
+    views and the views that are part of a dependency cycle, or depend on one.
+    These can't be ordered and are left out of the first list. Dependencies on
+    views that are not in `views` are ignored.
+    """
+    names_by_key = {view_key(*name): name for name in views}
+
+    parents: Dict[ViewKey, Set[ViewKey]] = {}
+    children: Dict[ViewKey, List[ViewKey]] = {key: [] for key in names_by_key}
+    for key in names_by_key:
+        parents[key] = dependencies.get(key, set()) & names_by_key.keys() - {key}
+        for parent in parents[key]:
+            children[parent].append(key)
+
+    ready: Deque[ViewKey] = deque(key for key in names_by_key if not parents[key])
+    ordered: List[ViewName] = []
+    while ready:
+        key = ready.popleft()
+        ordered.append(names_by_key[key])
+        for child in children[key]:
+            parents[child].discard(key)
+            if not parents[child]:
+                ready.append(child)
+
+    cyclic = [names_by_key[key] for key in names_by_key if parents[key]]
+    return ordered, cyclic
+
+
+class TransitiveLineageResolver:
+    """Resolves the column lineage of views down to the base tables.
+
+    The views have to be resolved in topological order. The resolved lineage of
+    each view is kept in a memo table, so the lineage of a view that is built on
+    other views is resolved by looking up the columns of its parent views
+    instead of walking the whole chain again.
+
+    Lineage is followed through at most `max_depth` levels of views, columns of
+    views further up the chain are kept as they are. The memo entry of a view
+    is freed once all of its child views have been resolved or skipped.
+    """
+
+    def __init__(
+        self,
+        views: Iterable[ViewName],
+        dependencies: Dict[ViewKey, Set[ViewKey]],
+        max_depth: int = 10,
+    ):
+        self.max_depth = max_depth
+        self.memo: Dict[ViewKey, Dict[str, List[UpstreamLineageField]]] = {}
+        self.depths: Dict[ViewKey, int] = {}
+
+        keys = {view_key(*name) for name in views}
+        self.parents = {key: dependencies.get(key, set()) & keys for key in keys}
+        self.pending_children: Dict[ViewKey, int] = {}
+        for parents in self.parents.values():
+            for parent in parents:
+                self.pending_children[parent] = self.pending_children.get(parent, 0) + 1
+
+    def resolve(
+        self, view: View, view_lineage: List[ColumnLineage]
+    ) -> List[ColumnLineage]:
+        """Replaces the upstream columns of parent views with the resolved
+        upstream columns of these views.
+
+        Views that the resolver was not created with are returned unchanged.
+        """
+        key = view_key(view.schema, view.name)
+        if key not in self.parents:
+            return view_lineage
+
+        depth = 1
+        resolved_lineage: List[ColumnLineage] = []
+
+        for column_name, upstream_fields in view_lineage:
+            # the dict drops duplicate fields and keeps them in order
+            resolved: Dict[Tuple[str, str, str], UpstreamLineageField] = {}
+            for field in upstream_fields:
+                parent_fields = self._get_parent_fields(field)
+                if parent_fields is None:
+                    resolved.setdefault(_field_key(field), field)
+                    continue
+
+                parent = view_key(field.dataset.schema, field.dataset.name)
+                depth = max(depth, self.depths[parent] + 1)
+                for parent_field in parent_fields:
+                    resolved.setdefault(_field_key(parent_field), parent_field)
+
+            resolved_lineage.append((column_name, list(resolved.values())))
+
+        self.depths[key] = depth
+        if self.pending_children.get(key):
+            self.memo[key] = {
+                column_name.lower(): upstream_fields
+                for column_name, upstream_fields in resolved_lineage
+            }
+
+        self._release_parents(key)
+        return resolved_lineage
+
+    def skip(self, schema: str, name: str) -> None:
+        """Marks a view whose lineage will not be resolved, for example because
+        it has no definition or could not be parsed. Its own children keep the
+        upstream columns of the view as they are."""
+        self._release_parents(view_key(schema, name))
+
+    def _release_parents(self, key: ViewKey) -> None:
+        """Frees the memo entries of the parents of a view that have no other
+        children left to resolve. Each view releases its parents only once."""
+        for parent in self.parents.pop(key, ()):
+            self.pending_children[parent] -= 1
+            if not self.pending_children[parent]:
+                self.memo.pop(parent, None)
+
+    def _get_parent_fields(
+        self, field: UpstreamLineageField
+    ) -> Optional[List[UpstreamLineageField]]:
+        """Returns the resolved upstream columns of a column of a parent view, or
+        None if the column is not a column of a resolved view within the depth
+        limit."""
+        parent = view_key(field.dataset.schema, field.dataset.name)
+        parent_lineage = self.memo.get(parent)
+        if parent_lineage is None or self.depths[parent] >= self.max_depth:
+            return None
+        return parent_lineage.get(field.name.lower())
+
+
+def _field_key(field: UpstreamLineageField) -> Tuple[str, str, str]:
+    return (field.dataset.schema.lower(), field.dataset.name.lower(), field.name)
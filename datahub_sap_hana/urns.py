@@ -0,0 +1,39 @@
+from datahub.emitter import mce_builder
+from datahub.ingestion.source.sql.sql_config import BasicSQLAlchemyConfig
+
+from datahub_sap_hana.lru_cache import LRUCache
+
+
+class UrnFactory:
+    """Builds the dataset and schema field urns of a source.
+
+    Lineage refers to the same tables and columns many times, the urns are
+    therefore cached in an LRUCache of at most `max_size` entries. Equal urns
+    are the same string object, which also keeps the lineage aspects small in
+    memory.
+    """
+
+    def __init__(
+        self, platform: str, config: BasicSQLAlchemyConfig, max_size: int = 10000
+    ):
+        self.platform = platform
+        self.config = config
+        self.cache = LRUCache(max_size)
+
+    def dataset_urn(self, schema: str, name: str) -> str:
+        """Returns the urn of the table or view `name` in `schema`."""
+        return self.cache.get_or_compute(
+            ("dataset", schema, name),
+            lambda: mce_builder.make_dataset_urn(
+                self.platform,
+                self.config.get_identifier(schema, name),
+                self.config.env,
+            ),
+        )
+
+    def schema_field_urn(self, dataset_urn: str, field_path: str) -> str:
+        """Returns the urn of the column `field_path` of a dataset."""
+        return self.cache.get_or_compute(
+            ("field", dataset_urn, field_path),
+            lambda: mce_builder.make_schema_field_urn(dataset_urn, field_path),
+        )
@@ -0,0 +1,262 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from datahub.metadata.schema_classes import (
+    DatasetFieldProfileClass,
+    HistogramClass,
+    QuantileClass,
+    ValueFrequencyClass,
+)
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.profiling import (
+    HISTOGRAM_BUCKETS,
+    MAX_DISTINCT_VALUE_FREQUENCIES,
+    PARTITIONS_QUERY,
+    QUANTILES,
+    TableProfiler,
+    TableStatistics,
+    _str,
+    is_numeric,
+    is_temporal,
+)
+from datahub_sap_hana.sketches import ColumnSketch
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class VectorizedTableProfiler(TableProfiler):
+    """A TableProfiler that computes the column metrics on the client.
+
+    The profiled columns of the table, or of a sample of it, are read with a
+    single streaming query, `fetch_size` rows at a time. Each batch is turned
+    into NumPy arrays and added to a ColumnSketch per column, so all metrics
+    are computed in one pass with bounded memory.
+
+    The partitions of a partitioned table are read by queries of their own, up
+    to `partition_workers` at a time over connections from `get_connection`,
+    and their sketches are merged. No more data is read after
+    `table_deadline_seconds`.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        get_connection: Optional[Callable[[], Connection]] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.get_connection = get_connection
+        # the partition ids of a partitioned table
+        self.partitions: List[int] = []
+        # whether the metrics are computed from only a part of the table
+        self.partial = False
+
+    def get_statistics(self) -> TableStatistics:
+        statistics = super().get_statistics()
+        if statistics.partitions > 1:
+            params = {"schema": self.schema_name, "table": self.table_name}
+            self.partitions = [
+                part_id
+                for part_id, in self.conn.execute(text(PARTITIONS_QUERY), params)
+            ]
+        return statistics
+
+    def profile_columns(
+        self,
+        columns: List[Dict[str, Any]],
+        row_count: int,
+        unique_counts: Dict[str, int],
+    ) -> List[DatasetFieldProfileClass]:
+        deadline = None
+        if self.config.table_deadline_seconds is not None:
+            deadline = time.monotonic() + self.config.table_deadline_seconds
+        if not columns:
+            return []
+        self.partial = self.source_ref != self.table_ref
+        sketches = self.sketch_columns(columns, deadline)
+
+        scanned_rows = sketches[0].rows
+        if self.partial and not scanned_rows:
+            logger.warning(f"No rows of {self.dataset_name} were read in time")
+            return []
+        if self.partial:
+            self.scale = row_count / scanned_rows
+        return [
+            self.field_profile(column, sketch, unique_counts.get(column["name"]))
+            for column, sketch in zip(columns, sketches)
+        ]
+
+    def new_sketches(self, columns: List[Dict[str, Any]]) -> List[ColumnSketch]:
+        config = self.config
+        return [
+            ColumnSketch(
+                is_numeric(column["type"]),
+                exact_limit=config.sketch_exact_limit,
+                frequency_limit=MAX_DISTINCT_VALUE_FREQUENCIES,
+                sample_limit=config.field_sample_values_limit,
+            )
+            for column in columns
+        ]
+
+    def sketch_columns(
+        self, columns: List[Dict[str, Any]], deadline: Optional[float]
+    ) -> List[ColumnSketch]:
+        """Reads the columns of the table, partition by partition if it is
+        partitioned, and returns a sketch of each."""
+        if not self.partitions:
+            sketches, complete = self.read_sketches(
+                self.conn, self.source_ref, columns, deadline
+            )
+            self.count_read(sketches, complete)
+            return sketches
+
+        sketches = self.new_sketches(columns)
+        for partition_sketches, complete in self.read_partitions(columns, deadline):
+            for sketch, partition_sketch in zip(sketches, partition_sketches):
+                sketch.merge(partition_sketch)
+            self.count_read(partition_sketches, complete)
+        return sketches
+
+    def read_partitions(
+        self, columns: List[Dict[str, Any]], deadline: Optional[float]
+    ) -> Iterator[Tuple[List[ColumnSketch], bool]]:
+        """Reads the partitions in a pool of threads, each over a connection of
+        its own, or one after another over the connection of the table."""
+        workers = min(self.config.partition_workers, len(self.partitions))
+        if workers <= 1 or self.get_connection is None:
+            for part_id in self.partitions:
+                yield self.read_partition(self.conn, part_id, columns, deadline)
+            return
+
+        def read_pooled(part_id: int) -> Tuple[List[ColumnSketch], bool]:
+            with self.get_connection() as conn:  # type: ignore
+                return self.read_partition(conn, part_id, columns, deadline)
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hana-partition"
+        ) as executor:
+            futures = [
+                executor.submit(read_pooled, part_id) for part_id in self.partitions
+            ]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def count_read(self, sketches: List[ColumnSketch], complete: bool) -> None:
+        # reads are only skipped, without a query, when the deadline has passed
+        self.scans += sketches[0].rows > 0 or complete
+        self.partial |= not complete
+
+    def read_partition(
+        self,
+        conn: Connection,
+        part_id: int,
+        columns: List[Dict[str, Any]],
+        deadline: Optional[float],
+    ) -> Tuple[List[ColumnSketch], bool]:
+        source_ref = f"{self.table_ref} PARTITION ({part_id}){self.sample_clause}"
+        return self.read_sketches(conn, source_ref, columns, deadline)
+
+    def read_sketches(
+        self,
+        conn: Connection,
+        source_ref: str,
+        columns: List[Dict[str, Any]],
+        deadline: Optional[float],
+    ) -> Tuple[List[ColumnSketch], bool]:
+        """Reads the columns from `source_ref` in batches and returns a sketch of
+        each, and whether all rows were read before the deadline."""
+        sketches = self.new_sketches(columns)
+        select = ", ".join(self.quote_column(column["name"]) for column in columns)
+        with self.scan_slots or nullcontext():
+            if deadline is not None and time.monotonic() > deadline:
+                return sketches, False
+            result = conn.execution_options(stream_results=True).execute(
+                text(f"SELECT {select} FROM {source_ref}")
+            )
+            try:
+                while rows := result.fetchmany(self.config.fetch_size):
+                    for sketch, values in zip(sketches, zip(*rows)):
+                        batch = np.empty(len(values), dtype=object)
+                        batch[:] = values
+                        sketch.update(batch)
+                    if deadline is not None and time.monotonic() > deadline:
+                        return sketches, False
+            finally:
+                result.close()
+        return sketches, True
+
+    def field_profile(
+        self,
+        column: Dict[str, Any],
+        sketch: ColumnSketch,
+        unique_count: Optional[int],
+    ) -> DatasetFieldProfileClass:
+        config = self.config
+        numeric = is_numeric(column["type"])
+        ordered = numeric or is_temporal(column["type"])
+        field_profile = DatasetFieldProfileClass(fieldPath=column["name"])
+
+        if config.include_field_null_count:
+            field_profile.nullCount = round(sketch.nulls * self.scale)
+            if sketch.rows:
+                field_profile.nullProportion = sketch.nulls / sketch.rows
+        # the distinct count of a sample says little about the whole table
+        if unique_count is None and not self.partial:
+            unique_count = sketch.unique_count
+        if config.include_field_distinct_count and unique_count is not None:
+            field_profile.uniqueCount = unique_count
+            if sketch.non_null:
+                field_profile.uniqueProportion = min(
+                    unique_count / (sketch.non_null * self.scale), 1.0
+                )
+        if ordered and config.include_field_min_value:
+            field_profile.min = _str(sketch.minimum)
+        if ordered and config.include_field_max_value:
+            field_profile.max = _str(sketch.maximum)
+        if numeric and sketch.n:
+            if config.include_field_mean_value:
+                field_profile.mean = str(sketch.mean)
+            if config.include_field_stddev_value:
+                field_profile.stdev = _str(sketch.stdev)
+
+        if numeric and (
+            config.include_field_median_value or config.include_field_quantiles
+        ):
+            quantiles = dict(zip(QUANTILES, sketch.quantiles(list(QUANTILES))))
+            if config.include_field_median_value:
+                field_profile.median = _str(quantiles[0.5])
+            if config.include_field_quantiles:
+                field_profile.quantiles = [
+                    QuantileClass(quantile=str(quantile), value=str(value))
+                    for quantile, value in quantiles.items()
+                    if value is not None
+                ]
+
+        frequencies = sketch.frequencies.most_common()
+        if config.include_field_distinct_value_frequencies and frequencies is not None:
+            field_profile.distinctValueFrequencies = [
+                ValueFrequencyClass(
+                    value=str(value), frequency=round(frequency * self.scale)
+                )
+                for value, frequency in frequencies
+            ]
+        histogram = sketch.histogram(HISTOGRAM_BUCKETS) if numeric else None
+        if config.include_field_histogram and histogram is not None:
+            boundaries, heights = histogram
+            field_profile.histogram = HistogramClass(
+                boundaries=[str(boundary) for boundary in boundaries],
+                heights=[height * self.scale for height in heights],
+            )
+        if config.include_field_sample_values:
+            field_profile.sampleValues = [str(value) for value in sketch.samples]
+        return field_profile
@@ -10,7 +10,7 @@ logging.getLogger().setLevel(logging.DEBUG)
 os.putenv("DATAHUB_DEBUG", "1")
 
 # Disable telemetry
-os.putenv("DATAHUB_TELEMETRY_ENABLED", "false")
+os.environ["DATAHUB_TELEMETRY_ENABLED"] = "false"
 
 
 def pytest_addoption(parser: pytest.Parser):
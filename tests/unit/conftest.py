@@ -0,0 +1,67 @@
+from typing import Any, Callable, Iterator, Optional
+
+import pytest
+from datahub.ingestion.api.common import PipelineContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.ingestion import HanaSource
+
+# A minimal copy of the SAP HANA system views that the source reads from. The
+# tables are created in an attached sqlite database called SYS, so the queries
+# can be run unchanged against them.
+SYS_TABLES = [
+    """CREATE TABLE SYS.TABLE_COLUMNS (
+        SCHEMA_NAME TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT, POSITION INTEGER,
+        DATA_TYPE_NAME TEXT, DEFAULT_VALUE TEXT, IS_NULLABLE TEXT, COMMENTS TEXT
+    )""",
+    """CREATE TABLE SYS.VIEW_COLUMNS (
+        SCHEMA_NAME TEXT, VIEW_NAME TEXT, COLUMN_NAME TEXT, POSITION INTEGER,
+        DATA_TYPE_NAME TEXT, DEFAULT_VALUE TEXT, IS_NULLABLE TEXT, COMMENTS TEXT
+    )""",
+    """CREATE TABLE SYS.VIEWS (SCHEMA_NAME TEXT, VIEW_NAME TEXT, DEFINITION TEXT)""",
+    """CREATE TABLE SYS.OBJECT_DEPENDENCIES (
+        BASE_SCHEMA_NAME TEXT, BASE_OBJECT_NAME TEXT, DEPENDENT_SCHEMA_NAME TEXT,
+        DEPENDENT_OBJECT_NAME TEXT, DEPENDENT_OBJECT_TYPE TEXT,
+        BASE_OBJECT_TYPE TEXT DEFAULT 'TABLE'
+    )""",
+    """CREATE TABLE SYS.M_TABLES (
+        SCHEMA_NAME TEXT, TABLE_NAME TEXT, RECORD_COUNT INTEGER, TABLE_SIZE INTEGER
+    )""",
+    """CREATE TABLE SYS.M_CS_TABLES (
+        SCHEMA_NAME TEXT, TABLE_NAME TEXT, PART_ID INTEGER, RECORD_COUNT INTEGER,
+        MEMORY_SIZE_IN_TOTAL INTEGER
+    )""",
+    """CREATE TABLE SYS.M_CS_COLUMNS (
+        SCHEMA_NAME TEXT, TABLE_NAME TEXT, PART_ID INTEGER, COLUMN_NAME TEXT,
+        DISTINCT_COUNT INTEGER, LOADED TEXT
+    )""",
+]
+
+
+@pytest.fixture
+def sys_conn() -> Iterator[Connection]:
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS SYS"))
+        for statement in SYS_TABLES:
+            conn.execute(text(statement))
+        yield conn
+
+
+@pytest.fixture
+def hana_source() -> Callable[..., HanaSource]:
+    """Returns a factory of sources for a database called hxe, the keyword
+    arguments are added to or replace the keys of its config."""
+
+    def create(ctx: Optional[PipelineContext] = None, **config: Any) -> HanaSource:
+        config = {
+            "username": "user",
+            "password": "password",
+            "host_port": "host:1521",
+            "database": "hxe",
+            **config,
+        }
+        return HanaSource.create(config, ctx or PipelineContext(run_id="hana-test"))
+
+    return create
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from datahub_sap_hana.benchmark import generate_catalog, run_benchmark
+from datahub_sap_hana.ingestion import LINEAGE_QUERY
+from datahub_sap_hana.transitive import VIEW_DEPENDENCIES_QUERY
+
+
+def test_generate_catalog():
+    snapshot = generate_catalog(schemas=2, tables=3, views=4, depth=2, columns=5)
+
+    assert snapshot.schemas == ["schema_0", "schema_1"]
+    assert snapshot.tables["schema_0"] == ["table_0", "table_1", "table_2"]
+    assert len(snapshot.columns["schema_1"]["view_3"]) == 5
+    # the first view of a chain joins tables of two schemas
+    assert ("table_1", "schema_0", "view_0", "schema_1") in snapshot.query_results[
+        LINEAGE_QUERY
+    ]
+    # the other views select from the previous view of the chain
+    assert snapshot.query_results[VIEW_DEPENDENCIES_QUERY] == [
+        ("schema_0", "view_1", "schema_0", "view_0"),
+        ("schema_0", "view_3", "schema_0", "view_2"),
+        ("schema_1", "view_1", "schema_1", "view_0"),
+        ("schema_1", "view_3", "schema_1", "view_2"),
+    ]
+
+
+def test_run_benchmark(tmp_path: Path):
+    path = str(tmp_path / "catalog.json.gz")
+    generate_catalog(schemas=2, tables=2, views=3, depth=3, columns=4).save(path)
+
+    results = run_benchmark(path, {"column_lineage_transitive": True})
+
+    assert results["workunits"] == 6
+    assert results["counters"]["fine_grained_lineages"] == 24
+    assert results["peak_rss_mb"] > 0
+    assert "column_lineage_parsing" in results["timings"]
@@ -0,0 +1,271 @@
+import multiprocessing
+import os
+import time
+from typing import Callable, List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+from sqlglot import parse_one
+from sqlglot.lineage import Node, lineage
+
+from datahub_sap_hana.column_lineage_schema import Table, UpstreamLineageField, View
+from datahub_sap_hana.ingestion import HanaSource
+from datahub_sap_hana.inspector import ColumnDescription, PrefetchedCatalog
+from datahub_sap_hana.lineage import (
+    _WorkerPool,
+    column_lineage,
+    extract_view_lineage,
+    iter_view_lineage,
+)
+
+VIEWS = [
+    # view with a cte
+    """SELECT H.NAME, R.TYPE, R.PRICE
+    FROM HOTEL_SCHEMA.HOTEL AS H
+    JOIN HOTEL_SCHEMA.ROOM AS R ON R.HNO = H.HNO
+    WHERE R.PRICE = (SELECT MAX_PRICE FROM MAX_PRICE_CTE)""",
+    # view with quoted aliases and aggregates
+    """SELECT
+      H.NAME AS "HOTEL NAME",
+      R.TYPE AS "ROOM TYPE",
+      COUNT(R.TYPE) AS "NUMBER OF RESERVATIONS",
+      AVG(R.PRICE) AS "AVERAGE ROOM PRICE"
+    FROM HOTEL_SCHEMA.RESERVATION AS RES
+      JOIN HOTEL_SCHEMA.ROOM AS R ON R.HNO = RES.HNO AND R.TYPE = RES.TYPE
+      JOIN HOTEL_SCHEMA.HOTEL AS H ON H.HNO = RES.HNO
+    GROUP BY H.NAME, R.TYPE""",
+    # view with derived tables referenced by several columns
+    """SELECT T.HNO, T.TOTAL, T.TOTAL * 2 AS DOUBLE_TOTAL, C.NAME
+    FROM (
+      SELECT R.HNO, SUM(R.PRICE) AS TOTAL FROM HOTEL_SCHEMA.ROOM AS R GROUP BY R.HNO
+    ) AS T
+    JOIN (SELECT HNO, NAME FROM HOTEL_SCHEMA.HOTEL) AS C ON C.HNO = T.HNO""",
+    # view with a union
+    """SELECT HNO, NAME FROM HOTEL_SCHEMA.HOTEL
+    UNION ALL
+    SELECT CNO AS HNO, NAME FROM HOTEL_SCHEMA.CUSTOMER""",
+    # view with a unary operator
+    "SELECT -PRICE AS DISCOUNTED_PRICE FROM HOTEL_SCHEMA.ROOM",
+]
+
+
+def _describe(node: Node) -> tuple:
+    """Returns the parts of a node that are used to build the column lineage,
+    the sources of intermediate nodes are not compared."""
+    return (
+        node.name,
+        sorted(
+            (child.name, "" if child.downstream else child.source.sql())
+            for child in node.downstream
+        ),
+        sorted(leaf.name for leaf in node.walk() if not leaf.downstream),
+    )
+
+
+def _sqlglot_lineage(view_sql: str) -> List[Node]:
+    selected_columns = parse_one(view_sql).named_selects  # type: ignore
+    return [lineage(column.lower(), view_sql.lower()) for column in selected_columns]
+
+
+@pytest.mark.parametrize("view_sql", VIEWS)
+def test_column_lineage_matches_sqlglot_lineage(view_sql: str):
+    expected = _sqlglot_lineage(view_sql)
+
+    actual = column_lineage(view_sql)
+
+    assert [_describe(node) for node in actual] == [
+        _describe(node) for node in expected
+    ]
+
+
+def test_iter_view_lineage_keeps_view_order_with_workers():
+    views = [
+        View(schema="hotel_schema", name=f"view_{i}", sql=view_sql)
+        for i, view_sql in enumerate(VIEWS * 3)
+    ]
+
+    serial = list(iter_view_lineage(views))
+    parallel = list(iter_view_lineage(views, workers=2, max_in_flight=2))
+
+    assert [view.name for view, _ in parallel] == [view.name for view in views]
+    assert parallel == serial
+    assert serial[0][1][2] == (
+        "price",
+        [
+            UpstreamLineageField(
+                name="price", dataset=Table(schema="hotel_schema", name="room")
+            )
+        ],
+    )
+
+
+def _column(name: str) -> ColumnDescription:
+    return {
+        "name": name,
+        "type": "INTEGER",
+        "nullable": True,
+        "default": None,
+        "comment": None,
+    }
+
+
+CATALOG = PrefetchedCatalog(
+    {
+        ("hotel_schema", "room"): [_column("HNO"), _column("Type"), _column("PRICE")],
+        ("hotel_schema", "hotel"): [_column("HNO"), _column("NAME")],
+        ("hotel_schema", "rooms"): [
+            _column("HNO"),
+            _column("Type"),
+            _column("PRICE"),
+            _column("NAME"),
+        ],
+    }
+)
+
+
+def test_extract_view_lineage_resolves_star_with_catalog():
+    view = View(
+        schema="hotel_schema",
+        name="rooms",
+        sql="SELECT R.*, NAME FROM ROOM AS R JOIN HOTEL AS H ON H.HNO = R.HNO",
+    )
+
+    view_lineage = extract_view_lineage(view, CATALOG)
+
+    room = Table(schema="hotel_schema", name="room")
+    assert view_lineage == [
+        ("HNO", [UpstreamLineageField(name="HNO", dataset=room)]),
+        ("Type", [UpstreamLineageField(name="Type", dataset=room)]),
+        ("PRICE", [UpstreamLineageField(name="PRICE", dataset=room)]),
+        (
+            "NAME",
+            [
+                UpstreamLineageField(
+                    name="NAME", dataset=Table(schema="hotel_schema", name="hotel")
+                )
+            ],
+        ),
+    ]
+    assert list(iter_view_lineage([view], workers=2, catalog=CATALOG)) == [
+        (view, view_lineage)
+    ]
+
+
+def _view_lineage_with_workers(
+    hana_source: Callable[..., HanaSource], conn: Connection, workers: int
+) -> list:
+    source = hana_source(include_column_lineage=True, column_lineage_workers=workers)
+    source.get_column_lineage_schemas = lambda inspector: ["reporting"]
+    inspector = source.get_column_lineage_inspector(conn)
+    try:
+        return [
+            (view, [(field.name, upstreams) for field, upstreams in view_lineage])
+            for view, view_lineage in source.get_column_view_lineage_elements(inspector)
+        ]
+    finally:
+        inspector.close()
+
+
+def test_view_lineage_does_not_depend_on_the_number_of_workers(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    # the view selects from a table in a schema that is not allowed
+    for position, column in enumerate(["HNO", "Type", "PRICE"]):
+        sys_conn.execute(
+            text(
+                "INSERT INTO SYS.TABLE_COLUMNS VALUES "
+                "('HOTEL_SCHEMA', 'ROOM', :column, :position, 'INTEGER', NULL, "
+                "'TRUE', NULL)"
+            ),
+            {"column": column, "position": position},
+        )
+    sys_conn.execute(
+        text(
+            "INSERT INTO SYS.VIEWS VALUES "
+            "('REPORTING', 'ROOMS', 'SELECT * FROM HOTEL_SCHEMA.ROOM')"
+        )
+    )
+    sys_conn.execute(
+        text(
+            "INSERT INTO SYS.OBJECT_DEPENDENCIES VALUES "
+            "('HOTEL_SCHEMA', 'ROOM', 'REPORTING', 'ROOMS', 'VIEW', 'TABLE')"
+        )
+    )
+
+    serial = _view_lineage_with_workers(hana_source, sys_conn, workers=0)
+    parallel = _view_lineage_with_workers(hana_source, sys_conn, workers=2)
+
+    room = Table(schema="hotel_schema", name="room")
+    assert serial == parallel
+    # the columns of the view are not in the catalog, only those of the table
+    assert serial[0][1] == [
+        (name.lower(), [UpstreamLineageField(name=name, dataset=room)])
+        for name in ["hno", "Type", "price"]
+    ]
+
+
+def _slow_column_lineage(view_sql: str, *args) -> List[Node]:
+    if "slow" in view_sql.lower():
+        time.sleep(60)
+    return column_lineage(view_sql, *args)
+
+
+def test_iter_view_lineage_skips_views_over_budget():
+    views = [
+        View(schema="hotel_schema", name="broken", sql="SELECT FROM WHERE"),
+        View(schema="hotel_schema", name="large", sql=VIEWS[1]),
+        View(schema="hotel_schema", name="small", sql=VIEWS[4]),
+    ]
+    skipped: List[str] = []
+
+    results = list(
+        iter_view_lineage(
+            views,
+            max_ast_nodes=20,
+            on_skip=lambda view, reason: skipped.append(f"{view.name}: {reason}"),
+        )
+    )
+
+    assert [view.name for view, _ in results] == ["small"]
+    assert skipped[0].startswith("broken: ParseError")
+    assert skipped[1].startswith("large: ViewTooComplexError")
+
+
+def test_iter_view_lineage_kills_workers_that_time_out(monkeypatch):
+    monkeypatch.setattr("datahub_sap_hana.lineage.column_lineage", _slow_column_lineage)
+    views = [
+        View(schema="hotel_schema", name="first", sql=VIEWS[4]),
+        View(schema="hotel_schema", name="slow", sql="SELECT 1 AS SLOW"),
+        View(schema="hotel_schema", name="last", sql=VIEWS[4]),
+    ]
+    skipped: List[str] = []
+
+    start = time.monotonic()
+    results = list(
+        iter_view_lineage(
+            views,
+            workers=2,
+            timeout=1,
+            on_skip=lambda view, reason: skipped.append(view.name),
+        )
+    )
+
+    assert time.monotonic() - start < 30
+    assert [view.name for view, _ in results] == ["first", "last"]
+    assert skipped == ["slow"]
+
+
+def test_worker_pool_restart_terminates_its_running_workers():
+    pool = _WorkerPool(1, None)
+    try:
+        worker_pid = pool.submit(os.getpid).result()
+        pool.submit(time.sleep, 60)
+
+        pool.restart()
+
+        children = {process.pid for process in multiprocessing.active_children()}
+        assert worker_pid not in children
+        assert pool.submit(os.getpid).result() != worker_pid
+    finally:
+        pool.shutdown()
@@ -1,4 +1,4 @@
-from datahub_sap_hana.ingestion import HanaConfig
+from datahub_sap_hana.ingestion import HanaConfig, HanaSource
 
 scheme = "test_table"
 table = "logs"
@@ -22,3 +22,9 @@ def test_database_alias_takes_precendence():
 def test_database_in_identifier():
     config = HanaConfig.parse_obj({**_base_config(), "database": "test_db"})
     assert config.get_identifier(scheme, table) == "test_db.test_table.logs"
+
+
+def test_source_is_registered_with_its_config():
+    assert HanaSource.get_platform_id() == "hana"
+    assert HanaSource.get_platform_name() == "SAP Hana"
+    assert HanaSource.get_config_class() is HanaConfig
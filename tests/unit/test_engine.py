@@ -0,0 +1,102 @@
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import event, text
+
+from datahub_sap_hana.ingestion import HanaSource
+
+
+def test_connections_are_reused(tmp_path: Path, hana_source: Callable[..., HanaSource]):
+    source = hana_source(
+        sqlalchemy_uri=f"sqlite:///{tmp_path / 'hana.db'}", pool_size=1
+    )
+
+    with source.get_db_connection() as conn:
+        conn.execute(text("SELECT 1"))
+    for inspector in source.get_inspectors():
+        inspector.get_schema_names()
+    with source.get_db_connection() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert source.get_engine() is source.engine
+    assert source.report.connections_opened == 1
+    assert source.report.connection_open_time_seconds > 0
+
+
+def test_close_disposes_the_engine(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = hana_source(
+        sqlalchemy_uri=f"sqlite:///{tmp_path / 'hana.db'}", pool_size=1
+    )
+    with source.get_db_connection() as conn:
+        conn.execute(text("SELECT 1"))
+
+    source.close()
+
+    assert source.engine is None
+
+
+def test_pool_overflow_covers_the_profiling_connections(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = hana_source(
+        sqlalchemy_uri=f"sqlite:///{tmp_path / 'hana.db'}",
+        max_overflow=7,
+        profiling={
+            "enabled": True,
+            "engine": "vectorized",
+            "max_workers": 2,
+            "partition_workers": 3,
+        },
+    )
+    # the engine exists before SQLAlchemySource sets its own max_overflow
+    engine = source.get_engine()
+    source.config.options.setdefault("max_overflow", 2)
+
+    assert engine.pool._max_overflow == 8  # type: ignore
+    source.config.max_overflow = 10
+    source.engine = None
+    assert source.get_engine().pool._max_overflow == 10  # type: ignore
+
+
+def _sharded_source(
+    hana_source: Callable[..., HanaSource], tmp_path: Path, max_workers: int
+) -> HanaSource:
+    source = hana_source(
+        sqlalchemy_uri=f"sqlite:///{tmp_path / 'hana.db'}",
+        schema_pattern={"allow": [".*"]},
+        max_workers=max_workers,
+    )
+
+    # every connection sees the same schemas, each one is an attached database
+    def attach_schemas(dbapi_connection, connection_record):
+        for schema in ["sales", "hr"]:
+            dbapi_connection.execute(
+                f"ATTACH DATABASE '{tmp_path / schema}.db' AS {schema}"
+            )
+
+    event.listen(source.get_engine(), "connect", attach_schemas)
+    return source
+
+
+def test_schemas_are_reflected_in_parallel(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = _sharded_source(hana_source, tmp_path, max_workers=1)
+    with source.get_db_connection() as conn:
+        for schema in ["main", "sales", "hr"]:
+            conn.execute(text(f"CREATE TABLE {schema}.t (id INTEGER PRIMARY KEY)"))
+            conn.execute(text(f"CREATE VIEW {schema}.v AS SELECT id FROM t"))
+    serial = [wu.id for wu in source.get_workunits_internal()]
+
+    source = _sharded_source(hana_source, tmp_path, max_workers=3)
+    parallel = [wu.id for wu in source.get_workunits_internal()]
+
+    # the work units are merged in schema order
+    assert parallel == serial
+    instrumentation = source.instrumentation.as_obj()
+    assert instrumentation["counters"]["schemas_reflected"] == 3
+    assert set(
+        instrumentation["histograms"]["schema_reflection_seconds"]["largest"]
+    ) == {"main", "sales", "hr"}
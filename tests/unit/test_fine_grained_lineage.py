@@ -0,0 +1,68 @@
+from typing import Callable
+
+from datahub_sap_hana.column_lineage_schema import (
+    DownstreamLineageField,
+    Table,
+    UpstreamLineageField,
+    View,
+)
+from datahub_sap_hana.ingestion import HanaSource
+
+VIEW = View(schema="hotel", name="rooms", sql="")
+ROOM = Table(schema="hotel", name="room")
+
+
+def _column_view_lineage_elements(inspector):
+    yield VIEW, [
+        (
+            DownstreamLineageField(name=name, dataset=VIEW),
+            [UpstreamLineageField(name=upstream, dataset=ROOM) for upstream in ups],
+        )
+        for name, ups in [
+            ("price", ["price", "free", "price"]),
+            ("free", ["free"]),
+            ("total", ["free", "price"]),
+        ]
+    ]
+
+
+def _field(table: str, column: str) -> str:
+    return (
+        "urn:li:schemaField:"
+        f"(urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel.{table},PROD),{column})"
+    )
+
+
+def test_one_entry_per_downstream_column(hana_source: Callable[..., HanaSource]):
+    source = hana_source()
+    source.get_column_view_lineage_elements = _column_view_lineage_elements
+
+    [(lineages, upstream_datasets, _)] = source.build_fine_grained_lineage(None)
+
+    assert [(lineage.downstreams, lineage.upstreams) for lineage in lineages] == [
+        ([_field("rooms", "price")], [_field("room", "price"), _field("room", "free")]),
+        ([_field("rooms", "free")], [_field("room", "free")]),
+        ([_field("rooms", "total")], [_field("room", "free"), _field("room", "price")]),
+    ]
+    assert upstream_datasets == {
+        "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel.room,PROD)"
+    }
+
+
+def test_columns_with_the_same_upstreams_are_merged(
+    hana_source: Callable[..., HanaSource]
+):
+    source = hana_source(merge_column_lineage=True)
+    source.get_column_view_lineage_elements = _column_view_lineage_elements
+
+    [(lineages, _, _)] = source.build_fine_grained_lineage(None)
+
+    assert [(lineage.downstreams, lineage.upstreams) for lineage in lineages] == [
+        (
+            [_field("rooms", "price"), _field("rooms", "total")],
+            [_field("room", "price"), _field("room", "free")],
+        ),
+        ([_field("rooms", "free")], [_field("room", "free")]),
+    ]
+    assert lineages[0].downstreamType == "FIELD_SET"
+    assert lineages[1].downstreamType == "FIELD"
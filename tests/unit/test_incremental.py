@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from datahub.ingestion.api.common import PipelineContext
+from datahub.ingestion.api.ingestion_job_checkpointing_provider_base import (
+    IngestionCheckpointingProviderBase,
+    JobId,
+)
+from datahub.ingestion.source.state_provider.state_provider_registry import (
+    ingestion_checkpoint_provider_registry,
+)
+from datahub.metadata.schema_classes import DatahubIngestionCheckpointClass
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.ingestion import HanaSource
+
+
+class MemoryCheckpointProvider(IngestionCheckpointingProviderBase):
+    """A checkpointing state provider that keeps the committed checkpoints in
+    memory, so that they are read by the next run of a test."""
+
+    checkpoints: Dict[JobId, DatahubIngestionCheckpointClass] = {}
+
+    @classmethod
+    def create(
+        cls, config_dict: Dict[str, Any], ctx: PipelineContext, name: str
+    ) -> "MemoryCheckpointProvider":
+        return cls(name)
+
+    def commit(self) -> None:
+        self.checkpoints.update(self.state_to_commit)
+
+    def get_latest_checkpoint(
+        self, pipeline_name: str, job_name: JobId
+    ) -> Optional[DatahubIngestionCheckpointClass]:
+        return self.checkpoints.get(job_name)
+
+
+if "memory" not in ingestion_checkpoint_provider_registry.mapping:
+    ingestion_checkpoint_provider_registry.register("memory", MemoryCheckpointProvider)
+
+
+def test_unchanged_tables_are_not_reflected(hana_source: Callable[..., HanaSource]):
+    source = hana_source(incremental=True)
+    source.changed_objects = {("hotel_schema", "room")}
+    config = source.config
+
+    # the inspector must not be used for tables that did not change
+    inspector = None
+    unchanged = list(
+        source._process_table(
+            "hxe.hotel_schema.hotel", inspector, "hotel_schema", "hotel", config
+        )
+    )
+
+    assert len(unchanged) == 1
+    assert unchanged[0].get_urn() == (
+        "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel_schema.hotel,PROD)"
+    )
+    assert source.is_changed("HOTEL_SCHEMA", "ROOM")
+    assert not source.is_dataset_eligible_for_profiling(
+        "hxe.hotel_schema.hotel", config, inspector, None
+    )
+
+
+def test_everything_changed_without_watermark(hana_source: Callable[..., HanaSource]):
+    source = hana_source(incremental=True)
+
+    assert source.changed_objects is None
+    assert source.is_changed("hotel_schema", "hotel")
+
+
+STATEFUL_INGESTION = {"enabled": True, "state_provider": {"type": "memory"}}
+
+
+def _run(
+    hana_source: Callable[..., HanaSource],
+    conn: Connection,
+    full_refresh: bool = False,
+) -> Optional[set]:
+    """Runs the incremental stage of a source and commits its checkpoint."""
+    ctx = PipelineContext(run_id="hana-test", pipeline_name="hana")
+    source = hana_source(
+        ctx,
+        incremental=True,
+        full_refresh=full_refresh,
+        stateful_ingestion=STATEFUL_INGESTION,
+    )
+    assert source.incremental_handler is not None
+
+    changed_objects = source.incremental_handler.get_changed_objects(
+        conn, full_refresh=full_refresh
+    )
+    source.close()
+    for _, committable in ctx.get_committables():
+        committable.commit()
+    return changed_objects
+
+
+def test_objects_created_since_the_last_run_are_changed(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    MemoryCheckpointProvider.checkpoints.clear()
+    sys_conn.execute(text("CREATE TABLE DUMMY (DUMMY TEXT)"))
+    sys_conn.execute(text("INSERT INTO DUMMY VALUES ('X')"))
+    sys_conn.execute(
+        text("CREATE TABLE SYS.TABLES (SCHEMA_NAME, TABLE_NAME, CREATE_TIME)")
+    )
+    sys_conn.execute(text("ALTER TABLE SYS.VIEWS ADD COLUMN CREATE_TIME"))
+    sys_conn.execute(
+        text("INSERT INTO SYS.TABLES VALUES ('HOTEL', 'ROOM', '2000-01-01 00:00:00')")
+    )
+
+    # without a watermark everything is ingested
+    assert _run(hana_source, sys_conn) is None
+    assert list(MemoryCheckpointProvider.checkpoints) == ["hana_incremental"]
+
+    sys_conn.execute(
+        text("INSERT INTO SYS.TABLES VALUES ('HOTEL', 'GUEST', '2999-01-01 00:00:00')")
+    )
+    sys_conn.execute(
+        text(
+            "INSERT INTO SYS.VIEWS VALUES "
+            "('HOTEL', 'FREE_ROOMS', 'SELECT 1 FROM DUMMY', '2999-01-01 00:00:00')"
+        )
+    )
+    assert _run(hana_source, sys_conn) == {("hotel", "guest"), ("hotel", "free_rooms")}
+    assert _run(hana_source, sys_conn, full_refresh=True) is None
+    # a full refresh stores a watermark too, the next run continues from it
+    assert _run(hana_source, sys_conn) == {("hotel", "guest"), ("hotel", "free_rooms")}
+
+
+def test_watermark_is_read_back_from_the_checkpoint(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    MemoryCheckpointProvider.checkpoints.clear()
+    sys_conn.execute(text("CREATE TABLE DUMMY (DUMMY TEXT)"))
+    sys_conn.execute(text("INSERT INTO DUMMY VALUES ('X')"))
+    _run(hana_source, sys_conn)
+    watermark = sys_conn.execute(text("SELECT CURRENT_TIMESTAMP")).scalar()
+
+    source = hana_source(
+        PipelineContext(run_id="hana-test", pipeline_name="hana"),
+        incremental=True,
+        stateful_ingestion=STATEFUL_INGESTION,
+    )
+    last_watermark = source.incremental_handler.get_last_watermark()  # type: ignore
+
+    assert isinstance(last_watermark, datetime)
+    assert abs((datetime.fromisoformat(watermark) - last_watermark).total_seconds()) < 5
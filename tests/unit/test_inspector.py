@@ -0,0 +1,93 @@
+import io
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.inspector import (
+    ColumnDescription,
+    PrefetchedInspector,
+    read_lob,
+)
+
+
+class RecordingInspector:
+    """An inspector that records the tables it was asked about."""
+
+    def __init__(self):
+        self.requested: List[str] = []
+
+    def get_columns(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> List[ColumnDescription]:
+        self.requested.append(f"{schema}.{table_name}")
+        return []
+
+
+def _insert_columns(conn: Connection, table: str, rows: list):
+    for row in rows:
+        conn.execute(
+            text(
+                f"INSERT INTO SYS.{table} VALUES (:s, :t, :c, :p, :d, NULL, :n, NULL)"
+            ),
+            dict(zip(["s", "t", "c", "p", "d", "n"], row)),
+        )
+
+
+def test_prefetch_serves_columns_from_index(sys_conn: Connection):
+    _insert_columns(
+        sys_conn,
+        "TABLE_COLUMNS",
+        [
+            ("HOTEL", "ROOM", "FREE", 3, "INTEGER", "TRUE"),
+            ("HOTEL", "ROOM", "HNO", 1, "INTEGER", "FALSE"),
+            ("HOTEL", "ROOM", "Type", 2, "VARCHAR", "TRUE"),
+            ("OTHER", "ROOM", "ID", 1, "INTEGER", "FALSE"),
+        ],
+    )
+    _insert_columns(
+        sys_conn,
+        "VIEW_COLUMNS",
+        [("HOTEL", "GUESTS", "NAME", 1, "NVARCHAR", "TRUE")],
+    )
+    fallback = RecordingInspector()
+    inspector = PrefetchedInspector(fallback, sys_conn)  # type: ignore
+
+    inspector.prefetch(["hotel"])
+
+    columns = inspector.get_columns("room", "hotel")
+    assert [column["name"] for column in columns] == ["hno", "Type", "free"]
+    assert columns[0]["nullable"] is False
+    assert inspector.get_table_schema("GUESTS", "HOTEL")["name"]["type"] == "NVARCHAR"
+    assert fallback.requested == []
+
+    # the OTHER schema was not prefetched, so the wrapped inspector is used
+    assert inspector.get_columns("room", "other") == []
+    assert fallback.requested == ["other.room"]
+
+
+def test_get_view_definitions_streams_all_batches(sys_conn: Connection):
+    for schema, view in [("B", "V2"), ("A", "V1"), ("C", "V3"), ("A", "V0")]:
+        sys_conn.execute(
+            text("INSERT INTO SYS.VIEWS VALUES (:s, :v, :d)"),
+            {"s": schema, "v": view, "d": f"SELECT 1 FROM {view}"},
+        )
+    inspector = PrefetchedInspector(
+        RecordingInspector(), sys_conn, batch_size=1, fetch_size=1  # type: ignore
+    )
+
+    definitions = list(inspector.get_view_definitions(["a", "b"]))
+
+    assert definitions == [
+        ("a", "v0", "SELECT 1 FROM V0"),
+        ("a", "v1", "SELECT 1 FROM V1"),
+        ("b", "v2", "SELECT 1 FROM V2"),
+    ]
+
+
+def test_read_lob_in_chunks():
+    lob = io.StringIO("SELECT * FROM HOTEL.ROOM")
+
+    assert read_lob(lob, chunk_size=4) == "SELECT * FROM HOTEL.ROOM"
+    assert read_lob("SELECT 1") == "SELECT 1"
+    assert read_lob(None) is None
@@ -0,0 +1,52 @@
+import json
+import time
+from pathlib import Path
+from typing import Iterator
+
+from datahub_sap_hana.instrumentation import Histogram, Instrumentation
+from datahub_sap_hana.report import HanaReport
+
+
+def _slow_items(instrumentation: Instrumentation) -> Iterator[int]:
+    for i in range(2):
+        time.sleep(0.01)
+        with instrumentation.timer("inner"):
+            time.sleep(0.02)
+        yield i
+
+
+def test_nested_stages_are_timed_exclusively():
+    instrumentation = Instrumentation()
+
+    for _ in instrumentation.timed_iter("outer", _slow_items(instrumentation)):
+        # the time spent by the consumer is not part of the stage
+        time.sleep(0.05)
+
+    # without the inner stage and the consumer the outer stage takes 0.02s
+    assert 0.02 <= instrumentation.timings["outer"] < 0.055
+    assert instrumentation.timings["inner"] >= 0.04
+
+
+def test_histogram_percentiles_and_largest_values():
+    histogram = Histogram(slowest=2)
+    for i in range(1, 101):
+        histogram.observe(i / 100, f"view_{i}")
+
+    summary = histogram.as_obj()
+
+    assert (summary["p50"], summary["p90"], summary["p99"]) == (0.5, 0.9, 0.99)
+    assert summary["largest"] == {"view_100": 1.0, "view_99": 0.99}
+
+
+def test_instrumentation_is_part_of_the_report(tmp_path: Path):
+    report = HanaReport()
+    report.instrumentation.count("views_parsed", 3)
+    report.instrumentation.observe("view_parse_seconds", 0.5, "hotel.rooms")
+
+    output = tmp_path / "instrumentation.json"
+    report.instrumentation.write_json(str(output))
+
+    assert report.as_obj()["instrumentation"]["counters"] == {"views_parsed": 3}
+    assert json.loads(output.read_text())["histograms"]["view_parse_seconds"][
+        "largest"
+    ] == {"hotel.rooms": 0.5}
@@ -0,0 +1,100 @@
+import os
+import time
+from pathlib import Path
+
+from datahub_sap_hana.column_lineage_schema import Table, UpstreamLineageField, View
+from datahub_sap_hana.inspector import PrefetchedCatalog
+from datahub_sap_hana.lineage import iter_view_lineage
+from datahub_sap_hana.lineage_cache import LineageCache
+
+VIEW = View(
+    schema="hotel_schema",
+    name="unary_rooms",
+    sql="SELECT -PRICE AS DISCOUNTED_PRICE FROM HOTEL_SCHEMA.ROOM",
+)
+LINEAGE = [
+    (
+        "discounted_price",
+        [UpstreamLineageField(name="price", dataset=Table("hotel_schema", "room"))],
+    )
+]
+
+
+def test_cache_round_trip(tmp_path: Path):
+    cache = LineageCache(str(tmp_path), max_size=1024 * 1024)
+    assert cache.get(VIEW) is None
+
+    cache.put(VIEW, LINEAGE)
+
+    assert cache.get(VIEW) == LINEAGE
+    assert LineageCache(str(tmp_path), max_size=1024 * 1024).get(VIEW) == LINEAGE
+    # the default schema is part of the key
+    other_schema = View(schema="other", name=VIEW.name, sql=VIEW.sql)
+    assert cache.get(other_schema) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path: Path):
+    views = [View(schema="s", name=f"v{i}", sql=f"SELECT {i} AS X") for i in range(3)]
+    cache = LineageCache(str(tmp_path), max_size=1024 * 1024)
+    for i, view in enumerate(views):
+        cache.put(view, LINEAGE)
+        os.utime(cache._path(cache.key(view)), (i, i))
+    entry_size = cache.size // 3
+
+    # reading the first entry makes the second one the least recently used
+    cache.get(views[0])
+    cache.max_size = entry_size * 3
+    cache.put(View(schema="s", name="v3", sql="SELECT 3 AS X"), LINEAGE)
+
+    assert cache.size <= cache.max_size
+    assert cache.get(views[0]) is not None
+    assert cache.get(views[1]) is None
+
+
+def test_cache_removes_stale_temporary_files(tmp_path: Path):
+    (tmp_path / "ab").mkdir()
+    stale = tmp_path / "ab" / "stale.tmp"
+    recent = tmp_path / "ab" / "recent.tmp"
+    for path in [stale, recent]:
+        path.write_text("{")
+    # a file of a run that died a day ago, the other one may still be written
+    os.utime(stale, (0, time.time() - 24 * 3600))
+
+    cache = LineageCache(str(tmp_path), max_size=1024 * 1024)
+
+    assert not stale.exists()
+    assert recent.exists()
+    assert cache.size == 0
+
+
+def test_iter_view_lineage_skips_parsing_cached_views(tmp_path: Path):
+    cache = LineageCache(str(tmp_path), max_size=1024 * 1024)
+    broken_view = View(schema=VIEW.schema, name=VIEW.name, sql="not sql")
+    cache.put(broken_view, LINEAGE)
+
+    assert list(iter_view_lineage([broken_view], cache=cache)) == [
+        (broken_view, LINEAGE)
+    ]
+    assert list(iter_view_lineage([VIEW], cache=cache)) == [(VIEW, LINEAGE)]
+    assert cache.get(VIEW) == LINEAGE
+
+
+def test_cache_entries_depend_on_the_catalog_columns(tmp_path: Path):
+    columns = {
+        ("hotel_schema", "room"): [{"name": "PRICE"}],
+        ("hotel_schema", "unary_rooms"): [{"name": "DISCOUNTED_PRICE"}],
+    }
+    cache = LineageCache(
+        str(tmp_path), max_size=1024 * 1024, catalog=PrefetchedCatalog(columns)
+    )
+    cache.put(VIEW, LINEAGE)
+    assert cache.get(VIEW) == LINEAGE
+
+    columns[("hotel_schema", "room")].append({"name": "FREE"})
+    changed_catalog = PrefetchedCatalog(columns)
+
+    assert (
+        LineageCache(str(tmp_path), 1024 * 1024, catalog=changed_catalog).get(VIEW)
+        is None
+    )
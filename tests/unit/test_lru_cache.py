@@ -0,0 +1,53 @@
+from typing import List, Optional
+
+from datahub_sap_hana.inspector import CachedInspector, ColumnDescription
+from datahub_sap_hana.lru_cache import LRUCache
+
+
+class CountingInspector:
+    def __init__(self):
+        self.calls = 0
+
+    def get_columns(
+        self, table_name: str, schema: Optional[str] = None
+    ) -> List[ColumnDescription]:
+        self.calls += 1
+        return [
+            {
+                "name": "HNO",
+                "type": "INTEGER",
+                "nullable": False,
+                "default": None,
+                "comment": None,
+            }
+        ]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    assert cache.get_or_compute("a", lambda: -1) == 1
+    cache.get_or_compute("c", lambda: 3)
+
+    assert list(cache.entries) == ["a", "c"]
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+
+
+def test_cached_inspector_caches_per_instance():
+    wrapped = CountingInspector()
+    inspector = CachedInspector(wrapped, max_size=1)  # type: ignore
+    other = CachedInspector(wrapped, max_size=1)  # type: ignore
+
+    inspector.get_columns("room", "hotel")
+    inspector.get_columns("room", "hotel")
+    other.get_columns("room", "hotel")
+    assert wrapped.calls == 2
+
+    inspector.get_columns("hotel", "hotel")
+    inspector.get_columns("room", "hotel")
+    assert wrapped.calls == 4
+
+    inspector.close()
+    assert len(inspector.cache) == 0
@@ -0,0 +1,52 @@
+import pytest
+from datahub.configuration.common import AllowDenyPattern
+from sqlalchemy import create_engine, text
+
+from datahub_sap_hana.patterns import pattern_to_sql, regex_to_like, regex_to_sql
+
+NAMES = ["hotel", "hotel_schema", "hotelxschema", "Hotel_Archive", "sys", "rooms"]
+
+
+@pytest.mark.parametrize(
+    "regex, like_pattern",
+    [
+        ("hotel", "hotel%"),
+        ("hotel_schema$", "hotel\\_schema"),
+        ("^hotel.schema", "hotel_schema%"),
+        ("hotel.*archive", "hotel%archive%"),
+        (".*", "%"),
+    ],
+)
+def test_regex_to_like(regex: str, like_pattern: str):
+    assert regex_to_like(regex) == like_pattern
+
+
+def test_regex_to_sql_uses_like_regexpr_for_regexes():
+    assert regex_to_sql("HOTEL*", "c", True) == "c LIKE_REGEXPR '^(?:HOTEL*)' FLAG 'i'"
+    assert regex_to_sql("(?i)hotel", "c", True) is None
+    assert regex_to_sql("*SYS*", "c", True) is None
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        AllowDenyPattern(allow=["hotel"]),
+        AllowDenyPattern(allow=["hotel_schema$", "rooms"]),
+        AllowDenyPattern(allow=["HOTEL.*"], deny=[".*archive"]),
+        AllowDenyPattern(allow=["HOTEL"], ignoreCase=False),
+        AllowDenyPattern(deny=["sys", "rooms$"]),
+    ],
+)
+def test_like_predicates_match_the_pattern(pattern: AllowDenyPattern):
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA case_sensitive_like = ON"))
+        conn.execute(text("CREATE TABLE t (name TEXT)"))
+        for name in NAMES:
+            conn.execute(text("INSERT INTO t VALUES (:name)"), {"name": name})
+
+        predicates = pattern_to_sql(pattern, "name")
+        query = "SELECT name FROM t WHERE " + " AND ".join(predicates)
+        selected = [row[0] for row in conn.execute(text(query))]
+
+    assert selected == [name for name in NAMES if pattern.allowed(name)]
@@ -0,0 +1,455 @@
+import math
+import re
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from datahub.metadata.schema_classes import DatasetProfileClass
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine.base import Connection, Engine
+
+from datahub_sap_hana.ingestion import HanaSource
+from datahub_sap_hana.profiling import (
+    HanaProfiler,
+    HanaProfilingConfig,
+    ProfileResult,
+    TableProfiler,
+)
+from datahub_sap_hana.report import HanaReport
+from datahub_sap_hana.vectorized import VectorizedTableProfiler
+from tests.unit.conftest import SYS_TABLES
+
+
+class StdDev:
+    """The sample standard deviation, which sqlite doesn't have."""
+
+    def __init__(self):
+        self.values: List[float] = []
+
+    def step(self, value: Optional[float]):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self) -> Optional[float]:
+        if len(self.values) < 2:
+            return None
+        mean = sum(self.values) / len(self.values)
+        variance = sum((value - mean) ** 2 for value in self.values)
+        return math.sqrt(variance / (len(self.values) - 1))
+
+
+def _profiler(
+    conn: Connection,
+    table_profiler_factory: Callable[..., TableProfiler] = TableProfiler,
+    **config: Any,
+) -> TableProfiler:
+    conn.connection.create_aggregate("STDDEV", 1, StdDev)
+    conn.execute(text("CREATE TABLE room (hno INTEGER, free INTEGER, kind TEXT)"))
+    conn.execute(
+        text(
+            "INSERT INTO room VALUES "
+            "(1, 10, 'single'), (2, NULL, 'double'), (3, 30, 'double'), (4, 40, NULL)"
+        )
+    )
+    profiling_config: Dict[str, Any] = {
+        "enabled": True,
+        "engine": "native",
+        "include_field_median_value": False,
+        "include_field_quantiles": False,
+        **config,
+    }
+    return table_profiler_factory(
+        conn,
+        HanaProfilingConfig.parse_obj(profiling_config),
+        "main.room",
+        "main",
+        "room",
+    )
+
+
+def test_table_without_statistics_is_scanned(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn,
+        include_field_histogram=True,
+        include_field_distinct_value_frequencies=True,
+        include_field_sample_values=False,
+    )
+
+    profile = profiler.profile()
+
+    assert profile.rowCount == 4
+    assert profile.columnCount == 3
+    assert profile.sizeInBytes is None
+    free = profile.fieldProfiles[1]  # type: ignore
+    assert free.fieldPath == "free"
+    assert (free.nullCount, free.uniqueCount) == (1, 3)
+    assert (free.min, free.max, free.mean) == ("10", "40", "26.666666666666668")
+    assert free.stdev == str(_stddev(10, 30, 40))
+    assert sum(free.histogram.heights) == 3  # type: ignore
+    assert free.histogram.boundaries[0] == "10.0"  # type: ignore
+    kind = profile.fieldProfiles[2]  # type: ignore
+    assert kind.min is None
+    assert [
+        (frequency.value, frequency.frequency)
+        for frequency in kind.distinctValueFrequencies  # type: ignore
+    ] == [("double", 2), ("single", 1)]
+    assert profiler.catalog_metrics == 0
+
+
+def test_statistics_are_taken_from_the_monitoring_views(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn,
+        include_field_null_count=False,
+        include_field_min_value=False,
+        include_field_max_value=False,
+        include_field_mean_value=False,
+        include_field_stddev_value=False,
+        include_field_histogram=False,
+        include_field_distinct_value_frequencies=False,
+        include_field_sample_values=False,
+    )
+    sys_conn.execute(
+        text("INSERT INTO SYS.M_CS_TABLES VALUES ('MAIN', 'ROOM', 0, 4, 2048)")
+    )
+    sys_conn.execute(
+        text(
+            "INSERT INTO SYS.M_CS_COLUMNS VALUES "
+            "('MAIN', 'ROOM', 0, 'HNO', 4, 'TRUE'), "
+            "('MAIN', 'ROOM', 0, 'FREE', 3, 'TRUE'), "
+            "('MAIN', 'ROOM', 0, 'KIND', 0, 'FALSE')"
+        )
+    )
+
+    profile = profiler.profile()
+
+    assert (profile.rowCount, profile.sizeInBytes) == (4, 2048)
+    assert [field.uniqueCount for field in profile.fieldProfiles] == [  # type: ignore
+        4,
+        3,
+        2,
+    ]
+    # the row count and the distinct counts of the loaded columns
+    assert profiler.catalog_metrics == 3
+    # only the distinct count of the unloaded column is computed from the data
+    assert profiler.scans == 1
+
+
+def test_large_tables_are_sampled_in_a_single_scan(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn,
+        sample_row_threshold=2,
+        sample_percent=50,
+        include_field_histogram=True,
+    )
+    statements: List[str] = []
+
+    # sqlite has no TABLESAMPLE, the whole table stands in for the sample
+    def remove_sample(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        return statement.replace(" TABLESAMPLE SYSTEM (50.0)", ""), parameters
+
+    event.listen(sys_conn, "before_cursor_execute", remove_sample, retval=True)
+
+    profile = profiler.profile()
+
+    scans = [statement for statement in statements if "TABLESAMPLE" in statement]
+    # one aggregation of all columns, a histogram of each numeric column and
+    # sample values of each column
+    assert len(scans) == profiler.scans - 1 == 6
+    assert scans[0].count("MIN(") == 2
+    free = profile.fieldProfiles[1]  # type: ignore
+    assert free.nullCount == 1
+    # distinct counts are not computed from a sample
+    assert free.uniqueCount is None
+
+
+def test_vectorized_profiler_reads_the_table_once(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn,
+        VectorizedTableProfiler,
+        engine="vectorized",
+        fetch_size=3,
+        include_field_median_value=True,
+        include_field_quantiles=True,
+        include_field_histogram=True,
+        include_field_distinct_value_frequencies=True,
+    )
+
+    profile = profiler.profile()
+
+    # one scan for the row count and one for all columns
+    assert profiler.scans == 2
+    free = profile.fieldProfiles[1]  # type: ignore
+    assert (free.nullCount, free.uniqueCount) == (1, 3)
+    assert (free.min, free.max, free.median) == ("10", "40", "30.0")
+    assert free.mean == "26.666666666666668"
+    assert float(free.stdev) == _stddev(10, 30, 40)  # type: ignore
+    assert free.histogram.heights == [1, 0, 0, 0, 0, 0, 1, 0, 0, 1]  # type: ignore
+    assert free.sampleValues == ["10", "30", "40"]
+    kind = profile.fieldProfiles[2]  # type: ignore
+    assert (kind.min, kind.uniqueCount) == (None, 2)
+    assert [
+        (frequency.value, frequency.frequency)
+        for frequency in kind.distinctValueFrequencies  # type: ignore
+    ] == [("double", 2), ("single", 1)]
+
+
+def _partitioned(conn: Union[Connection, Engine]) -> List[str]:
+    """Splits the room table into two partitions and returns the queries."""
+    conn.execute(
+        text(
+            "INSERT INTO SYS.M_CS_TABLES VALUES "
+            "('MAIN', 'ROOM', 1, 2, 1024), ('MAIN', 'ROOM', 2, 2, 1024)"
+        )
+    )
+    statements: List[str] = []
+
+    # sqlite has no partitions, the first two rooms stand in for partition 1
+    def select_partition(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        return (
+            re.sub(
+                r"(\S+) PARTITION \((\d)\)",
+                r"(SELECT * FROM \1 WHERE (hno - 1) / 2 + 1 = \2)",
+                statement,
+            ),
+            parameters,
+        )
+
+    event.listen(conn, "before_cursor_execute", select_partition, retval=True)
+    return statements
+
+
+def test_partitions_are_read_separately_and_merged(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn,
+        VectorizedTableProfiler,
+        engine="vectorized",
+        include_field_distinct_value_frequencies=True,
+    )
+    statements = _partitioned(sys_conn)
+
+    profile = profiler.profile()
+
+    assert (
+        len([statement for statement in statements if "PARTITION (" in statement]) == 2
+    )
+    assert (profile.rowCount, profile.sizeInBytes, profiler.scans) == (4, 2048, 2)
+    free = profile.fieldProfiles[1]  # type: ignore
+    assert (free.nullCount, free.uniqueCount) == (1, 3)
+    assert (free.min, free.max) == ("10", "40")
+    kind = profile.fieldProfiles[2]  # type: ignore
+    assert [
+        (frequency.value, frequency.frequency)
+        for frequency in kind.distinctValueFrequencies  # type: ignore
+    ] == [("double", 2), ("single", 1)]
+
+
+def test_partitions_are_read_in_parallel(tmp_path: Path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hana.db'}")
+    event.listen(
+        engine,
+        "connect",
+        lambda dbapi_connection, connection_record: dbapi_connection.execute(
+            f"ATTACH DATABASE '{tmp_path / 'sys.db'}' AS SYS"
+        ),
+    )
+    with engine.connect() as conn:
+        for statement in SYS_TABLES:
+            conn.execute(text(statement))
+        profiler = _profiler(
+            conn,
+            partial(VectorizedTableProfiler, get_connection=engine.connect),
+            engine="vectorized",
+            partition_workers=2,
+        )
+        _partitioned(engine)
+
+        profile = profiler.profile()
+
+    assert profiler.scans == 2
+    assert [field.nullCount for field in profile.fieldProfiles] == [  # type: ignore
+        0,
+        1,
+        1,
+    ]
+
+
+def test_no_data_is_read_after_the_deadline(sys_conn: Connection):
+    profiler = _profiler(
+        sys_conn, VectorizedTableProfiler, engine="vectorized", table_deadline_seconds=0
+    )
+    _partitioned(sys_conn)
+
+    profile = profiler.profile()
+
+    assert (profile.rowCount, profile.fieldProfiles, profiler.scans) == (4, [], 0)
+
+
+def test_profiles_are_submitted_in_a_bounded_window():
+    profiler = HanaProfiler(
+        lambda: None,  # type: ignore
+        HanaProfilingConfig(enabled=True, engine="native"),
+        HanaReport(),
+    )
+    profiled: List[int] = []
+
+    def profile_request(request: SimpleNamespace) -> ProfileResult:
+        profiled.append(request.index)
+        return ProfileResult(DatasetProfileClass(timestampMillis=0), 1, 0, 0.0)
+
+    profiler.profile_request = profile_request  # type: ignore
+    requests = [SimpleNamespace(index=i, pretty_name=f"t{i}") for i in range(10)]
+
+    profiles = profiler.generate_profiles(requests, max_workers=2)  # type: ignore
+    first, _ = next(profiles)
+
+    # two requests per worker are submitted before the first profile
+    assert first.index == 0
+    assert len(profiled) <= 4
+    assert [request.index for request, _ in profiles] == list(range(1, 10))
+    assert profiler.report.instrumentation.counters["profiling_scans"] == 10
+
+
+def _sys_source(
+    hana_source: Callable[..., HanaSource], tmp_path: Path, **config: Any
+) -> HanaSource:
+    """Returns a source for a sqlite database with the SYS tables attached."""
+    source = hana_source(
+        sqlalchemy_uri=f"sqlite:///{tmp_path / 'hana.db'}",
+        schema_pattern={"allow": ["main"]},
+        **config,
+    )
+    event.listen(
+        source.get_engine(),
+        "connect",
+        lambda dbapi_connection, connection_record: dbapi_connection.execute(
+            f"ATTACH DATABASE '{tmp_path / 'sys.db'}' AS SYS"
+        ),
+    )
+    with source.get_db_connection() as conn:
+        for statement in SYS_TABLES:
+            conn.execute(text(statement))
+    return source
+
+
+def test_source_uses_the_native_profiler(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = _sys_source(
+        hana_source,
+        tmp_path,
+        profiling={
+            "enabled": True,
+            "engine": "native",
+            "profile_table_level_only": True,
+        },
+    )
+    with source.get_db_connection() as conn:
+        conn.execute(text("CREATE TABLE room (hno INTEGER)"))
+        conn.execute(
+            text("INSERT INTO SYS.M_CS_TABLES VALUES ('MAIN', 'ROOM', 0, 7, 64)")
+        )
+
+    profiles = [
+        wu.metadata.aspect  # type: ignore
+        for wu in source.get_workunits()
+        if isinstance(getattr(wu.metadata, "aspect", None), DatasetProfileClass)
+    ]
+
+    assert [(profile.rowCount, profile.sizeInBytes) for profile in profiles] == [
+        (7, 64)
+    ]
+    assert source.instrumentation.counters["profiling_catalog_metrics"] == 1
+
+
+def test_table_statistics_are_emitted_without_profiling(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = _sys_source(
+        hana_source,
+        tmp_path,
+        table_pattern={"deny": [".*hidden"]},
+        include_table_statistics=True,
+    )
+    with source.get_db_connection() as conn:
+        conn.execute(text("CREATE TABLE room (hno INTEGER)"))
+        conn.execute(text("CREATE TABLE hidden (hno INTEGER)"))
+        conn.execute(
+            text(
+                "INSERT INTO SYS.M_TABLES VALUES "
+                "('MAIN', 'ROOM', 7, 64), ('MAIN', 'HIDDEN', 1, 8), "
+                "('OTHER', 'ROOM', 2, 16)"
+            )
+        )
+
+    profiles = [
+        (wu.metadata.entityUrn, wu.metadata.aspect)  # type: ignore
+        for wu in source.get_workunits()
+        if isinstance(getattr(wu.metadata, "aspect", None), DatasetProfileClass)
+    ]
+
+    assert [
+        (urn, profile.rowCount, profile.sizeInBytes) for urn, profile in profiles
+    ] == [("urn:li:dataset:(urn:li:dataPlatform:hana,hxe.main.room,PROD)", 7, 64)]
+    assert source.instrumentation.counters["table_statistics"] == 1
+
+
+def test_profiled_tables_get_the_table_statistics_in_their_profile(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    source = _sys_source(
+        hana_source,
+        tmp_path,
+        include_table_statistics=True,
+        profile_pattern={"deny": [".*hidden"]},
+        # the tables are profiled in a thread of their own
+        options={"connect_args": {"check_same_thread": False}},
+        profiling={
+            "enabled": True,
+            "engine": "native",
+            "include_field_stddev_value": False,
+            "include_field_median_value": False,
+            "include_field_quantiles": False,
+        },
+    )
+    with source.get_db_connection() as conn:
+        for table in ["room", "guest", "hidden"]:
+            conn.execute(text(f"CREATE TABLE {table} (hno INTEGER)"))
+        conn.execute(text("INSERT INTO guest VALUES (1), (2), (3)"))
+        conn.execute(
+            text("INSERT INTO SYS.M_CS_TABLES VALUES ('MAIN', 'ROOM', 0, 7, 64)")
+        )
+        conn.execute(
+            text(
+                "INSERT INTO SYS.M_TABLES VALUES "
+                "('MAIN', 'ROOM', 7, 100), ('MAIN', 'GUEST', 3, 24), "
+                "('MAIN', 'HIDDEN', 1, 8)"
+            )
+        )
+
+    profiles = [
+        (wu.metadata.entityUrn, wu.metadata.aspect)  # type: ignore
+        for wu in source.get_workunits()
+        if isinstance(getattr(wu.metadata, "aspect", None), DatasetProfileClass)
+    ]
+
+    # one profile per table, the profiled tables keep their column profiles
+    urn = "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.main.{},PROD)"
+    assert sorted(
+        (urn, profile.rowCount, profile.sizeInBytes, len(profile.fieldProfiles or []))
+        for urn, profile in profiles
+    ) == [
+        (urn.format("guest"), 3, 24, 1),
+        (urn.format("hidden"), 1, 8, 0),
+        (urn.format("room"), 7, 64, 1),
+    ]
+    assert source.instrumentation.counters["table_statistics"] == 1
+
+
+def _stddev(*values: float) -> Optional[float]:
+    stddev = StdDev()
+    for value in values:
+        stddev.step(value)
+    return stddev.finalize()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from datahub_sap_hana.sketches import ColumnSketch, HyperLogLog, TDigest, hash_values
+
+
+def test_hyperloglog_estimates_distinct_counts():
+    hll = HyperLogLog()
+    other = HyperLogLog()
+    values = np.arange(100000, dtype=np.float64)
+    hll.add_hashes(hash_values(values[:60000]))
+    other.add_hashes(hash_values(values[40000:]))
+
+    hll.merge(other)
+
+    assert abs(hll.count() - 100000) < 100000 * 0.02
+
+
+def test_tdigest_estimates_quantiles():
+    values = np.random.default_rng(0).normal(size=200000)
+    digest = TDigest()
+    for batch in np.array_split(values, 20):
+        digest.update(batch)
+
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert abs(digest.quantile(q) - np.quantile(values, q)) < 0.02
+
+
+def test_merged_column_sketches_match_a_single_sketch():
+    values = np.empty(30000, dtype=object)
+    values[:] = [None if i % 10 == 0 else i % 5000 for i in range(30000)]
+    whole = ColumnSketch(numeric=True, exact_limit=1000)
+    whole.update(values)
+    merged = ColumnSketch(numeric=True, exact_limit=1000)
+    for part in np.array_split(values, 3):
+        sketch = ColumnSketch(numeric=True, exact_limit=1000)
+        sketch.update(part)
+        merged.merge(sketch)
+
+    assert (merged.rows, merged.nulls) == (whole.rows, whole.nulls) == (30000, 3000)
+    assert (merged.minimum, merged.maximum) == (1, 4999)
+    assert np.isclose(merged.mean, whole.mean)
+    assert np.isclose(merged.stdev, whole.stdev)  # type: ignore
+    # the multiples of 10 are NULL
+    assert abs(merged.unique_count - 4500) < 4500 * 0.02
+    assert abs(merged.quantiles([0.5])[0] - 2500) < 50  # type: ignore
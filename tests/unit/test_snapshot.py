@@ -0,0 +1,124 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.column_lineage_schema import View
+from datahub_sap_hana.ingestion import LINEAGE_QUERY, HanaSource
+from datahub_sap_hana.inspector import ColumnDescription
+from datahub_sap_hana.snapshot import (
+    CatalogSnapshot,
+    SnapshotInspector,
+    capture_snapshot,
+)
+from datahub_sap_hana.transitive import VIEW_DEPENDENCIES_QUERY
+
+
+def _columns(*names: str) -> List[ColumnDescription]:
+    return [
+        {
+            "name": name,
+            "type": "INTEGER",
+            "nullable": True,
+            "default": None,
+            "comment": None,
+        }
+        for name in names
+    ]
+
+
+def _snapshot() -> CatalogSnapshot:
+    return CatalogSnapshot(
+        schemas=["hotel"],
+        tables={"hotel": ["room"]},
+        views={"hotel": ["free_rooms"]},
+        columns={
+            "hotel": {"room": _columns("HNO", "FREE"), "free_rooms": _columns("HNO")}
+        },
+        view_definitions={
+            "hotel": {"free_rooms": "SELECT HNO FROM HOTEL.ROOM WHERE FREE > 0"}
+        },
+        query_results={
+            LINEAGE_QUERY: [("room", "hotel", "free_rooms", "hotel")],
+            VIEW_DEPENDENCIES_QUERY: [],
+        },
+    )
+
+
+def test_snapshot_round_trip(tmp_path: Path):
+    snapshot = _snapshot()
+    path = str(tmp_path / "snapshot.json.gz")
+
+    # a snapshot can be captured from any inspector
+    captured = capture_snapshot(
+        SnapshotInspector(snapshot),
+        ["hotel"],
+        [
+            View(
+                schema="hotel",
+                name="free_rooms",
+                sql="SELECT HNO FROM HOTEL.ROOM WHERE FREE > 0",
+            )
+        ],
+        snapshot.query_results,
+    )
+    captured.save(path)
+
+    assert CatalogSnapshot.load(path) == snapshot
+
+
+def test_lineage_is_replayed_from_a_snapshot(
+    tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    path = str(tmp_path / "snapshot.json.gz")
+    _snapshot().save(path)
+    source = hana_source(
+        schema_pattern={"allow": [".*"]},
+        include_view_lineage=True,
+        include_column_lineage=True,
+        replay_snapshot=path,
+    )
+
+    aspects: Dict[str, Any] = {
+        wu.get_urn(): wu.metadata.aspect  # type: ignore
+        for wu in source.get_workunits()
+    }
+
+    free_rooms = "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel.free_rooms,PROD)"
+    room = "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel.room,PROD)"
+    lineage = aspects[free_rooms]
+    assert list(aspects) == [free_rooms]
+    assert [upstream.dataset for upstream in lineage.upstreams] == [room]
+    assert lineage.fineGrainedLineages[0].upstreams == [
+        f"urn:li:schemaField:({room},HNO)"
+    ]
+
+
+def test_snapshot_of_an_incremental_run_holds_all_views(
+    sys_conn: Connection, tmp_path: Path, hana_source: Callable[..., HanaSource]
+):
+    for view in ["FREE_ROOMS", "ROOMS"]:
+        sys_conn.execute(
+            text(
+                "INSERT INTO SYS.VIEWS VALUES "
+                "('MAIN', :view, 'SELECT HNO FROM MAIN.ROOM')"
+            ),
+            {"view": view},
+        )
+    source = hana_source(
+        schema_pattern={"allow": ["main"]},
+        incremental=True,
+        snapshot_output=str(tmp_path / "snapshot.json.gz"),
+    )
+    # only FREE_ROOMS changed since the last run
+    source.changed_objects = {("main", "free_rooms")}
+
+    snapshot = source.capture_snapshot(sys_conn)
+
+    assert snapshot.view_definitions == {
+        "main": {
+            "free_rooms": "SELECT HNO FROM MAIN.ROOM",
+            "rooms": "SELECT HNO FROM MAIN.ROOM",
+        }
+    }
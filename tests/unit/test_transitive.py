@@ -0,0 +1,145 @@
+from contextlib import nullcontext
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.column_lineage_schema import Table, UpstreamLineageField, View
+from datahub_sap_hana.ingestion import HanaSource
+from datahub_sap_hana.transitive import (
+    TransitiveLineageResolver,
+    get_view_dependencies,
+    topological_order,
+)
+
+
+def _view(name: str) -> View:
+    return View(schema="hotel", name=name, sql="")
+
+
+def _field(table: str, column: str) -> UpstreamLineageField:
+    return UpstreamLineageField(name=column, dataset=Table(schema="hotel", name=table))
+
+
+# rooms <- free_rooms <- cheap_rooms, cycle_a <-> cycle_b
+DEPENDENCIES = {
+    ("hotel", "free_rooms"): {("hotel", "rooms")},
+    ("hotel", "cheap_rooms"): {("hotel", "free_rooms"), ("hotel", "rooms")},
+    ("hotel", "cycle_a"): {("hotel", "cycle_b")},
+    ("hotel", "cycle_b"): {("hotel", "cycle_a")},
+}
+
+
+def test_get_view_dependencies(sys_conn: Connection):
+    for base_object, base_type in [("ROOM", "TABLE"), ("ROOMS", "VIEW")]:
+        sys_conn.execute(
+            text(
+                "INSERT INTO SYS.OBJECT_DEPENDENCIES VALUES "
+                "('HOTEL', :base_object, 'HOTEL', 'FREE_ROOMS', 'VIEW', :base_type)"
+            ),
+            {"base_object": base_object, "base_type": base_type},
+        )
+
+    assert get_view_dependencies(sys_conn) == {
+        ("hotel", "free_rooms"): {("hotel", "rooms")}
+    }
+
+
+def test_topological_order_detects_cycles():
+    names = [
+        ("HOTEL", name.upper())
+        for name in ["cheap_rooms", "cycle_a", "free_rooms", "cycle_b", "rooms"]
+    ]
+
+    ordered, cyclic = topological_order(names, DEPENDENCIES)
+
+    # the names are returned as they were given
+    assert [name for _, name in ordered] == ["ROOMS", "FREE_ROOMS", "CHEAP_ROOMS"]
+    assert [name for _, name in cyclic] == ["CYCLE_A", "CYCLE_B"]
+
+
+def _names(*views: View) -> List[Tuple[str, str]]:
+    return [(view.schema, view.name) for view in views]
+
+
+def test_lineage_is_resolved_through_parent_views():
+    views = [_view("rooms"), _view("free_rooms"), _view("cheap_rooms")]
+    resolver = TransitiveLineageResolver(_names(*views), DEPENDENCIES)
+
+    resolver.resolve(views[0], [("HNO", [_field("room", "HNO")])])
+    resolver.resolve(views[1], [("HNO", [_field("rooms", "HNO")])])
+    cheap_rooms = resolver.resolve(
+        views[2], [("HNO", [_field("free_rooms", "HNO"), _field("rooms", "HNO")])]
+    )
+
+    assert cheap_rooms == [("HNO", [_field("room", "HNO")])]
+    assert resolver.depths[("hotel", "cheap_rooms")] == 3
+    # all children of the views were resolved, so their lineage was freed
+    assert resolver.memo == {}
+
+
+def test_lineage_is_resolved_up_to_the_depth_limit():
+    views = [_view("rooms"), _view("free_rooms"), _view("cheap_rooms")]
+    resolver = TransitiveLineageResolver(_names(*views), DEPENDENCIES, max_depth=2)
+
+    resolver.resolve(views[0], [("HNO", [_field("room", "HNO")])])
+    resolver.resolve(views[1], [("HNO", [_field("rooms", "HNO")])])
+    cheap_rooms = resolver.resolve(views[2], [("HNO", [_field("free_rooms", "HNO")])])
+
+    assert cheap_rooms == [("HNO", [_field("free_rooms", "HNO")])]
+
+
+def test_skipped_views_release_the_lineage_of_their_parents():
+    views = [_view("rooms"), _view("free_rooms"), _view("cheap_rooms")]
+    resolver = TransitiveLineageResolver(_names(*views), DEPENDENCIES)
+
+    resolver.resolve(views[0], [("HNO", [_field("room", "HNO")])])
+    resolver.skip("hotel", "free_rooms")
+    cheap_rooms = resolver.resolve(
+        views[2], [("HNO", [_field("free_rooms", "HNO"), _field("rooms", "HNO")])]
+    )
+
+    # the columns of the skipped view are kept as they are
+    assert cheap_rooms == [
+        ("HNO", [_field("free_rooms", "HNO"), _field("room", "HNO")])
+    ]
+    assert resolver.memo == {}
+
+
+def test_view_definitions_are_read_in_dependency_order(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    for view, definition in [
+        ("CHEAP_ROOMS", "SELECT HNO FROM HOTEL.FREE_ROOMS"),
+        ("EMPTY", None),
+        ("FREE_ROOMS", "SELECT HNO FROM HOTEL.ROOMS"),
+        ("ROOMS", "SELECT HNO FROM HOTEL.ROOM"),
+    ]:
+        sys_conn.execute(
+            text("INSERT INTO SYS.VIEWS VALUES ('HOTEL', :view, :definition)"),
+            {"view": view, "definition": definition},
+        )
+    for dependent, base in [
+        ("FREE_ROOMS", "ROOMS"),
+        ("CHEAP_ROOMS", "FREE_ROOMS"),
+        ("EMPTY", "ROOMS"),
+    ]:
+        sys_conn.execute(
+            text(
+                "INSERT INTO SYS.OBJECT_DEPENDENCIES VALUES "
+                "('HOTEL', :base, 'HOTEL', :dependent, 'VIEW', 'VIEW')"
+            ),
+            {"base": base, "dependent": dependent},
+        )
+    source = hana_source(column_lineage_transitive=True, view_definitions_fetch_size=2)
+    source.get_db_connection = lambda: nullcontext(sys_conn)  # type: ignore
+    source.get_column_lineage_schemas = lambda inspector: ["hotel"]  # type: ignore
+    inspector = source.get_column_lineage_inspector(sys_conn)
+
+    views, resolver = source.get_transitive_lineage_resolver(inspector)
+
+    # only the names are read before the views are iterated
+    assert isinstance(views, Iterator)
+    assert [view.name for view in views] == ["rooms", "free_rooms", "cheap_rooms"]
+    # EMPTY has no definition and was skipped, only FREE_ROOMS is left
+    assert resolver.pending_children[("hotel", "rooms")] == 1
@@ -0,0 +1,20 @@
+from datahub_sap_hana.ingestion import HanaConfig
+from datahub_sap_hana.urns import UrnFactory
+
+
+def test_urns_are_cached():
+    config = HanaConfig.parse_obj({"host_port": "host:1521", "database": "hxe"})
+    urns = UrnFactory("hana", config, max_size=2)
+
+    dataset_urn = urns.dataset_urn("hotel", "room")
+    field_urn = urns.schema_field_urn(dataset_urn, "hno")
+
+    assert (
+        dataset_urn == "urn:li:dataset:(urn:li:dataPlatform:hana,hxe.hotel.room,PROD)"
+    )
+    assert field_urn == f"urn:li:schemaField:({dataset_urn},hno)"
+    assert urns.dataset_urn("hotel", "room") is dataset_urn
+    assert urns.cache.hits == 1
+
+    urns.dataset_urn("hotel", "hotel")
+    assert len(urns.cache) == 2
@@ -0,0 +1,136 @@
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection
+
+from datahub_sap_hana.ingestion import HanaSource
+
+DEPENDENCIES = [
+    ("HOTEL_SCHEMA", "HOTEL", "HOTEL_SCHEMA", "HOTEL_ROOMS"),
+    ("HOTEL_SCHEMA", "ROOM", "REPORTING", "FREE_ROOMS"),
+    ("HOTEL_SCHEMA", "ROOM", "HOTEL_SCHEMA", "HOTEL_ROOMS"),
+    ("HOTEL_SCHEMA", "RESERVATION", "REPORTING", "FREE_ROOMS"),
+    ("HOTEL_SCHEMA", "HOTEL", "STAGING", "HOTEL_COPY"),
+]
+
+
+def _dataset_urn(name: str) -> str:
+    return f"urn:li:dataset:(urn:li:dataPlatform:hana,hxe.{name},PROD)"
+
+
+def _insert_dependencies(conn: Connection) -> None:
+    for base_schema, base_object, dependent_schema, dependent_object in DEPENDENCIES:
+        conn.execute(
+            text(
+                "INSERT INTO SYS.OBJECT_DEPENDENCIES VALUES "
+                "(:base_schema, :base_object, :dependent_schema, "
+                ":dependent_object, 'VIEW', 'TABLE')"
+            ),
+            {
+                "base_schema": base_schema,
+                "base_object": base_object,
+                "dependent_schema": dependent_schema,
+                "dependent_object": dependent_object,
+            },
+        )
+
+
+def test_view_lineage_rows_are_grouped_per_view(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    _insert_dependencies(sys_conn)
+    source = hana_source(
+        view_lineage_fetch_size=2, schema_pattern={"deny": ["staging"]}
+    )
+
+    elements = {
+        key: sorted(source_tables)
+        for key, source_tables in source._get_view_lineage_elements(sys_conn)
+    }
+
+    assert elements == {
+        ("free_rooms", "reporting"): [
+            _dataset_urn("hotel_schema.reservation"),
+            _dataset_urn("hotel_schema.room"),
+        ],
+        ("hotel_rooms", "hotel_schema"): [
+            _dataset_urn("hotel_schema.hotel"),
+            _dataset_urn("hotel_schema.room"),
+        ],
+    }
+
+
+def test_view_lineage_patterns_are_checked_after_push_down(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    _insert_dependencies(sys_conn)
+    source = hana_source(
+        view_lineage_fetch_size=2,
+        schema_pattern={"allow": [".*"]},
+        view_pattern={"deny": ["free_.*"]},
+        push_down_lineage_filters=False,
+    )
+
+    keys = [key for key, _ in source._get_view_lineage_elements(sys_conn)]
+
+    assert keys == [("hotel_rooms", "hotel_schema"), ("hotel_copy", "staging")]
+    assert list(source.report.filtered) == ["reporting.free_rooms"]
+
+
+def test_one_upstream_lineage_aspect_per_view(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    _insert_dependencies(sys_conn)
+    source = hana_source(
+        view_lineage_fetch_size=2,
+        schema_pattern={"allow": [".*"]},
+        include_view_lineage=True,
+        include_column_lineage=True,
+    )
+    hotel_rooms = _dataset_urn("hotel_schema.hotel_rooms")
+    source.get_column_lineage_inspector = lambda conn: None
+    source.build_fine_grained_lineage = lambda inspector: iter(
+        [([], {_dataset_urn("hotel_schema.room_types")}, hotel_rooms)]
+    )
+
+    workunits = list(source._get_lineage_workunits(sys_conn))
+    aspects = {wu.get_urn(): wu.metadata.aspect for wu in workunits}  # type: ignore
+
+    assert len(workunits) == len(aspects)
+
+    assert sorted(aspects) == [
+        hotel_rooms,
+        _dataset_urn("reporting.free_rooms"),
+        _dataset_urn("staging.hotel_copy"),
+    ]
+    assert [upstream.dataset for upstream in aspects[hotel_rooms].upstreams] == [
+        _dataset_urn("hotel_schema.hotel"),
+        _dataset_urn("hotel_schema.room"),
+        _dataset_urn("hotel_schema.room_types"),
+    ]
+
+
+def test_view_lineage_is_emitted_while_the_query_is_read(
+    sys_conn: Connection, hana_source: Callable[..., HanaSource]
+):
+    _insert_dependencies(sys_conn)
+    source = hana_source(
+        view_lineage_fetch_size=2,
+        schema_pattern={"allow": [".*"]},
+        include_view_lineage=True,
+    )
+    read = []
+    get_view_lineage_elements = source._get_view_lineage_elements
+
+    def record_view_lineage_elements(conn):
+        for element in get_view_lineage_elements(conn):
+            read.append(element[0])
+            yield element
+
+    source._get_view_lineage_elements = record_view_lineage_elements  # type: ignore
+
+    workunits = iter(source._get_lineage_workunits(sys_conn))
+
+    assert next(workunits).get_urn() == _dataset_urn("hotel_schema.hotel_rooms")
+    assert read == [("hotel_rooms", "hotel_schema")]
+    assert len(list(workunits)) == 2